@@ -16,12 +16,27 @@
   this program.  If not, see <http://www.gnu.org/licenses/>.
 */
 
+#define PY_SSIZE_T_CLEAN
 #include <Python.h>
 #include <secp256k1.h>
 
+static secp256k1_context *ctx = NULL;
+
+static int init_ctx(void) {
+	if (ctx == NULL) {
+	/*	puts ("Initializing context"); */
+		ctx = secp256k1_context_create(SECP256K1_CONTEXT_SIGN | SECP256K1_CONTEXT_VERIFY);
+	}
+	if (ctx == NULL) {
+		PyErr_SetString(PyExc_RuntimeError, "Context initialization failed");
+		return 0;
+	}
+	return 1;
+}
+
 static PyObject * priv2pub(PyObject *self, PyObject *args) {
 	const unsigned char * privkey;
-	const int klen;
+	Py_ssize_t klen;
 	const int compressed;
 	if (!PyArg_ParseTuple(args, "y#I", &privkey, &klen, &compressed)) {
 		PyErr_SetString(PyExc_ValueError, "Unable to parse extension mod arguments");
@@ -34,13 +49,7 @@ static PyObject * priv2pub(PyObject *self, PyObject *args) {
 	secp256k1_pubkey pubkey;
 	size_t pubkeyclen = compressed == 1 ? 33 : 65;
 	unsigned char pubkeyc[pubkeyclen];
-	static secp256k1_context *ctx = NULL;
-	if (ctx == NULL) {
-	/*	puts ("Initializing context"); */
-		ctx = secp256k1_context_create(SECP256K1_CONTEXT_SIGN | SECP256K1_CONTEXT_VERIFY);
-	}
-	if (ctx == NULL) {
-		PyErr_SetString(PyExc_RuntimeError, "Context initialization failed");
+	if (!init_ctx()) {
 		return NULL;
 	}
 	if (secp256k1_ec_pubkey_create(ctx, &pubkey, privkey) != 1) {
@@ -52,7 +61,171 @@ static PyObject * priv2pub(PyObject *self, PyObject *args) {
 		PyErr_SetString(PyExc_RuntimeError, "Public key serialization failed");
 		return NULL;
 	}
-	return Py_BuildValue("y#", pubkeyc,pubkeyclen);
+	return Py_BuildValue("y#", pubkeyc, (Py_ssize_t)pubkeyclen);
+}
+
+/*
+  Generate 'count' pubkeys from a buffer of 'count' concatenated 32-byte privkeys.
+  Returns the concatenated serialized pubkeys (33 or 65 bytes each).
+*/
+static PyObject * priv2pub_many(PyObject *self, PyObject *args) {
+	const unsigned char * privkeys;
+	Py_ssize_t buflen;
+	unsigned int count;
+	const int compressed;
+	if (!PyArg_ParseTuple(args, "y#II", &privkeys, &buflen, &count, &compressed)) {
+		PyErr_SetString(PyExc_ValueError, "Unable to parse extension mod arguments");
+		return NULL;
+	}
+	if (buflen != (Py_ssize_t)count * 32) {
+		PyErr_SetString(PyExc_ValueError, "Private key buffer length not 32 * count bytes");
+		return NULL;
+	}
+	if (!init_ctx()) {
+		return NULL;
+	}
+	const size_t outklen = compressed == 1 ? 33 : 65;
+	PyObject *ret = PyBytes_FromStringAndSize(NULL, (Py_ssize_t)(outklen * count));
+	if (ret == NULL) {
+		return NULL;
+	}
+	unsigned char *out = (unsigned char *)PyBytes_AS_STRING(ret);
+	const unsigned int flags = compressed == 1 ? SECP256K1_EC_COMPRESSED : SECP256K1_EC_UNCOMPRESSED;
+	unsigned int i, err = 0;
+	Py_BEGIN_ALLOW_THREADS
+	for (i = 0; i < count; i++) {
+		secp256k1_pubkey pubkey;
+		size_t pubkeyclen = outklen;
+		if (secp256k1_ec_pubkey_create(ctx, &pubkey, privkeys + i*32) != 1) {
+			err = 1;
+			break;
+		}
+		if (secp256k1_ec_pubkey_serialize(ctx, out + i*outklen, &pubkeyclen, &pubkey, flags) != 1
+				|| pubkeyclen != outklen) {
+			err = 2;
+			break;
+		}
+	}
+	Py_END_ALLOW_THREADS
+	if (err) {
+		Py_DECREF(ret);
+		PyErr_Format(PyExc_RuntimeError, "Public key %s failed for key #%u",
+			err == 1 ? "creation" : "serialization", i+1);
+		return NULL;
+	}
+	return ret;
+}
+
+/*
+  Sign a 32-byte message hash as Bitcoin Core does: RFC6979 deterministic nonce, low S, and
+  'grinding' of the nonce with an incrementing counter as extra entropy until R is low (the
+  first byte of its 32-byte serialization is less than 0x80).  Writes the DER signature to
+  'der' (at least 72 bytes) and its length to 'derlen'.
+*/
+static int sign_hash(const unsigned char *hash, const unsigned char *privkey,
+		unsigned char *der, size_t *derlen) {
+	secp256k1_ecdsa_signature sig;
+	unsigned char extra_entropy[32] = {0};
+	unsigned char compact[64];
+	uint32_t counter = 0;
+	if (secp256k1_ecdsa_sign(ctx, &sig, hash, privkey, secp256k1_nonce_function_rfc6979, NULL) != 1) {
+		return 0;
+	}
+	for (;;) {
+		secp256k1_ecdsa_signature_serialize_compact(ctx, compact, &sig);
+		if (compact[0] < 0x80) {
+			break;
+		}
+		counter++;
+		extra_entropy[0] = counter & 0xff;
+		extra_entropy[1] = (counter >> 8) & 0xff;
+		extra_entropy[2] = (counter >> 16) & 0xff;
+		extra_entropy[3] = (counter >> 24) & 0xff;
+		if (secp256k1_ecdsa_sign(ctx, &sig, hash, privkey,
+				secp256k1_nonce_function_rfc6979, extra_entropy) != 1) {
+			return 0;
+		}
+	}
+	*derlen = 72;
+	return secp256k1_ecdsa_signature_serialize_der(ctx, der, derlen, &sig);
+}
+
+static PyObject * sign(PyObject *self, PyObject *args) {
+	const unsigned char * hash;
+	const unsigned char * privkey;
+	Py_ssize_t hlen, klen;
+	if (!PyArg_ParseTuple(args, "y#y#", &hash, &hlen, &privkey, &klen)) {
+		PyErr_SetString(PyExc_ValueError, "Unable to parse extension mod arguments");
+		return NULL;
+	}
+	if (hlen != 32 || klen != 32) {
+		PyErr_SetString(PyExc_ValueError, "Hash or private key length not 32 bytes");
+		return NULL;
+	}
+	if (!init_ctx()) {
+		return NULL;
+	}
+	unsigned char der[72];
+	size_t derlen;
+	if (sign_hash(hash, privkey, der, &derlen) != 1) {
+		PyErr_SetString(PyExc_RuntimeError, "Signing failed");
+		return NULL;
+	}
+	return Py_BuildValue("y#", der, (Py_ssize_t)derlen);
+}
+
+/*
+  Sign 'count' hashes from a buffer of 'count' concatenated 32-byte hashes with the keys in a
+  buffer of 'count' concatenated 32-byte privkeys.  Returns a tuple of DER signatures.
+*/
+static PyObject * sign_many(PyObject *self, PyObject *args) {
+	const unsigned char * hashes;
+	const unsigned char * privkeys;
+	Py_ssize_t hlen, klen;
+	unsigned int count;
+	if (!PyArg_ParseTuple(args, "y#y#I", &hashes, &hlen, &privkeys, &klen, &count)) {
+		PyErr_SetString(PyExc_ValueError, "Unable to parse extension mod arguments");
+		return NULL;
+	}
+	if (hlen != (Py_ssize_t)count * 32 || klen != (Py_ssize_t)count * 32) {
+		PyErr_SetString(PyExc_ValueError, "Hash or private key buffer length not 32 * count bytes");
+		return NULL;
+	}
+	if (!init_ctx()) {
+		return NULL;
+	}
+	unsigned char *ders = PyMem_Malloc((size_t)count * 72 + 1);
+	size_t *derlens = PyMem_Malloc((size_t)count * sizeof(size_t) + 1);
+	if (ders == NULL || derlens == NULL) {
+		PyMem_Free(ders);
+		PyMem_Free(derlens);
+		return PyErr_NoMemory();
+	}
+	unsigned int i, err = 0;
+	Py_BEGIN_ALLOW_THREADS
+	for (i = 0; i < count; i++) {
+		if (sign_hash(hashes + i*32, privkeys + i*32, ders + i*72, derlens + i) != 1) {
+			err = 1;
+			break;
+		}
+	}
+	Py_END_ALLOW_THREADS
+	PyObject *ret = NULL;
+	if (err) {
+		PyErr_Format(PyExc_RuntimeError, "Signing failed for hash #%u", i+1);
+	} else if ((ret = PyTuple_New(count)) != NULL) {
+		for (i = 0; i < count; i++) {
+			PyObject *sig = PyBytes_FromStringAndSize((const char *)(ders + i*72), (Py_ssize_t)derlens[i]);
+			if (sig == NULL) {
+				Py_CLEAR(ret);
+				break;
+			}
+			PyTuple_SET_ITEM(ret, i, sig);
+		}
+	}
+	PyMem_Free(ders);
+	PyMem_Free(derlens);
+	return ret;
 }
 
 /* https://docs.python.org/3/howto/cporting.html */
@@ -65,6 +238,9 @@ struct module_state {
 
 static PyMethodDef secp256k1_methods[] = {
 	{"priv2pub", priv2pub, METH_VARARGS, "Generate pubkey from privkey using libsecp256k1"},
+	{"priv2pub_many", priv2pub_many, METH_VARARGS, "Generate pubkeys from a buffer of privkeys using libsecp256k1"},
+	{"sign", sign, METH_VARARGS, "Sign a hash with a privkey using libsecp256k1, returning a DER signature"},
+	{"sign_many", sign_many, METH_VARARGS, "Sign a buffer of hashes with a buffer of privkeys using libsecp256k1"},
     {NULL, NULL}
 };
 
@@ -20,6 +20,7 @@
 addr.py:  Address generation/display routines for the MMGen suite
 """
 
+import json,bisect
 from hashlib import sha256,sha512
 from mmgen.common import *
 from mmgen.obj import *
@@ -50,11 +51,24 @@ class AddrGenerator(MMGenObject):
 		me.desc = gen_methods
 		return me
 
+	def to_addr_batch(self,pubkeys):
+		"generate a list of addresses from a list of public keys"
+		return [self.to_addr(k) for k in pubkeys]
+
+	def to_viewkey_batch(self,pubkeys):
+		"generate a list of view keys from a list of public keys"
+		return [self.to_viewkey(k) for k in pubkeys]
+
+	def to_addr_viewkey_batch(self,pubkeys):
+		"generate lists of addresses and view keys from a list of public keys"
+		return self.to_addr_batch(pubkeys),self.to_viewkey_batch(pubkeys)
+
 class AddrGeneratorP2PKH(AddrGenerator):
 	def to_addr(self,pubhex):
-		from mmgen.protocol import hash160
+		from mmgen.protocol import hash160_bytes
 		assert type(pubhex) == PubKey
-		return CoinAddr(g.proto.pubhash2addr(hash160(pubhex),p2sh=False))
+		pubhash = hash160_bytes(pubhex.bytes)
+		return CoinAddr.from_generated(g.proto.pubhash2addr_bytes(pubhash,p2sh=False),'p2pkh',pubhash.hex())
 
 	def to_segwit_redeem_script(self,pubhex):
 		raise NotImplementedError('Segwit redeem script not supported by this address type')
@@ -62,7 +76,9 @@ class AddrGeneratorP2PKH(AddrGenerator):
 class AddrGeneratorSegwit(AddrGenerator):
 	def to_addr(self,pubhex):
 		assert pubhex.compressed,'Uncompressed public keys incompatible with Segwit'
-		return CoinAddr(g.proto.pubhex2segwitaddr(pubhex))
+		from mmgen.protocol import hash160_bytes
+		script_hash = hash160_bytes(g.proto.pubkey2redeem_script_bytes(pubhex.bytes))
+		return CoinAddr.from_generated(g.proto.pubhash2addr_bytes(script_hash,p2sh=True),'p2sh',script_hash.hex())
 
 	def to_segwit_redeem_script(self,pubhex):
 		assert pubhex.compressed,'Uncompressed public keys incompatible with Segwit'
@@ -71,8 +87,9 @@ class AddrGeneratorSegwit(AddrGenerator):
 class AddrGeneratorBech32(AddrGenerator):
 	def to_addr(self,pubhex):
 		assert pubhex.compressed,'Uncompressed public keys incompatible with Segwit'
-		from mmgen.protocol import hash160
-		return CoinAddr(g.proto.pubhash2bech32addr(hash160(pubhex)))
+		from mmgen.protocol import hash160_bytes
+		pubhash = hash160_bytes(pubhex.bytes)
+		return CoinAddr.from_generated(g.proto.pubhash2bech32addr_bytes(pubhash),'bech32',pubhash.hex())
 
 	def to_segwit_redeem_script(self,pubhex):
 		raise NotImplementedError('Segwit redeem script not supported by this address type')
@@ -84,8 +101,10 @@ class AddrGeneratorEthereum(AddrGenerator):
 		try:
 			assert not g.use_internal_keccak_module
 			from sha3 import keccak_256
+			self.keccak_256_many = None
 		except:
-			from mmgen.keccak import keccak_256
+			from mmgen.keccak import keccak_256,keccak_256_many
+			self.keccak_256_many = keccak_256_many
 		self.keccak_256 = keccak_256
 
 		from mmgen.protocol import hash256
@@ -95,7 +114,16 @@ class AddrGeneratorEthereum(AddrGenerator):
 
 	def to_addr(self,pubhex):
 		assert type(pubhex) == PubKey
-		return CoinAddr(self.keccak_256(bytes.fromhex(pubhex[2:])).hexdigest()[24:])
+		return self.make_addr(self.keccak_256(pubhex.bytes[1:]).digest())
+
+	def to_addr_batch(self,pubkeys):
+		if self.keccak_256_many: # the internal module hashes batches of keys much faster
+			return [self.make_addr(d) for d in self.keccak_256_many([k.bytes[1:] for k in pubkeys])]
+		return [self.to_addr(k) for k in pubkeys]
+
+	def make_addr(self,pubkey_digest):
+		addr = pubkey_digest[12:].hex()
+		return CoinAddr.from_generated(addr,'ethereum',addr)
 
 	def to_wallet_passwd(self,sk_hex):
 		return WalletPassword(self.hash256(sk_hex)[:32])
@@ -109,35 +137,69 @@ class AddrGeneratorZcashZ(AddrGenerator):
 	addr_width = 95
 	vk_width = 97
 
-	def zhash256(self,s,t):
+	@staticmethod
+	def zhash_block(s,t):
 		s = bytearray(s + bytes(32))
 		s[0] |= 0xc0
 		s[32] = t
-		from mmgen.sha2 import Sha256
-		return Sha256(s,preprocess=False).digest()
+		return s
 
-	def to_addr(self,pubhex): # pubhex is really privhex
-		key = bytes.fromhex(pubhex)
+	def zhash256(self,s,t):
+		from mmgen.sha2 import sha256_compress
+		return sha256_compress(self.zhash_block(s,t))
+
+	def zhashes_batch(self,pubkeys):
+		"""
+		return the (zhash256(key,0),zhash256(key,1)) pairs for a list of keys, using the batch
+		SHA256Compress
+		"""
+		keys = [self.privkey_bytes(k) for k in pubkeys]
+		from mmgen.sha2 import sha256_compress_many
+		h = sha256_compress_many([self.zhash_block(k,t) for t in (0,1) for k in keys])
+		return list(zip(h[:len(keys)],h[len(keys):]))
+
+	@staticmethod
+	def privkey_bytes(pubhex): # pubhex is really privhex
+		key = pubhex.bytes
 		assert len(key) == 32,'{}: incorrect privkey length'.format(len(key))
+		return key
+
+	def make_addr(self,zh0,zh1):
 		from nacl.bindings import crypto_scalarmult_base
-		p2 = crypto_scalarmult_base(self.zhash256(key,1))
-		from mmgen.protocol import _b58chk_encode
-		ret = _b58chk_encode(g.proto.addr_ver_num['zcash_z'][0] + (self.zhash256(key,0)+p2).hex())
+		p2 = crypto_scalarmult_base(zh1)
+		from mmgen.protocol import _b58chk_encode_bytes
+		ret = _b58chk_encode_bytes(bytes.fromhex(g.proto.addr_ver_num['zcash_z'][0]) + zh0 + p2)
 		assert len(ret) == self.addr_width,'Invalid Zcash z-address length'
 		return CoinAddr(ret)
 
-	def to_viewkey(self,pubhex): # pubhex is really privhex
-		key = bytes.fromhex(pubhex)
-		assert len(key) == 32,'{}: incorrect privkey length'.format(len(key))
-		vk = bytearray(self.zhash256(key,0)+self.zhash256(key,1))
+	def make_viewkey(self,zh0,zh1):
+		vk = bytearray(zh0+zh1)
 		vk[32] &= 0xf8
 		vk[63] &= 0x7f
 		vk[63] |= 0x40
-		from mmgen.protocol import _b58chk_encode
-		ret = _b58chk_encode(g.proto.addr_ver_num['viewkey'][0] + vk.hex())
+		from mmgen.protocol import _b58chk_encode_bytes
+		ret = _b58chk_encode_bytes(bytes.fromhex(g.proto.addr_ver_num['viewkey'][0]) + vk)
 		assert len(ret) == self.vk_width,'Invalid Zcash view key length'
 		return ZcashViewKey(ret)
 
+	def to_addr(self,pubhex):
+		key = self.privkey_bytes(pubhex)
+		return self.make_addr(self.zhash256(key,0),self.zhash256(key,1))
+
+	def to_viewkey(self,pubhex):
+		key = self.privkey_bytes(pubhex)
+		return self.make_viewkey(self.zhash256(key,0),self.zhash256(key,1))
+
+	def to_addr_batch(self,pubkeys):
+		return [self.make_addr(*h) for h in self.zhashes_batch(pubkeys)]
+
+	def to_viewkey_batch(self,pubkeys):
+		return [self.make_viewkey(*h) for h in self.zhashes_batch(pubkeys)]
+
+	def to_addr_viewkey_batch(self,pubkeys): # addresses and view keys are made from the same hashes
+		zh = self.zhashes_batch(pubkeys)
+		return [self.make_addr(*h) for h in zh],[self.make_viewkey(*h) for h in zh]
+
 	def to_segwit_redeem_script(self,pubhex):
 		raise NotImplementedError('Zcash z-addresses incompatible with Segwit')
 
@@ -157,14 +219,13 @@ class AddrGeneratorMonero(AddrGenerator):
 
 		if opt.use_old_ed25519:
 			from mmgen.ed25519 import edwards,encodepoint,B,scalarmult
+			self.edwards     = edwards
+			self.encodepoint = encodepoint
+			self.scalarmult  = scalarmult
+			self.B           = B
 		else:
-			from mmgen.ed25519ll_djbec import scalarmult
-			from mmgen.ed25519 import edwards,encodepoint,B
-
-		self.edwards     = edwards
-		self.encodepoint = encodepoint
-		self.scalarmult  = scalarmult
-		self.B           = B
+			from mmgen.ed25519ll_djbec import scalarmult_base_encoded_many
+			self.scalarmult_base_encoded_many = scalarmult_base_encoded_many
 
 		return AddrGenerator.__init__(addr_type)
 
@@ -175,7 +236,10 @@ class AddrGeneratorMonero(AddrGenerator):
 		b = enc((addr_bytes[l-l%8:]).hex(),'b58',pad=7,tostr=True)
 		return a + b
 
-	def to_addr(self,sk_hex): # sk_hex instead of pubhex
+	def pubkeys_encoded(self,scalars):
+		"return the encoded public keys for a list of scalars"
+		if not opt.use_old_ed25519:
+			return self.scalarmult_base_encoded_many(scalars)
 
 		# Source and license for scalarmultbase function:
 		#   https://github.com/bigreddmachine/MoneroPy/blob/master/moneropy/crypto/ed25519.py
@@ -188,15 +252,24 @@ class AddrGeneratorMonero(AddrGenerator):
 			if e & 1: Q = self.edwards(Q, self.B)
 			return Q
 
-		def hex2int_le(hexstr):
-			return int((bytes.fromhex(hexstr)[::-1]).hex(),16)
+		return [self.encodepoint(scalarmultbase(e)) for e in scalars]
+
+	def to_addr(self,sk_hex): # sk_hex instead of pubhex
+		return self.to_addr_batch([sk_hex])[0]
 
-		vk_hex = self.to_viewkey(sk_hex)
-		pk_str  = self.encodepoint(scalarmultbase(hex2int_le(sk_hex)))
-		pvk_str = self.encodepoint(scalarmultbase(hex2int_le(vk_hex)))
-		addr_p1 = bytes.fromhex(g.proto.addr_ver_num['monero'][0]) + pk_str + pvk_str
+	def to_addr_batch(self,sk_hexes):
 
-		return CoinAddr(self.b58enc(addr_p1 + self.keccak_256(addr_p1).digest()[:4]))
+		def hex2int_le(hexstr):
+			return int.from_bytes(bytes.fromhex(hexstr),'little')
+
+		vk_hexes = [self.to_viewkey(sk_hex) for sk_hex in sk_hexes]
+		pks = self.pubkeys_encoded([hex2int_le(k) for k in list(sk_hexes) + vk_hexes])
+		ver = bytes.fromhex(g.proto.addr_ver_num['monero'][0])
+		ret = []
+		for pk_str,pvk_str in zip(pks,pks[len(sk_hexes):]):
+			addr_p1 = ver + pk_str + pvk_str
+			ret.append(CoinAddr(self.b58enc(addr_p1 + self.keccak_256(addr_p1).digest()[:4])))
+		return ret
 
 	def to_wallet_passwd(self,sk_hex):
 		return WalletPassword(self.hash256(sk_hex)[:32])
@@ -219,12 +292,15 @@ class KeyGenerator(MMGenObject):
 		else:
 			raise TypeError('{}: incorrect argument type for {}()'.format(type(addr_type),cls.__name__))
 		if pubkey_type == 'std':
-			if cls.test_for_secp256k1(silent=silent) and generator != 1:
-				if not opt.key_generator or opt.key_generator == 2 or generator == 2:
-					return super(cls,cls).__new__(KeyGeneratorSecp256k1)
-			else:
+			gen = generator or opt.key_generator or g.key_generator
+			if gen == 2 and not cls.test_for_secp256k1(silent=silent):
+				if not silent:
+					qmsg('secp256k1 extension module unavailable, using pure-Python secp256k1 code')
+				gen = 3
+			if gen == 1:
 				qmsg('Using (slow) native Python ECDSA library for address generation')
-				return super(cls,cls).__new__(KeyGeneratorPython)
+			return super(cls,cls).__new__(
+				(KeyGeneratorPython,KeyGeneratorSecp256k1,KeyGeneratorSecp256k1Python)[gen-1])
 		elif pubkey_type in ('zcash_z','monero'):
 			me = super(cls,cls).__new__(KeyGeneratorDummy)
 			me.desc = 'mmgen-'+pubkey_type
@@ -242,6 +318,10 @@ class KeyGenerator(MMGenObject):
 		except:
 			return False
 
+	def to_pubhex_batch(self,privkeys):
+		"generate a list of public keys from a list of private keys"
+		return [self.to_pubhex(k) for k in privkeys]
+
 import ecdsa
 class KeyGeneratorPython(KeyGenerator):
 
@@ -283,13 +363,67 @@ class KeyGeneratorSecp256k1(KeyGenerator):
 	def to_pubhex(self,privhex):
 		assert type(privhex) == PrivKey
 		from mmgen.secp256k1 import priv2pub
-		return PubKey(priv2pub(bytes.fromhex(privhex),int(privhex.compressed)).hex(),compressed=privhex.compressed)
+		return PubKey.from_bytes(priv2pub(privhex.bytes,int(privhex.compressed)),privhex.compressed)
+
+	def to_pubhex_batch(self,privkeys):
+		try:
+			from mmgen.secp256k1 import priv2pub_many
+		except ImportError: # extension module built without batch support
+			return KeyGenerator.to_pubhex_batch(self,privkeys)
+		pubs = {}
+		for compressed in {k.compressed for k in privkeys}: # normally all keys are of one type
+			keys = [k for k in privkeys if k.compressed == compressed]
+			buf = priv2pub_many(b''.join(k.bytes for k in keys),len(keys),int(compressed))
+			pubs[compressed] = iter(PubKey.list_from_bytes(buf,(65,33)[compressed],compressed))
+		return [next(pubs[k.compressed]) for k in privkeys]
+
+class KeyGeneratorSecp256k1Python(KeyGenerator):
+	desc = 'mmgen-secp256k1-python'
+	def to_pubhex(self,privhex):
+		assert type(privhex) == PrivKey
+		return self.to_pubhex_batch([privhex])[0]
+
+	def to_pubhex_batch(self,privkeys):
+		from mmgen.secp256k1_python import priv2pub_many
+		ret = [None] * len(privkeys)
+		for compressed in {k.compressed for k in privkeys}: # normally all keys are of one type
+			idxs = [i for i,k in enumerate(privkeys) if k.compressed == compressed]
+			pubs = priv2pub_many([privkeys[i].bytes for i in idxs],compressed)
+			for i,pub in zip(idxs,pubs):
+				ret[i] = PubKey.from_bytes(pub,compressed)
+		return ret
 
 class KeyGeneratorDummy(KeyGenerator):
 	desc = 'mmgen-dummy'
 	def to_pubhex(self,privhex):
 		assert type(privhex) == PrivKey
-		return PubKey(privhex,compressed=privhex.compressed)
+		return PubKey.from_bytes(privhex.bytes,privhex.compressed)
+
+# Address generation workers for AddrList.add_addrs().  When run in a process pool,
+# workers are forked, so they inherit the parent's global and option state.
+_addrgen_worker_data = None
+
+def _addrgen_worker_init(mmtype,gen_viewkey,gen_wallet_passwd,in_process=False):
+	global _addrgen_worker_data
+	if not in_process:
+		opt.quiet = True
+	mmtype = MMGenAddrType(mmtype)
+	_addrgen_worker_data = (
+		mmtype,KeyGenerator(mmtype),AddrGenerator(mmtype),gen_viewkey,gen_wallet_passwd,in_process )
+
+def _addrgen_worker(secs):
+	mmtype,kg,ag,gen_viewkey,gen_wallet_passwd,in_process = _addrgen_worker_data
+	if not in_process: # keys are passed to pool workers as hex
+		secs = [PrivKey(bytes.fromhex(k),compressed=mmtype.compressed,pubkey_type=mmtype.pubkey_type)
+					for k in secs]
+	pubkeys = kg.to_pubhex_batch(secs)
+	none = [None] * len(secs)
+	addrs,viewkeys = ag.to_addr_viewkey_batch(pubkeys) if gen_viewkey else (ag.to_addr_batch(pubkeys),none)
+	ret = zip(
+		addrs,
+		viewkeys,
+		[ag.to_wallet_passwd(sec) for sec in secs] if gen_wallet_passwd else none )
+	return list(ret) if in_process else [tuple(str(e) if e else None for e in d) for d in ret]
 
 class AddrListEntry(MMGenListItem):
 	addr    = MMGenListItemAttr('addr','CoinAddr')
@@ -343,6 +477,84 @@ class AddrListIDStr(str,Hilite):
 
 		return str.__new__(cls,ret)
 
+class AddrChainCheckpoints(MMGenObject):
+	"""
+	On-disk store of every Kth state of the sha512 address index chain, allowing
+	generation of high indexes to resume from the nearest saved state.  States are
+	encrypted with a key derived from the scrambled seed, and the file is named
+	using a fingerprint of the scrambled seed, never the seed itself.
+	"""
+	subdir = 'addr_checkpoints'
+	chk_len = 8
+	iv_blocks = 8 # counter blocks reserved per round: a state and its check fill 5 AES blocks
+	version = 1
+
+	def __init__(self,scrambled_seed,al_id,interval,data_dir=None):
+		assert interval > 0,'{}: invalid checkpoint interval'.format(interval)
+		self.interval = interval
+		self.key = sha256(b'addrchain-checkpoint-key:' + scrambled_seed).digest()
+		fp = make_chksum_8(b'addrchain-checkpoint-id:' + scrambled_seed)
+		self.dir = os.path.join(data_dir or g.data_dir,self.subdir)
+		self.fn = os.path.join(self.dir,'{}-{}-{}.json'.format(fp,al_id.sid,al_id.mmtype))
+		self.states = self.load()
+		self.nums = sorted(self.states) # checkpoint round numbers, for bisection
+		self.changed = False
+
+	def iv(self,num):
+		"""
+		states are encrypted with AES-CTR, so the counter blocks used for each round must not
+		overlap those of any other round, whatever the interval
+		"""
+		return (num * self.iv_blocks).to_bytes(g.aesctr_iv_len,'big')
+
+	def state_chk(self,num,state):
+		return sha256(self.key + str(num).encode() + state).digest()[:self.chk_len]
+
+	def load(self):
+		try:
+			with open(self.fn) as f:
+				d = json.loads(f.read())
+		except:
+			return {}
+		if d.get('version') != self.version or d.get('interval') != self.interval:
+			return {}
+		return {int(k):v for k,v in d['states'].items()}
+
+	def save(self):
+		if not self.changed: return
+		check_or_create_dir(self.dir)
+		d = {'version':self.version,'interval':self.interval,'states':{str(k):self.states[k] for k in sorted(self.states)}}
+		with open(self.fn,'w') as f:
+			f.write(json.dumps(d))
+		os.chmod(self.fn,0o600)
+		self.changed = False
+
+	def get_state(self,num):
+		from mmgen.crypto import aesctr_crypt
+		if num not in self.states: return None
+		d = aesctr_crypt(bytes.fromhex(self.states[num]),self.key,self.iv(num))
+		state,chk = d[:-self.chk_len],d[-self.chk_len:]
+		return state if chk == self.state_chk(num,state) else None
+
+	def add_state(self,num,state):
+		if num % self.interval or num in self.states: return
+		from mmgen.crypto import aesctr_crypt
+		d = aesctr_crypt(state + self.state_chk(num,state),self.key,self.iv(num))
+		self.states[num] = d.hex()
+		bisect.insort(self.nums,num)
+		self.changed = True
+
+	def nearest(self,idx,cur=0):
+		"return the highest valid checkpoint (num,state) between round 'cur' and index 'idx', or None"
+		for i in range(bisect.bisect_left(self.nums,idx)-1,-1,-1):
+			num = self.nums[i]
+			if num <= cur: break
+			state = self.get_state(num)
+			if state:
+				dmsg_sc('checkpoint','{} (for index {})'.format(num,idx))
+				return num,state
+		return None
+
 class AddrList(MMGenObject): # Address info for a single seed ID
 	msgs = {
 	'file_header': """
@@ -434,52 +646,111 @@ Removed {{}} duplicate WIF key{{}} from keylist (also in {pnm} key-address file
 		compressed = self.al_id.mmtype.compressed
 		pubkey_type = self.al_id.mmtype.pubkey_type
 
-		gen_wallet_passwd = type(self) == KeyAddrList and 'wallet_passwd' in self.al_id.mmtype.extra_attrs
-		gen_viewkey       = type(self) == KeyAddrList and 'viewkey' in self.al_id.mmtype.extra_attrs
-
-		if self.gen_addrs:
-			kg = KeyGenerator(self.al_id.mmtype)
-			ag = AddrGenerator(self.al_id.mmtype)
-
-		t_addrs,num,pos,out = len(addrnums),0,0,AddrListList()
+		t_addrs,out = len(addrnums),AddrListList()
 		le = self.entry_type
 
-		while pos != t_addrs:
-			seed = sha512(seed).digest()
-			num += 1 # round
-
-			if num != addrnums[pos]: continue
-
-			pos += 1
+		for pos,(num,sec_bytes) in enumerate(self.walk_chain(seed,addrnums),1):
 
 			if not g.debug:
 				qmsg_r('\rGenerating {} #{} ({} of {})'.format(self.gen_desc,num,pos,t_addrs))
 
 			e = le(idx=num)
 
-			# Secret key is double sha256 of seed hash round /num/
-			e.sec = PrivKey(sha256(sha256(seed).digest()).digest(),compressed=compressed,pubkey_type=pubkey_type)
-
-			if self.gen_addrs:
-				pubhex = kg.to_pubhex(e.sec)
-				e.addr = ag.to_addr(pubhex)
-				if gen_viewkey:
-					e.viewkey = ag.to_viewkey(pubhex)
-				if gen_wallet_passwd:
-					e.wallet_passwd = ag.to_wallet_passwd(e.sec)
+			e.sec = PrivKey(sec_bytes,compressed=compressed,pubkey_type=pubkey_type)
 
 			if type(self) == PasswordList:
 				e.passwd = str(self.make_passwd(e.sec)) # TODO - own type
 				dmsg('Key {:>03}: {}'.format(pos,e.passwd))
 
 			out.append(e)
-			if g.debug_addrlist:
+
+		if self.gen_addrs:
+			self.add_addrs(out)
+
+		if g.debug_addrlist:
+			for e in out:
 				Msg('generate():\n{}'.format(e.ppformat()))
 
 		qmsg('\r{}: {} {}{} generated{}'.format(
 				self.al_id.hl(),t_addrs,self.gen_desc,suf(t_addrs,self.gen_desc_pl),' '*15))
 		return out
 
+	def walk_chain(self,seed,addrnums):
+		"""
+		Walk the sha512 address index chain from the scrambled seed, yielding an
+		(index,secret key bytes) pair for each index in 'addrnums'
+		"""
+		ckpts = AddrChainCheckpoints(seed,self.al_id,g.addr_checkpoint_interval) \
+					if g.addr_checkpoint_interval else None
+		t_addrs,num,pos,ckpt_pos = len(addrnums),0,0,None
+
+		while pos != t_addrs:
+			# skip ahead to nearest checkpoint, if any, unless the index is at most one checkpoint
+			# interval away
+			if ckpts and ckpt_pos != pos and addrnums[pos] - num > ckpts.interval:
+				ckpt_pos = pos
+				ret = ckpts.nearest(addrnums[pos],num)
+				if ret:
+					num,seed = ret
+
+			seed = sha512(seed).digest()
+			num += 1 # round
+
+			if ckpts: ckpts.add_state(num,seed)
+
+			if num != addrnums[pos]: continue
+
+			pos += 1
+
+			# Secret key is double sha256 of seed hash round /num/
+			yield num,sha256(sha256(seed).digest()).digest()
+
+		if ckpts: ckpts.save()
+
+	def add_addrs(self,data):
+		"""
+		Generate addresses (and viewkeys, wallet passwords) for the list entries in
+		'data'.  Keys are processed in chunks using the key generator's batch API.
+		With '--jobs', chunks are sent to a pool of worker processes and results are
+		merged in index order, so output is identical to that of serial generation.
+		"""
+		mmtype = self.al_id.mmtype
+		gen_viewkey       = type(self) == KeyAddrList and 'viewkey' in mmtype.extra_attrs
+		gen_wallet_passwd = type(self) == KeyAddrList and 'wallet_passwd' in mmtype.extra_attrs
+
+		jobs = get_jobs('address generation')
+		t_addrs = len(data)
+		chunk_size = max(1,min(1000,t_addrs // (jobs*4)))
+		chunks = [[e.sec for e in data[i:i+chunk_size]] for i in range(0,t_addrs,chunk_size)]
+		worker_args = (str(mmtype),gen_viewkey,gen_wallet_passwd)
+
+		def do_add(results):
+			pos = 0
+			for res in results:
+				for addr,viewkey,wallet_passwd in res:
+					e = data[pos]
+					e.addr = addr
+					if viewkey: e.viewkey = viewkey
+					if wallet_passwd: e.wallet_passwd = wallet_passwd
+					pos += 1
+				qmsg_r('\rGenerating {}{} ({} of {}{})'.format(
+					self.gen_desc,self.gen_desc_pl,pos,t_addrs,
+					', {} processes'.format(jobs) if jobs > 1 else ''))
+			assert pos == t_addrs,'{} != {}: incorrect number of addresses generated'.format(pos,t_addrs)
+
+		if jobs == 1:
+			_addrgen_worker_init(*worker_args,in_process=True)
+			do_add(map(_addrgen_worker,chunks))
+		else:
+			import multiprocessing as mp
+			from concurrent.futures import ProcessPoolExecutor
+			with ProcessPoolExecutor(
+					max_workers = jobs,
+					mp_context  = mp.get_context('fork'),
+					initializer = _addrgen_worker_init,
+					initargs    = worker_args ) as ex:
+				do_add(ex.map(_addrgen_worker,[[k.orig_hex for k in c] for c in chunks]))
+
 	def check_format(self,addr): return True # format is checked when added to list entry object
 
 	def scramble_seed(self,seed):
@@ -523,48 +794,74 @@ Removed {{}} duplicate WIF key{{}} from keylist (also in {pnm} key-address file
 	def comments(self):
 		return [e.label for e in self.data]
 
+	# idx->entry and addr->entry maps are built on first lookup and discarded whenever
+	# the list changes.  Code that modifies self.data in place must call invalidate_maps()
+	@property
+	def data(self):
+		return self._data
+
+	@data.setter
+	def data(self,val):
+		self._data = val
+		self.invalidate_maps()
+
+	def invalidate_maps(self):
+		self._idx_map = None
+		self._addr_map = None
+
+	@property
+	def idx_map(self):
+		if self._idx_map is None:
+			self._idx_map = {e.idx:e for e in self._data}
+		return self._idx_map
+
+	@property
+	def addr_map(self):
+		if self._addr_map is None:
+			self._addr_map = {e.addr:e for e in self._data if e.addr}
+		return self._addr_map
+
 	def entry(self,idx):
-		for e in self.data:
-			if idx == e.idx: return e
+		return self.idx_map.get(idx)
+
+	def entry_by_addr(self,coinaddr):
+		return self.addr_map.get(coinaddr)
 
 	def coinaddr(self,idx):
-		for e in self.data:
-			if idx == e.idx: return e.addr
+		e = self.idx_map.get(idx)
+		if e: return e.addr
 
 	def comment(self,idx):
-		for e in self.data:
-			if idx == e.idx: return e.label
+		e = self.idx_map.get(idx)
+		if e: return e.label
 
 	def set_comment(self,idx,comment):
-		for e in self.data:
-			if idx == e.idx:
-				e.label = comment
+		e = self.idx_map.get(idx)
+		if e: e.label = comment
 
 	def make_reverse_dict(self,coinaddrs):
-		d,b = MMGenDict(),coinaddrs
-		for e in self.data:
-			try:
-				d[b[b.index(e.addr)]] = MMGenID('{}:{}'.format(self.al_id,e.idx)),e.label
-			except: pass
+		d,amap = MMGenDict(),self.addr_map
+		for a in coinaddrs:
+			e = amap.get(a)
+			if e:
+				d[a] = MMGenID('{}:{}'.format(self.al_id,e.idx)),e.label
 		return d
 
 	def remove_dup_keys(self,cmplist):
 		assert self.has_keys
-		pop_list = []
-		for n,d in enumerate(self.data):
-			for e in cmplist.data:
-				if e.sec.wif == d.sec.wif:
-					pop_list.append(n)
-		for n in reversed(pop_list): self.data.pop(n)
-		if pop_list:
-			vmsg(self.msgs['removed_dup_keys'].format(len(pop_list),suf(removed)))
+		wifs = {e.sec.wif for e in cmplist.data}
+		data = AddrListList([d for d in self.data if d.sec.wif not in wifs])
+		removed = len(self.data) - len(data)
+		if removed:
+			self.data = data
+			vmsg(self.msgs['removed_dup_keys'].format(removed,suf(removed)))
 
 	def add_wifs(self,key_list):
 		if not key_list: return
+		secs = {e.addr:e.sec for e in key_list.data if e.addr and e.sec}
 		for d in self.data:
-			for e in key_list.data:
-				if e.addr and e.sec and e.addr == d.addr:
-					d.sec = e.sec
+			if d.addr in secs:
+				d.sec = secs[d.addr]
 
 	def list_missing(self,key):
 		return [d.addr for d in self.data if not getattr(d,key)]
@@ -575,12 +872,15 @@ Removed {{}} duplicate WIF key{{}} from keylist (also in {pnm} key-address file
 		kg = KeyGenerator(t.pubkey_type)
 		ag = AddrGenerator(t.gen_method)
 		d = self.data
-		for n,e in enumerate(d,1):
+		for n in range(0,len(d),1000):
 			qmsg_r('\rGenerating addresses from keylist: {}/{}'.format(n,len(d)))
-			e.addr = ag.to_addr(kg.to_pubhex(e.sec))
-			if g.debug_addrlist:
-				Msg('generate_addrs_from_keys():\n{}'.format(e.ppformat()))
-		qmsg('\rGenerated addresses from keylist: {}/{} '.format(n,len(d)))
+			chunk = d[n:n+1000]
+			for e,pubhex in zip(chunk,kg.to_pubhex_batch([e.sec for e in chunk])):
+				e.addr = ag.to_addr(pubhex)
+				if g.debug_addrlist:
+					Msg('generate_addrs_from_keys():\n{}'.format(e.ppformat()))
+		qmsg('\rGenerated addresses from keylist: {}/{} '.format(len(d),len(d)))
+		self.invalidate_maps()
 
 	def format(self,enable_comments=False):
 
@@ -914,15 +1214,17 @@ re-import your addresses.
 			return self.al_ids[al_id]
 
 	def mmaddr2coinaddr(self,mmaddr):
-		al_id,idx = MMGenID(mmaddr).rsplit(':',1)
+		mmid = MMGenID(mmaddr)
 		coinaddr = ''
-		if al_id in self.al_ids:
-			coinaddr = self.addrlist(al_id).coinaddr(int(idx))
+		if mmid.al_id in self.al_ids:
+			coinaddr = self.al_ids[mmid.al_id].coinaddr(mmid.idx)
 		return coinaddr or None
 
 	def coinaddr2mmaddr(self,coinaddr):
-		d = self.make_reverse_dict([coinaddr])
-		return (list(d.values())[0][0]) if d else None
+		for al_id,al in self.al_ids.items():
+			e = al.entry_by_addr(coinaddr)
+			if e: return MMGenID('{}:{}'.format(al_id,e.idx))
+		return None
 
 	@classmethod
 	def get_tw_data(cls,wallet=None):
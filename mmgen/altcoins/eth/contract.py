@@ -72,6 +72,13 @@ class Token(MMGenObject): # ERC20
 	def balance(self,acct_addr):
 		return ETHAmt(self.do_call('balanceOf(address)',acct_addr.rjust(64,'0'),toUnit=True))
 
+	def balances(self,acct_addrs):
+		"balances of all addresses in 'acct_addrs', fetched with batched eth_call requests"
+		data = '0x' + create_method_id('balanceOf(address)')
+		ret = g.rpch.batch_request('eth_call',[[{ 'to': '0x'+self.addr, 'data': data+a.rjust(64,'0') }]
+													for a in acct_addrs])
+		return [ETHAmt(int(r,16) * self.base_unit) for r in ret]
+
 	def strip(self,s):
 		return ''.join([chr(b) for b in s if 32 <= b <= 127]).strip()
 
@@ -45,6 +45,10 @@ class EthereumTrackingWallet(TrackingWallet):
 	def is_in_wallet(self,addr):
 		return addr in self.data_root
 
+	def get_label_map(self):
+		return { addr: (d['mmid'] + ' ' + d['comment']).rstrip()
+			for addr,d in self.data_root.items() if addr not in ('params','coin') }
+
 	def init_empty(self):
 		self.data = { 'coin': g.coin, 'accounts': {}, 'tokens': {} }
 
@@ -90,6 +94,9 @@ class EthereumTrackingWallet(TrackingWallet):
 	def rpc_get_balance(self,addr):
 		return ETHAmt(int(g.rpch.eth_getBalance('0x'+addr),16),'wei')
 
+	def rpc_get_balances(self,addrs):
+		return [ETHAmt(int(r,16),'wei') for r in g.rpch.batch_request('eth_getBalance',[['0x'+a] for a in addrs])]
+
 	@write_mode
 	def import_address(self,addr,label,foo):
 		r = self.data_root
@@ -231,6 +238,9 @@ class EthereumTokenTrackingWallet(EthereumTrackingWallet):
 	def rpc_get_balance(self,addr):
 		return Token(self.token,self.decimals).balance(addr)
 
+	def rpc_get_balances(self,addrs):
+		return Token(self.token,self.decimals).balances(addrs)
+
 	def get_eth_balance(self,addr,force_rpc=False):
 		cache = self.cur_eth_balances
 		data_root = self.data['accounts']
@@ -240,6 +250,14 @@ class EthereumTokenTrackingWallet(EthereumTrackingWallet):
 			self.cache_balance(addr,ret,cache,data_root)
 		return ret
 
+	def get_eth_balances(self,addrs,force_rpc=False):
+		return self.get_balances_common(
+			addrs,
+			force_rpc,
+			lambda a: EthereumTrackingWallet.rpc_get_balances(self,a),
+			self.cur_eth_balances,
+			self.data['accounts'] )
+
 	def force_set_param(self,*args,**kwargs):
 		mode_save = self.mode
 		self.mode = 'w'
@@ -273,7 +291,8 @@ Actions:         [q]uit view, [p]rint to file, pager [v]iew, [w]ide view,
 		'a':'s_amt','d':'s_addr','r':'d_reverse','M':'s_twmmid',
 		'm':'d_mmid','e':'d_redraw',
 		'q':'a_quit','p':'a_print','v':'a_view','w':'a_view_wide',
-		'l':'a_lbl_add','D':'a_addr_delete','R':'a_balance_refresh' }
+		'l':'a_lbl_add','D':'a_addr_delete','R':'a_balance_refresh',
+		'n':'d_next_page','b':'d_prev_page' }
 
 	def __init__(self,*args,**kwargs):
 		if g.use_cached_balances:
@@ -288,10 +307,11 @@ Actions:         [q]uit view, [p]rint to file, pager [v]iew, [w]ide view,
 		wl = self.wallet.sorted_list
 		if self.addrs:
 			wl = [d for d in wl if d['addr'] in self.addrs]
+		bals = self.wallet.get_balances([d['addr'] for d in wl])
 		return [{
 				'account': TwLabel(d['mmid']+' '+d['comment'],on_fail='raise'),
 				'address': d['addr'],
-				'amount': self.wallet.get_balance(d['addr']),
+				'amount': bals[d['addr']],
 				'confirmations': 0, # TODO
 				} for d in wl]
 
@@ -305,8 +325,9 @@ class EthereumTokenTwUnspentOutputs(EthereumTwUnspentOutputs):
 
 	def get_unspent_data(self):
 		super().get_unspent_data()
+		bals = self.wallet.get_eth_balances([e.addr for e in self.unspent])
 		for e in self.unspent:
-			e.amt2 = self.wallet.get_eth_balance(e.addr)
+			e.amt2 = bals[e.addr]
 
 class EthereumTwAddrList(TwAddrList):
 
@@ -315,13 +336,16 @@ class EthereumTwAddrList(TwAddrList):
 		self.wallet = wallet or TrackingWallet(mode='w')
 		tw_dict = self.wallet.mmid_ordered_dict
 		self.total = g.proto.coin_amt('0')
+		usr_addr_list = set(usr_addr_list) # hashed lookup, as the wallet may be large
 
 		from mmgen.obj import CoinAddr
-		for mmid,d in list(tw_dict.items()):
+		labels = [(TwLabel(mmid+' '+d['comment'],on_fail='raise'),d) for mmid,d in tw_dict.items()]
+		if usr_addr_list:
+			labels = [(label,d) for label,d in labels if label.mmid in usr_addr_list]
+		bals = self.wallet.get_balances([d['addr'] for label,d in labels])
+		for label,d in labels:
 #			if d['confirmations'] < minconf: continue # cannot get confirmations for eth account
-			label = TwLabel(mmid+' '+d['comment'],on_fail='raise')
-			if usr_addr_list and (label.mmid not in usr_addr_list): continue
-			bal = self.wallet.get_balance(d['addr'])
+			bal = bals[d['addr']]
 			if bal == 0 and not showempty:
 				if not label.comment: continue
 				if not all_labels: continue
@@ -345,6 +369,7 @@ class EthereumTwGetBalance(TwGetBalance):
 
 	def create_data(self):
 		data = self.wallet.mmid_ordered_dict
+		bals = self.wallet.get_balances([v['addr'] for v in data.values()])
 		for d in data:
 			if d.type == 'mmgen':
 				key = d.obj.sid
@@ -354,7 +379,7 @@ class EthereumTwGetBalance(TwGetBalance):
 				key = 'Non-MMGen'
 
 			conf_level = 2 # TODO
-			amt = self.wallet.get_balance(data[d]['addr'])
+			amt = bals[data[d]['addr']]
 
 			self.data['TOTAL'][conf_level] += amt
 			self.data[key][conf_level] += amt
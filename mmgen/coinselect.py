@@ -0,0 +1,227 @@
+#!/usr/bin/env python3
+#
+# mmgen = Multi-Mode GENerator, command-line Bitcoin cold storage solution
+# Copyright (C)2013-2019 The MMGen Project <mmgen@tuta.io>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+coinselect: Automatic transaction input selection for the MMGen suite
+"""
+
+import time
+from bisect import bisect_left,bisect_right
+from mmgen.obj import MMGenObject
+
+class CoinSelector(MMGenObject):
+	"""
+	Select inputs from a set of unspent outputs.  Amounts are integers in the coin's
+	minimum unit, and input sizes are weights (4 times the non-witness size plus the
+	witness size).  The fee rate is in minimum coin units per (virtual) byte.
+
+	Each input's effective value is its amount minus the fee for spending it.  Inputs
+	are indexed by effective value, so the candidates for a given target are found by
+	bisection rather than by scanning the whole set.
+
+	Strategies:
+	  'bnb':         branch-and-bound search for a selection whose effective value
+	                 matches the target closely enough that no change output is needed,
+	                 falling back to 'largest'
+	  'largest':     largest first, which minimizes the number of inputs, with the
+	                 smallest input replaced by the smallest one that still suffices
+	  'consolidate': enough inputs to fund the transaction, plus as many of the
+	                 smallest inputs as fit within 'max_weight' and 'max_fee'
+	"""
+	strategies = ('bnb','largest','consolidate')
+	max_tries = 100000    # branch-and-bound search steps
+	time_budget = 2.0     # seconds allowed for the branch-and-bound search
+	max_weight = 400000   # standard transaction weight limit
+
+	def __init__(self,amts,weights,target,fee_rate,
+			fixed_fee   = 0,
+			base_weight = 0,
+			chg_weight  = 0,
+			min_change  = 0,
+			max_fee     = None,
+			require_change = False ):
+		"""
+		'target' is the total of the transaction's outputs, excluding change.  'base_weight'
+		is the weight of the transaction without its inputs, including the change output,
+		whose weight is 'chg_weight'.  If 'require_change' is set, as when the change output
+		is the transaction's only output, no selection without change is returned
+		"""
+		self.amts = amts
+		self.weights = weights
+		self.fee_rate = fee_rate
+		self.base_weight = base_weight
+		self.chg_weight = chg_weight
+		self.target = target + fixed_fee
+		self.min_change = min_change
+		self.max_fee = max_fee
+		self.require_change = require_change
+
+		self.eff = [a - self.fee(w) for a,w in zip(amts,weights)]
+		# the index: inputs with positive effective value, sorted by effective value
+		self.by_value = sorted((i for i in range(len(amts)) if self.eff[i] > 0),key=self.eff.__getitem__)
+		self.values = [self.eff[i] for i in self.by_value]
+
+	def fee(self,weight):
+		"fee for 'weight', rounded up to the nearest minimum coin unit"
+		return -int(-self.fee_rate * weight // 4)
+
+	@property
+	def target_nochg(self):
+		"effective value required if the transaction has no change output"
+		return self.target + self.fee(self.base_weight - self.chg_weight)
+
+	@property
+	def target_chg(self):
+		"effective value required for a change output of at least 'min_change'"
+		return self.target + self.fee(self.base_weight) + self.min_change
+
+	@property
+	def cost_of_change(self):
+		"maximum excess value that may be added to the fee instead of creating a change output"
+		return self.target_chg - self.target_nochg
+
+	def select(self,strategy):
+		"""
+		return a list of indexes of the selected inputs and a flag indicating whether the
+		excess may be added to the fee instead of creating a change output, or None if
+		funds are insufficient or the inputs required exceed 'max_weight'
+		"""
+		assert strategy in self.strategies, "'{}': invalid strategy".format(strategy)
+		if strategy == 'bnb' and not self.require_change:
+			ret = self.bnb()
+			if ret:
+				return ret,True
+		return { 'bnb':         self.largest_first,
+				'largest':     self.largest_first,
+				'consolidate': self.consolidate }[strategy]()
+
+	def finish(self,sel):
+		"check that 'sel' funds the transaction, with or without change"
+		if self.base_weight + sum(self.weights[i] for i in sel) > self.max_weight:
+			return None
+		total = sum(self.eff[i] for i in sel)
+		if total >= self.target_chg:
+			return sel,False
+		if total >= self.target_nochg and not self.require_change:
+			return sel,True
+		return None
+
+	def bnb(self):
+		"""
+		depth-first search over the candidates in descending order of effective value, for
+		the selection with the smallest excess over the target, or with the fewest inputs
+		if excesses are equal.  Branches that can't reach the target or that exceed the
+		target by more than the cost of change are pruned.  Returns None if no match is
+		found within 'max_tries' steps or 'time_budget' seconds
+		"""
+		target = self.target_nochg
+		upper = target + self.cost_of_change
+		hi = bisect_right(self.values,upper)
+		vals = self.values[hi-1::-1] if hi else []
+		idxs = self.by_value[hi-1::-1] if hi else []
+
+		best,best_excess = None,upper - target + 1
+
+		# a single input in the range is found directly by bisection
+		j = bisect_left(self.values,target,0,hi)
+		if j < hi:
+			best,best_excess = [hi-1-j],self.values[j] - target
+
+		available = sum(vals)
+		if available < target:
+			return None
+
+		sel = []                 # inclusion flag for each candidate decided so far
+		cur = 0
+		t_end = time.time() + self.time_budget
+		for tries in range(self.max_tries):
+			if not tries & 0x3ff and time.time() > t_end:
+				break
+			backtrack = False
+			if cur + available < target or cur > upper:
+				backtrack = True
+			elif cur >= target:
+				excess = cur - target
+				n = sel.count(True)
+				if excess < best_excess or (excess == best_excess and n < len(best)):
+					best,best_excess = [k for k,f in enumerate(sel) if f],excess
+				if excess == 0:
+					break
+				backtrack = True
+
+			if backtrack:
+				# walk back to the last included candidate, then try omitting it
+				while sel and not sel[-1]:
+					sel.pop()
+					available += vals[len(sel)]
+				if not sel:
+					break
+				sel[-1] = False
+				cur -= vals[len(sel)-1]
+			else:
+				k = len(sel)
+				available -= vals[k]
+				# skip a candidate equal in value to the previous one if that was omitted
+				if sel and not sel[-1] and vals[k] == vals[k-1]:
+					sel.append(False)
+				else:
+					sel.append(True)
+					cur += vals[k]
+
+		return [idxs[k] for k in best] if best else None
+
+	def largest_first(self):
+		"""
+		select inputs in descending order of effective value until the target is reached,
+		then replace the smallest selected input with the smallest unselected one that
+		still suffices, found by bisection
+		"""
+		target,values,n = self.target_chg,self.values,len(self.values)
+		cur,pos = 0,n
+		while pos and cur < target:
+			pos -= 1
+			cur += values[pos]
+		if cur < target:
+			return self.finish(self.by_value[pos:])
+		deficit = target - (cur - values[pos])
+		j = bisect_left(values,deficit,0,pos)
+		if j < pos:
+			return self.finish([self.by_value[j]] + self.by_value[pos+1:])
+		return self.finish(self.by_value[pos:])
+
+	def consolidate(self):
+		"""
+		fund the transaction using the largest inputs, then add as many of the smallest
+		inputs as fit within 'max_weight' and 'max_fee'
+		"""
+		ret = self.largest_first()
+		if not ret:
+			return None
+		sel = ret[0]
+		weight = self.base_weight + sum(self.weights[i] for i in sel)
+		chosen = set(sel)
+		max_weight = self.max_weight
+		if self.max_fee is not None:
+			max_weight = min(max_weight,int(self.max_fee * 4 // self.fee_rate) if self.fee_rate else max_weight)
+		for i in self.by_value:
+			if weight + self.weights[i] > max_weight:
+				break
+			if i not in chosen:
+				sel.append(i)
+				weight += self.weights[i]
+		return self.finish(sel)
@@ -111,6 +111,18 @@ addresses of the form <seed ID>:<index>.
 
 To send the value of all inputs (minus TX fee) to a single output, specify
 one address with no amount on the command line.
+
+AUTOMATIC INPUT SELECTION: With the '--auto-inputs' option, the interactive
+menu is skipped and inputs are chosen from the {pnm} outputs in the tracking
+wallet using one of the following strategies:
+
+  bnb         - search for a set of inputs whose value matches the amount
+                to spend plus fee closely enough that no change output is
+                needed, falling back to 'largest' if none is found
+  largest     - spend the largest outputs first, minimizing the number of
+                inputs
+  consolidate - as 'largest', plus as many of the smallest outputs as will
+                fit in a standard-sized transaction
 """.format(g=g,pnm=g.proj_name,pnu=g.proto.name.capitalize()),
 		'fee': """
 FEE SPECIFICATION: Transaction fees, both on the command line and at the
@@ -49,6 +49,12 @@ def scramble_seed(seed,scramble_key):
 		msg(fs.format(seed.hex(),scramble_key,step1.hex()))
 	return sha256_rounds(step1,g.scramble_hash_rounds)
 
+def aesctr_crypt(data,key,iv):
+	"silently encrypt or decrypt a short data item with AES-256-CTR"
+	c = Cipher(algorithms.AES(key),modes.CTR(iv),backend=default_backend())
+	encryptor = c.encryptor()
+	return encryptor.update(data) + encryptor.finalize()
+
 def encrypt_seed(seed,key):
 	return encrypt_data(seed,key,desc='seed')
 
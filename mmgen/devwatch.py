@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+#
+# mmgen = Multi-Mode GENerator, command-line Bitcoin cold storage solution
+# Copyright (C)2013-2019 The MMGen Project <mmgen@tuta.io>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+devwatch: Removable device and directory watcher for the MMGen suite
+"""
+
+import os,struct,select
+from mmgen.obj import MMGenObject
+
+# inotify event masks, from <sys/inotify.h>
+IN_ATTRIB      = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM  = 0x00000040
+IN_MOVED_TO    = 0x00000080
+IN_CREATE      = 0x00000100
+IN_DELETE      = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF   = 0x00000800
+IN_UNMOUNT     = 0x00002000
+IN_IGNORED     = 0x00008000
+IN_ONLYDIR     = 0x01000000
+IN_NONBLOCK    = 0o4000
+IN_CLOEXEC     = 0o2000000
+
+class INotify(MMGenObject):
+	"""
+	Minimal ctypes interface to the Linux inotify API.  Raises OSError if inotify is not
+	available
+	"""
+	event_hdr = struct.Struct('iIII') # wd, mask, cookie, len
+
+	def __init__(self):
+		import ctypes
+		try:
+			libc = ctypes.CDLL(None,use_errno=True)
+			self._add_watch = libc.inotify_add_watch
+			self._rm_watch = libc.inotify_rm_watch
+			init = libc.inotify_init1
+		except AttributeError:
+			raise OSError('inotify not supported on this platform')
+		self._add_watch.argtypes = (ctypes.c_int,ctypes.c_char_p,ctypes.c_uint32)
+		self.fd = init(IN_NONBLOCK|IN_CLOEXEC)
+		if self.fd < 0:
+			raise OSError(ctypes.get_errno(),'inotify_init1() failed')
+		self.get_errno = ctypes.get_errno
+
+	def add_watch(self,path,mask):
+		wd = self._add_watch(self.fd,os.fsencode(path),mask)
+		if wd < 0:
+			e = self.get_errno()
+			raise OSError(e,os.strerror(e),path)
+		return wd
+
+	def rm_watch(self,wd):
+		self._rm_watch(self.fd,wd) # fails harmlessly if the watch was removed by the kernel
+
+	def read(self,timeout=None):
+		"return a list of (wd,mask,name) events, waiting up to 'timeout' seconds for the first"
+		if not select.select([self.fd],[],[],timeout)[0]:
+			return []
+		try:
+			data = os.read(self.fd,65536)
+		except BlockingIOError:
+			return []
+		ret,pos,hdr = [],0,self.event_hdr
+		while pos < len(data):
+			wd,mask,cookie,nlen = hdr.unpack_from(data,pos)
+			pos += hdr.size
+			ret.append((wd,mask,os.fsdecode(data[pos:pos+nlen].rstrip(b'\0'))))
+			pos += nlen
+		return ret
+
+	def close(self):
+		os.close(self.fd)
+
+class DeviceWatcher(MMGenObject):
+	"""
+	Wait for the insertion or removal of the device with label 'label', as signaled by the
+	appearance or disappearance of a symlink in 'label_dir' (normally '/dev/disk/by-label'),
+	and optionally for new files with extension 'file_ext' in directory 'file_dir'.
+
+	Inotify is used where available, so that changes are detected as soon as they occur.
+	Elsewhere, or if 'poll' is set, wait() simply sleeps and the caller polls
+	"""
+	dir_events = IN_CREATE|IN_DELETE|IN_MOVED_TO|IN_MOVED_FROM|IN_ATTRIB|IN_DELETE_SELF|IN_MOVE_SELF|IN_ONLYDIR
+
+	def __init__(self,label_dir,label,file_dir=None,file_ext=None,poll=False):
+		self.label_dir = label_dir
+		self.label = label
+		self.file_dir = file_dir
+		self.file_ext = file_ext
+		self.ino = None
+		self.wds = {} # path -> watch descriptor
+		if not poll:
+			try:
+				self.ino = INotify()
+			except OSError:
+				pass
+			else:
+				self.update_watches()
+
+	@property
+	def using_inotify(self):
+		return self.ino is not None
+
+	def present(self):
+		return os.path.exists(os.path.join(self.label_dir,self.label))
+
+	def update_watches(self):
+		"""
+		watch the label directory or, if it doesn't exist yet, its nearest existing ancestor,
+		plus the file directory if it exists.  Called after each batch of events, as watched
+		directories may have been created or removed
+		"""
+		d = os.path.abspath(self.label_dir)
+		while not os.path.isdir(d) and d != os.path.dirname(d):
+			d = os.path.dirname(d)
+		want = {d:self.dir_events}
+		if self.file_dir and os.path.isdir(self.file_dir):
+			want[os.path.abspath(self.file_dir)] = IN_CLOSE_WRITE|IN_MOVED_TO|IN_UNMOUNT|IN_DELETE_SELF|IN_ONLYDIR
+		for path in [p for p in self.wds if p not in want]:
+			self.ino.rm_watch(self.wds.pop(path))
+		for path,mask in want.items():
+			if path not in self.wds:
+				try:
+					self.wds[path] = self.ino.add_watch(path,mask)
+				except OSError: # removed in the meantime
+					pass
+
+	def wait(self,timeout):
+		"""
+		wait up to 'timeout' seconds for a change.  Returns a (label_changed,new_files) tuple,
+		or (False,False) on timeout or if polling
+		"""
+		if not self.ino:
+			import time
+			time.sleep(timeout)
+			return (False,False)
+		events = self.ino.read(timeout)
+		if not events:
+			return (False,False)
+		# collect events arriving in quick succession, e.g. from udev or a file copy
+		more = events
+		while more:
+			more = self.ino.read(0.01)
+			events += more
+		fdir = os.path.abspath(self.file_dir) if self.file_dir else None
+		fwd = self.wds.get(fdir)
+		label_changed = any(wd != fwd or mask & (IN_UNMOUNT|IN_IGNORED) for wd,mask,name in events)
+		new_files = any(wd == fwd and mask & (IN_CLOSE_WRITE|IN_MOVED_TO) and name.endswith(self.file_ext or '')
+							for wd,mask,name in events)
+		self.update_watches()
+		return (label_changed,new_files)
+
+	def close(self):
+		if self.ino:
+			self.ino.close()
+			self.ino = None
+			self.wds = {}
@@ -87,3 +87,73 @@ def xpt_mult (pt, n):
 
 def scalarmult(pt, e):
 	return pt_unxform(xpt_mult(pt_xform(pt), e))
+
+# Fixed-base scalar multiplication, added by the MMGen Project.  Multiples of the base
+# point are looked up in a table built once per process, and points are encoded in bulk,
+# sharing a single field inversion (Montgomery's trick).
+
+d2 = (-121665 * inv(121666) * 2) % q
+fb_table = None
+
+def xpt_to_affine_many(pts):
+	"convert a list of extended points to affine, with a single inversion"
+	if not pts: return []
+	acc,prods = 1,[]
+	for pt in pts:
+		prods.append(acc)
+		acc = (acc * pt[2]) % q
+	acc_inv = inv(acc)
+	ret = [None] * len(pts)
+	for i in range(len(pts)-1,-1,-1):
+		(X, Y, Z, _) = pts[i]
+		zi = (acc_inv * prods[i]) % q
+		acc_inv = (acc_inv * Z) % q
+		ret[i] = ((X*zi)%q, (Y*zi)%q)
+	return ret
+
+def get_fb_table():
+	"""
+	Return the fixed-base table, with entry 255*i + j-1 holding the point j * 256**i * B
+	for byte position i of a little-endian scalar and byte value j, in the affine form
+	(y+x, y-x, 2*d*x*y) used by xpt_mult_base()
+	"""
+	global fb_table
+	if not fb_table:
+		from mmgen.ed25519 import B
+		pts = []
+		P = pt_xform(B)
+		for i in range(32):
+			row = [P,xpt_double(P)] # xpt_add() can't double
+			for j in range(253):
+				row.append(xpt_add(row[-1],P))
+			pts += row
+			P = xpt_double(row[127])
+		fb_table = [((y+x)%q, (y-x)%q, (x*y*d2)%q) for x,y in xpt_to_affine_many(pts)]
+	return fb_table
+
+def xpt_mult_base(e):
+	"return e*B in extended coordinates, for 0 <= e < 2**256"
+	tbl = get_fb_table()
+	(X, Y, Z, T) = (0, 1, 1, 0)
+	for i,c in enumerate(e.to_bytes(32,'little')):
+		if c:
+			# mixed addition, add-2008-hwcd-3 with Z2 == 1
+			(YpX2, YmX2, T2d2) = tbl[255*i+c-1]
+			A = ((Y-X)*YmX2) % q
+			B = ((Y+X)*YpX2) % q
+			C = (T*T2d2) % q
+			D = 2*Z
+			E = B-A
+			F = D-C
+			G = D+C
+			H = B+A
+			(X, Y, Z, T) = ((E*F)%q, (G*H)%q, (F*G)%q, (E*H)%q)
+	return (X, Y, Z, T)
+
+def encodepoints(pts):
+	"encode a list of extended points, with a single inversion"
+	return [(y | (x & 1) << 255).to_bytes(32,'little') for x,y in xpt_to_affine_many(pts)]
+
+def scalarmult_base_encoded_many(es):
+	"return the encoded points e*B for each scalar in 'es'"
+	return encodepoints([xpt_mult_base(e) for e in es])
@@ -59,6 +59,7 @@ class g(object):
 	stderr = sys.stderr
 
 	http_timeout = 60
+	rpc_max_concurrency = 8
 
 	# Variables - these might be altered at runtime:
 
@@ -99,6 +100,7 @@ class g(object):
 	rpc_fail_on_command  = ''
 	rpch                 = None # global RPC handle
 	use_cached_balances  = False
+	tw_utxo_cache        = False
 
 	# regtest:
 	bob                  = False
@@ -153,7 +155,7 @@ class g(object):
 		'quiet','verbose','debug','outdir','echo_passphrase','passwd_file','stdout',
 		'show_hash_presets','label','keep_passphrase','keep_hash_preset','yes',
 		'brain_params','b16','usr_randchars','coin','bob','alice','key_generator',
-		'hidden_incog_input_params','in_fmt'
+		'hidden_incog_input_params','in_fmt','sign_with_daemon'
 	)
 	incompatible_opts = (
 		('base32','hex'), # mmgen-passgen
@@ -162,14 +164,16 @@ class g(object):
 		('label','keep_label'),
 		('tx_id','info'),
 		('tx_id','terse_info'),
-		('batch','rescan') # still incompatible as of Core 0.15.0
+		('batch','rescan'), # still incompatible as of Core 0.15.0
+		('single_rescan','rescan'),
+		('inputs','auto_inputs'),
 	)
 	cfg_file_opts = (
 		'color','debug','hash_preset','http_timeout','no_license','rpc_host','rpc_port',
-		'quiet','tx_fee_adj','usr_randchars','testnet','rpc_user','rpc_password',
-		'daemon_data_dir','force_256_color','regtest','subseeds',
-		'btc_max_tx_fee','ltc_max_tx_fee','bch_max_tx_fee','eth_max_tx_fee',
-		'eth_mainnet_chain_name','eth_testnet_chain_name',
+		'rpc_max_concurrency','quiet','tx_fee_adj','usr_randchars','testnet','rpc_user','rpc_password',
+		'daemon_data_dir','force_256_color','regtest','subseeds','addr_checkpoint_interval',
+		'subseed_index_cache','btc_max_tx_fee','ltc_max_tx_fee','bch_max_tx_fee','eth_max_tx_fee',
+		'eth_mainnet_chain_name','eth_testnet_chain_name','tw_utxo_cache',
 		'max_tx_file_size','max_input_size','mswin_pw_warning'
 	)
 	# Supported environmental vars
@@ -217,6 +221,8 @@ class g(object):
 	seed_lens = 128,192,256
 	scramble_hash_rounds = 10
 	subseeds = 100
+	addr_checkpoint_interval = 0 # 0 = disabled
+	subseed_index_cache = False
 
 	mmenc_ext      = 'mmenc'
 	salt_len       = 16
@@ -224,7 +230,7 @@ class g(object):
 	aesctr_dfl_iv  = b'\x00' * (aesctr_iv_len-1) + b'\x01'
 	hincog_chk_len = 8
 
-	key_generators = 'python-ecdsa','secp256k1' # '1','2'
+	key_generators = 'python-ecdsa','secp256k1','secp256k1-python' # '1','2','3'
 	key_generator  = 2 # secp256k1 is default
 
 	force_standalone_scrypt_module = False
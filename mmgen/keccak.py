@@ -1,303 +1,179 @@
 #!/usr/bin/env python3
 #
-# Python 2 code from here: https://github.com/ctz/keccak
-# Ported to python3 by the MMGen Project
+# Originally based on the Python 2 code from here: https://github.com/ctz/keccak
+# Ported to python3 and rewritten for speed by the MMGen Project
 #
 # This is the old, pre-SHA3 version of Keccak used by Ethereum, which is not supported
 # by hashlib.sha3
 
-from math import log
-from operator import xor
-from copy import deepcopy
-from functools import reduce
+"""
+keccak.py: A pure-Python implementation of the Keccak hash function (Keccak-f[1600])
+           for the MMGen suite, used when the pysha3 module is unavailable
+"""
+
+from struct import Struct
 
 # The Keccak-f round constants.
-RoundConstants = [
+RoundConstants = (
 	0x0000000000000001,   0x0000000000008082,   0x800000000000808A,   0x8000000080008000,
 	0x000000000000808B,   0x0000000080000001,   0x8000000080008081,   0x8000000000008009,
 	0x000000000000008A,   0x0000000000000088,   0x0000000080008009,   0x000000008000000A,
 	0x000000008000808B,   0x800000000000008B,   0x8000000000008089,   0x8000000000008003,
 	0x8000000000008002,   0x8000000000000080,   0x000000000000800A,   0x800000008000000A,
 	0x8000000080008081,   0x8000000000008080,   0x0000000080000001,   0x8000000080008008
-]
-
-RotationConstants = [
-	[  0,  1, 62, 28, 27, ],
-	[ 36, 44,  6, 55, 20, ],
-	[  3, 10, 43, 25, 39, ],
-	[ 41, 45, 15, 21,  8, ],
-	[ 18,  2, 61, 56, 14, ]
-]
-
-Masks = [(1 << i) - 1 for i in range(65)]
-
-def bits2bytes(x):
-	return (int(x) + 7) // 8
-
-def rol(value, left, bits):
+)
+
+# Rotation offsets, indexed by [y][x]
+RotationConstants = (
+	(  0,  1, 62, 28, 27, ),
+	( 36, 44,  6, 55, 20, ),
+	(  3, 10, 43, 25, 39, ),
+	( 41, 45, 15, 21,  8, ),
+	( 18,  2, 61, 56, 14, )
+)
+
+def _make_keccak_f(packed=False):
 	"""
-	Circularly rotate 'value' to the left,
-	treating it as a quantity of the given size in bits.
+	Generate the Keccak-f[1600] permutation with the steps of each round unrolled and the
+	rotation offsets inlined.  The state is a flat list of 25 64-bit lanes, with lane (x,y)
+	at index x + 5*y, the order in which lanes are serialized.  Lanes are held in local
+	variables for the duration of the permutation.
+
+	If 'packed' is set, each lane holds the lanes of several states in consecutive 64-bit
+	fields of one integer, so that each operation permutes all the states at once.  The
+	permutation then takes the per-field masks for the rotations and the round constants,
+	from pack_masks()
 	"""
-	top = value >> (bits - left)
-	bot = (value & Masks[bits - left]) << left
-	return bot | top
-
-def ror(value, right, bits):
-	"""
-	Circularly rotate 'value' to the right,
-	treating it as a quantity of the given size in bits.
-	"""
-	top = value >> right
-	bot = (value & Masks[right]) << (bits - right)
-	return bot | top
-
-def multirate_padding(used_bytes, align_bytes):
+	a = lambda x,y: 'a{}'.format(x % 5 + 5 * (y % 5))
+	def rol(v,n):
+		if not n:
+			return v
+		if packed:
+			return '(({v} << {n}) & h{n} | ({v} >> {m}) & l{n})'.format(v=v,n=n,m=64-n)
+		return '(({v} << {n}) & M | {v} >> {m})'.format(v=v,n=n,m=64-n)
+
+	lanes = ','.join('a{}'.format(i) for i in range(25))
+	offsets = sorted({n for r in RotationConstants for n in r if n} | {1})
+	if packed:
+		body = [
+			'def keccak_f_packed(A,masks,RoundConstants):',
+			'	"the Keccak-f[1600] permutation of the packed 25-lane states \'A\', in place"',
+			'	{} = masks'.format(','.join('h{n},l{n}'.format(n=n) for n in offsets)) ]
+	else:
+		body = [
+			'def keccak_f(A):',
+			'	"the Keccak-f[1600] permutation of the 25-lane state \'A\', in place"',
+			'	M = 0xffffffffffffffff' ]
+	body += [
+		'	{} = A'.format(lanes),
+		'	for RC in RoundConstants:' ]
+	# theta
+	for x in range(5):
+		body.append('\t\tc{} = {}'.format(x,' ^ '.join(a(x,y) for y in range(5))))
+	for x in range(5):
+		body.append('\t\td{} = c{} ^ {}'.format(x,(x-1) % 5,rol('c{}'.format((x+1) % 5),1)))
+	# theta (applied), rho and pi: lane (x,y) moves to (y,2x+3y)
+	for y in range(5):
+		for x in range(5):
+			body.append('\t\tt = {} ^ d{}'.format(a(x,y),x))
+			body.append('\t\tb{} = {}'.format(y + 5 * ((2*x + 3*y) % 5),rol('t',RotationConstants[y][x])))
+	# chi
+	for y in range(5):
+		for x in range(5):
+			body.append('\t\t{} = b{} ^ (~b{} & b{})'.format(
+				a(x,y), x + 5*y, (x+1) % 5 + 5*y, (x+2) % 5 + 5*y))
+	# iota
+	body.append('\t\ta0 ^= RC')
+	body.append('\tA[:] = ({})'.format(lanes))
+	ns = {'RoundConstants':RoundConstants}
+	exec('\n'.join(body),ns)
+	return ns['keccak_f_packed' if packed else 'keccak_f'],offsets
+
+keccak_f,rotation_offsets = _make_keccak_f()
+keccak_f_packed = _make_keccak_f(packed=True)[0]
+
+def pack_masks(n):
+	"the rotation masks and round constants for keccak_f_packed(), for 'n' packed states"
+	rep = int.from_bytes((b'\x01' + bytes(7)) * n,'little') # 1 in each field
+	M = 0xffffffffffffffff
+	masks = []
+	for k in rotation_offsets:
+		masks += [((M << k) & M) * rep, ((1 << k) - 1) * rep]
+	return masks,[rc * rep for rc in RoundConstants]
+
+def multirate_padding(used_bytes,align_bytes):
 	"""
 	The Keccak padding function.
 	"""
 	padlen = align_bytes - used_bytes
-	if padlen == 0:
-		padlen = align_bytes
 	# note: padding done in 'internal bit ordering', wherein LSB is leftmost
 	if padlen == 1:
-		return [0x81]
+		return b'\x81'
 	else:
-		return [0x01] + ([0x00] * (padlen - 2)) + [0x80]
-
-def keccak_f(state):
-	"""
-	This is Keccak-f permutation.  It operates on and
-	mutates the passed-in KeccakState.  It returns nothing.
-	"""
-	def round(A, RC):
-		W, H = state.W, state.H
-		rangeW, rangeH = state.rangeW, state.rangeH
-		lanew = state.lanew
-		zero = state.zero
-
-		# theta
-		C = [reduce(xor, A[x]) for x in rangeW]
-		D = [0] * W
-		for x in rangeW:
-			D[x] = C[(x - 1) % W] ^ rol(C[(x + 1) % W], 1, lanew)
-			for y in rangeH:
-				A[x][y] ^= D[x]
-
-		# rho and pi
-		B = zero()
-		for x in rangeW:
-			for y in rangeH:
-				B[y % W][(2 * x + 3 * y) % H] = rol(A[x][y], RotationConstants[y][x], lanew)
-
-		# chi
-		for x in rangeW:
-			for y in rangeH:
-				A[x][y] = B[x][y] ^ ((~ B[(x + 1) % W][y]) & B[(x + 2) % W][y])
-
-		# iota
-		A[0][0] ^= RC
-
-	l = int(log(state.lanew, 2))
-	nr = 12 + 2 * l
-
-	for ir in range(nr):
-		round(state.s, RoundConstants[ir])
-
-class KeccakState(object):
-	"""
-	A keccak state container.
-
-	The state is stored as a 5x5 table of integers.
-	"""
-	W = 5
-	H = 5
-
-	rangeW = range(W)
-	rangeH = range(H)
-
-	@staticmethod
-	def zero():
-		"""
-		Returns an zero state table.
-		"""
-		return [[0] * KeccakState.W for x in KeccakState.rangeH]
-
-	@staticmethod
-	def format(st):
-		"""
-		Formats the given state as hex, in natural byte order.
-		"""
-		rows = []
-		def fmt(x): return '%016x' % x
-		for y in KeccakState.rangeH:
-			row = []
-			for x in rangeW:
-				row.append(fmt(st[x][y]))
-			rows.append(' '.join(row))
-		return '\n'.join(rows)
-
-	@staticmethod
-	def lane2bytes(s, w):
-		"""
-		Converts the lane s to a sequence of byte values,
-		assuming a lane is w bits.
-		"""
-		return [(s >> b) & 0xff for b in range(0, w, 8)]
-
-	@staticmethod
-	def bytes2lane(bb):
-		"""
-		Converts a sequence of byte values to a lane.
-		"""
-		r = 0
-		for b in reversed(bb):
-			r = r << 8 | b
-		return r
-
-	def __init__(self, bitrate, b):
-		self.bitrate = bitrate
-		self.b = b
-
-		# only byte-aligned
-		assert self.bitrate % 8 == 0
-		self.bitrate_bytes = bits2bytes(self.bitrate)
-
-		assert self.b % 25 == 0
-		self.lanew = self.b // 25
-
-		self.s = KeccakState.zero()
-
-	def __str__(self):
-		return KeccakState.format(self.s)
-
-	def absorb(self, bb):
-		"""
-		Mixes in the given bitrate-length string to the state.
-		"""
-		assert len(bb) == self.bitrate_bytes
-
-		bb += [0] * bits2bytes(self.b - self.bitrate)
-		i = 0
-
-		for y in self.rangeH:
-			for x in self.rangeW:
-				self.s[x][y] ^= KeccakState.bytes2lane(bb[i:i + 8])
-				i += 8
-
-	def squeeze(self):
-		"""
-		Returns the bitrate-length prefix of the state to be output.
-		"""
-		return self.get_bytes()[:self.bitrate_bytes]
-
-	def get_bytes(self):
-		"""
-		Convert whole state to a byte string.
-		"""
-		out = [0] * bits2bytes(self.b)
-		i = 0
-		for y in self.rangeH:
-			for x in self.rangeW:
-					v = KeccakState.lane2bytes(self.s[x][y], self.lanew)
-					out[i:i+8] = v
-					i += 8
-		return out
-
-	def set_bytes(self, bb):
-		"""
-		Set whole state from byte string, which is assumed
-		to be the correct length.
-		"""
-		i = 0
-		for y in self.rangeH:
-			for x in self.rangeW:
-				self.s[x][y] = KeccakState.bytes2lane(bb[i:i+8])
-				i += 8
-
-class KeccakSponge(object):
-	def __init__(self, bitrate, width, padfn, permfn):
-		self.state = KeccakState(bitrate, width)
-		self.padfn = padfn
-		self.permfn = permfn
-		self.buffer = []
-
-	def copy(self):
-		return deepcopy(self)
-
-	def absorb_block(self, bb):
-		assert len(bb) == self.state.bitrate_bytes
-		self.state.absorb(bb)
-		self.permfn(self.state)
-
-	def absorb(self, s):
-		self.buffer += bytes(s)
-
-		while len(self.buffer) >= self.state.bitrate_bytes:
-			self.absorb_block(self.buffer[:self.state.bitrate_bytes])
-			self.buffer = self.buffer[self.state.bitrate_bytes:]
-
-	def absorb_final(self):
-		padded = self.buffer + self.padfn(len(self.buffer), self.state.bitrate_bytes)
-		self.absorb_block(padded)
-		self.buffer = []
-
-	def squeeze_once(self):
-		rc = self.state.squeeze()
-		self.permfn(self.state)
-		return rc
-
-	def squeeze(self, l):
-		Z = self.squeeze_once()
-		while len(Z) < l:
-			Z += self.squeeze_once()
-		return Z[:l]
+		return b'\x01' + bytes(padlen - 2) + b'\x80'
 
 class KeccakHash(object):
 	"""
 	The Keccak hash function, with a hashlib-compatible interface.
 	"""
-	def __init__(self, bitrate_bits, capacity_bits, output_bits):
-		# our in-absorption sponge. this is never given padding
-		assert bitrate_bits + capacity_bits in (25, 50, 100, 200, 400, 800, 1600)
-		self.sponge = KeccakSponge(bitrate_bits, bitrate_bits + capacity_bits,
-								   multirate_padding,
-								   keccak_f)
+	state_bytes = Struct('<25Q')
+
+	def __init__(self,bitrate_bits,capacity_bits,output_bits):
+		assert bitrate_bits + capacity_bits == 1600
+		assert bitrate_bits % 64 == 0 and output_bits % 8 == 0
+		self.state = [0] * 25
+		self.buffer = b''
+		self.block = Struct('<{}Q'.format(bitrate_bits // 64)) # block <-> lanes, in bulk
+		self.capacity_bits = capacity_bits
 
 		# hashlib interface members
-		assert output_bits % 8 == 0
-		self.digest_size = bits2bytes(output_bits)
-		self.block_size = bits2bytes(bitrate_bits)
+		self.digest_size = output_bits // 8
+		self.block_size = bitrate_bits // 8
 
 	def __repr__(self):
-		inf = (self.sponge.state.bitrate,
-			   self.sponge.state.b - self.sponge.state.bitrate,
-			   self.digest_size * 8)
+		inf = (self.block_size * 8, self.capacity_bits, self.digest_size * 8)
 		return '<KeccakHash with r=%d, c=%d, image=%d>' % inf
 
 	def copy(self):
-		return deepcopy(self)
-
-	def update(self, s):
-		self.sponge.absorb(s)
+		h = KeccakHash.__new__(KeccakHash)
+		h.__dict__.update(self.__dict__)
+		h.state = self.state[:]
+		return h
+
+	def absorb_block(self,state,block,pos=0):
+		for i,lane in enumerate(self.block.unpack_from(block,pos)):
+			state[i] ^= lane
+		keccak_f(state)
+
+	def update(self,s):
+		data = self.buffer + bytes(s)
+		bs = self.block_size
+		end = len(data) - len(data) % bs
+		for pos in range(0,end,bs):
+			self.absorb_block(self.state,data,pos)
+		self.buffer = data[end:]
 
 	def digest(self):
-		finalised = self.sponge.copy()
-		finalised.absorb_final()
-		digest = finalised.squeeze(self.digest_size)
-		return bytes(digest)
+		state = self.state[:]
+		self.absorb_block(state,self.buffer + multirate_padding(len(self.buffer),self.block_size))
+		out = b''
+		while True:
+			out += self.state_bytes.pack(*state)[:self.block_size]
+			if len(out) >= self.digest_size:
+				return out[:self.digest_size]
+			keccak_f(state)
 
 	def hexdigest(self):
 		return self.digest().hex()
 
 	@staticmethod
-	def preset(bitrate_bits, capacity_bits, output_bits):
+	def preset(bitrate_bits,capacity_bits,output_bits):
 		"""
 		Returns a factory function for the given bitrate, sponge capacity and output length.
 		The function accepts an optional initial input, ala hashlib.
 		"""
 		def create(initial_input = None):
-			h = KeccakHash(bitrate_bits, capacity_bits, output_bits)
+			h = KeccakHash(bitrate_bits,capacity_bits,output_bits)
 			if initial_input is not None:
 				h.update(initial_input)
 			return h
@@ -308,3 +184,36 @@ keccak_224 = KeccakHash.preset(1152, 448, 224)
 keccak_256 = KeccakHash.preset(1088, 512, 256)
 keccak_384 = KeccakHash.preset(832, 768, 384)
 keccak_512 = KeccakHash.preset(576, 1024, 512)
+
+def keccak_256_many(msgs,batch_size=256):
+	"""
+	Return the Keccak-256 digests of the messages in the iterable 'msgs'.  Messages shorter
+	than the block size, such as public keys and method signatures, are hashed in batches of
+	up to 'batch_size' by a single packed permutation
+	"""
+	rate = 136
+	msgs = [bytes(m) for m in msgs]
+	ret = [None] * len(msgs)
+	short = []
+	for i,m in enumerate(msgs):
+		if len(m) < rate:
+			short.append(i)
+		else:
+			ret[i] = keccak_256(m).digest()
+
+	digest = Struct('<4Q').pack
+	n,masks = None,None
+	for pos in range(0,len(short),batch_size):
+		idxs = short[pos:pos+batch_size]
+		if len(idxs) != n: # only the last batch may differ in size
+			n = len(idxs)
+			masks = pack_masks(n)
+			blocks,fields = Struct('<{}Q'.format(17*n)),Struct('<{}Q'.format(n))
+		# lane i of message j is at index 17*j + i of the unpacked blocks
+		lanes = blocks.unpack(b''.join(msgs[i] + multirate_padding(len(msgs[i]),rate) for i in idxs))
+		state = [int.from_bytes(fields.pack(*lanes[i::17]),'little') for i in range(17)] + [0] * 8
+		keccak_f_packed(state,*masks)
+		out = [fields.unpack(state[i].to_bytes(8*n,'little')) for i in range(4)]
+		for j,i in enumerate(idxs):
+			ret[i] = digest(out[0][j],out[1][j],out[2][j],out[3][j])
+	return ret
@@ -34,7 +34,7 @@ if g.prog_name == 'mmgen-keygen':
 else:
 	gen_what = 'addresses'
 	gen_desc = 'addresses'
-	opt_filter = 'hbcdeEiHOkKlpzPqrStUv-'
+	opt_filter = 'hbcdeEiHOjkKlpzPqrStUv-'
 	note_addrkey = ''
 
 opts_data = {
@@ -58,6 +58,8 @@ opts_data = {
 -H, --hidden-incog-input-params=f,o  Read hidden incognito data from file
                       'f' at offset 'o' (comma-separated)
 -O, --old-incog-fmt   Specify old-format incognito input
+-j, --jobs=        j  Generate keys and addresses using 'j' processes
+                      (default: 1)
 -k, --use-internal-keccak-module Force use of the internal keccak module
 -K, --key-generator=m Use method 'm' for public key generation
                       Options: {kgs} (default: {kg})
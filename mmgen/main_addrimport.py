@@ -20,7 +20,7 @@
 mmgen-addrimport: Import addresses into a MMGen coin daemon tracking wallet
 """
 
-import time
+import time,json
 
 from mmgen.common import *
 from mmgen.addr import AddrList,KeyAddrList
@@ -34,6 +34,11 @@ has a balance and is not in your tracking wallet.  Note that the rescanning
 process is very slow (>30 min. for each imported address on a low-powered
 computer).
 	""".strip() if opt.rescan else """
+WARNING: You've chosen the '--single-rescan' option.  All addresses will be
+imported without rescanning, after which the blockchain will be rescanned
+once, starting from block {}.  The rescan may take several hours.  If it's
+interrupted, rerun this command with the same options to resume it.
+	""".strip().format(rescan_start) if opt.single_rescan else """
 WARNING: If any of the addresses you're importing is already in the blockchain,
 has a balance and is not in your tracking wallet, you must exit the program now
 and rerun it using the '--rescan' option.
@@ -61,12 +66,23 @@ opts_data = {
 -q, --quiet        Suppress warnings
 -r, --rescan       Rescan the blockchain.  Required if address to import is
                    in the blockchain and has a balance.  Rescanning is slow.
+-s, --single-rescan Import all addresses without rescanning, then rescan the
+                   blockchain once for all of them.  An interrupted rescan
+                   is resumed when the command is rerun
+-H, --rescan-height=h Start the single rescan at block height 'h' (e.g. the
+                   block height at the time the wallet was created). Default:
+                   the height reached by an interrupted rescan of the same
+                   addresses, or 0
 """,
 	'notes': """\n
 This command can also be used to update the comment fields of addresses
-already in the tracking wallet.
+already in the tracking wallet.  Unless '--rescan' is given, addresses already
+in the tracking wallet with unchanged labels are skipped.
 
 The --batch and --rescan options cannot be used together.
+
+Since '--rescan' rescans the entire blockchain once for every imported address,
+'--single-rescan' is much faster when importing more than one address.
 """
 	}
 }
@@ -115,7 +131,38 @@ if opt.rescan and not 'rescan' in tw.caps:
 	msg("'--rescan' ignored: not supported by {}".format(type(tw).__name__))
 	opt.rescan = False
 
-if opt.rescan and not opt.quiet:
+if opt.single_rescan and not 'rescan' in tw.caps:
+	msg("'--single-rescan' ignored: not supported by {}".format(type(tw).__name__))
+	opt.single_rescan = False
+
+if opt.rescan_height and not opt.single_rescan:
+	die(1,"'--rescan-height' requires the '--single-rescan' option")
+
+# Progress of an interrupted single rescan is recorded in a file in the data directory,
+# keyed by a checksum of the addresses imported
+rescan_state_fn = os.path.join(g.data_dir,'addrimport-rescan.json')
+rescan_id = make_chksum_8(' '.join(al.coinaddrs()).encode()).lower()
+
+def get_rescan_state():
+	try: return json.loads(get_data_from_file(rescan_state_fn,quiet=True))
+	except: return {}
+
+def save_rescan_state(state):
+	write_data_to_file(
+		rescan_state_fn,json.dumps(state),
+		desc='rescan progress data',
+		ask_overwrite=False,ignore_opt_outdir=True,quiet=True)
+
+if opt.single_rescan:
+	rescan_state = get_rescan_state()
+	if opt.rescan_height:
+		rescan_start = int(opt.rescan_height)
+	else:
+		rescan_start = rescan_state.get(rescan_id,0)
+		if rescan_start:
+			msg('Resuming interrupted rescan at block {}'.format(rescan_start))
+
+if (opt.rescan or opt.single_rescan) and not opt.quiet:
 	confirm_or_raise(ai_msgs('rescan'),'continue',expect='YES')
 
 if opt.batch and not 'batch' in tw.caps:
@@ -131,20 +178,59 @@ def import_address(addr,label,rescan):
 		tw.set_token_param(g.token,'symbol',sym)
 		tw.set_token_param(g.token,'decimals',tw.token_obj.decimals())
 
+def rescan_blockchain(start,stop):
+	try: tw.rescan_blockchain(start,stop)
+	except Exception as e:
+		global err_msg
+		err_msg = e.args[0]
+
+def run_with_timer(target,args,fmt_msg):
+	"run 'target' in a thread, displaying the elapsed time with 'fmt_msg' until it finishes"
+	t = threading.Thread(target=target,args=args)
+	t.daemon = True
+	t.start()
+	start = int(time.time())
+	while t.is_alive():
+		msg_r('\r' + fmt_msg(secs_to_hms(int(time.time()-start))))
+		time.sleep(0.5)
+
+def do_single_rescan(start):
+	"""
+	Rescan from block 'start' to the chain tip in chunks, recording the next block to scan
+	after each chunk so that an interrupted rescan may be resumed
+	"""
+	chunk = 1000
+	tip = g.rpch.getblockcount()
+	if start > tip:
+		die(1,'Rescan height {} is greater than current block height {}'.format(start,tip))
+	t_start = time.time()
+	for beg in range(start,tip+1,chunk):
+		end = min(beg+chunk-1,tip)
+		fs = '{} Rescanning blocks {}-{} of {} ({:.1f}% done)'
+		run_with_timer(rescan_blockchain,[beg,end],
+			lambda elapsed: fs.format(elapsed,beg,end,tip,(beg-start)*100/(tip+1-start)))
+		if err_msg: die(2,'\nRescan failed: {!r}'.format(err_msg))
+		rescan_state = get_rescan_state()
+		rescan_state[rescan_id] = end + 1
+		save_rescan_state(rescan_state)
+	msg('\rRescanned blocks {}-{} in {}{}'.format(start,tip,secs_to_hms(int(time.time()-t_start)),' '*24))
+	rescan_state = get_rescan_state()
+	del rescan_state[rescan_id]
+	save_rescan_state(rescan_state)
+
 w_n_of_m = len(str(al.num_addrs)) * 2 + 2
 w_mmid = 1 if opt.addrlist or opt.address else len(str(max(al.idxs()))) + 13
 msg_fmt = '{{:{}}} {{:34}} {{:{}}}'.format(w_n_of_m,w_mmid)
 
-if opt.rescan: import threading
+if opt.rescan or opt.single_rescan: import threading
 
-fs = 'Importing {} address{} from {}{}'
-bm =' (batch mode)' if opt.batch else ''
-msg(fs.format(len(al.data),suf(al.data,'es'),infile,bm))
+if opt.single_rescan and 'batch' in tw.caps:
+	opt.batch = True
 
 if not al.data[0].addr.is_for_chain(g.chain):
 	die(2,'Address{} not compatible with {} chain!'.format((' list','')[bool(opt.address)],g.chain))
 
-for n,e in enumerate(al.data):
+def make_label(e):
 	if e.idx:
 		label = '{}:{}'.format(al.al_id,e.idx)
 		if e.label: label += ' ' + e.label
@@ -152,38 +238,59 @@ for n,e in enumerate(al.data):
 	else:
 		label = '{}:{}'.format(g.proto.base_coin.lower(),e.addr)
 		m = 'non-'+g.proj_name
+	return TwLabel(label),m
 
-	label = TwLabel(label)
+# With '--rescan', the user may be re-importing tracked addresses in order to rescan them,
+# so import everything.  Otherwise, diff the address list against the tracking wallet and
+# import only new and relabeled addresses.
+if opt.rescan:
+	import_list = [(e,)+make_label(e) for e in al.data]
+else:
+	qmsg('Getting address labels from tracking wallet')
+	tw_labels = tw.get_label_map()
+	import_list,n_changed = [],0
+	for e in al.data:
+		label,m = make_label(e)
+		tw_label = tw_labels.get(e.addr)
+		if tw_label == label:
+			continue
+		if tw_label != None:
+			n_changed += 1
+		import_list.append((e,label,m))
+	n_skipped = len(al.data) - len(import_list)
+	fs = '{} address{} already in tracking wallet (skipped), {} new, {} relabeled'
+	msg(fs.format(n_skipped,suf(n_skipped,'es'),len(import_list)-n_changed,n_changed))
+
+fs = 'Importing {} address{} from {}{}'
+bm = ' (batch mode)' if opt.batch else ''
+msg(fs.format(len(import_list),suf(import_list,'es'),infile,bm))
+
+arg_list = []
+
+for n,(e,label,m) in enumerate(import_list):
 
 	if opt.batch:
-		if n == 0: arg_list = []
 		arg_list.append((e.addr,label,False))
 		continue
 
-	msg_data = ('{}/{}:'.format(n+1,al.num_addrs),e.addr,'({})'.format(m))
+	msg_data = ('{}/{}:'.format(n+1,len(import_list)),e.addr,'({})'.format(m))
 
 	if opt.rescan:
-		t = threading.Thread(target=import_address,args=[e.addr,label,True])
-		t.daemon = True
-		t.start()
-		start = int(time.time())
-		while True:
-			if t.is_alive():
-				elapsed = int(time.time()-start)
-				msg_r(('\r{} '+msg_fmt).format(secs_to_hms(elapsed),*msg_data))
-				time.sleep(0.5)
-			else:
-				if err_msg: die(2,'\nImport failed: {!r}'.format(err_msg))
-				msg('\nOK')
-				break
+		run_with_timer(import_address,[e.addr,label,True],
+			lambda elapsed: ('{} '+msg_fmt).format(elapsed,*msg_data))
+		if err_msg: die(2,'\nImport failed: {!r}'.format(err_msg))
+		msg('\nOK')
 	else:
 		import_address(e.addr,label,False)
 		msg_r('\r'+msg_fmt.format(*msg_data))
 		if err_msg: die(2,'\nImport failed: {!r}'.format(err_msg))
 		msg(' - OK')
 
-if opt.batch:
+if opt.batch and arg_list:
 	ret = tw.batch_import_address(arg_list)
 	msg('OK: {} addresses imported'.format(len(ret)))
 
+if opt.single_rescan:
+	do_single_rescan(rescan_start)
+
 del tw
@@ -22,10 +22,12 @@ mmgen-autosign: Auto-sign MMGen transactions
 
 import sys,os,subprocess,time,signal,shutil
 from stat import *
+from collections import OrderedDict
 
 mountpoint   = '/mnt/tx'
 tx_dir       = '/mnt/tx/tx'
 part_label   = 'MMGEN_TX'
+label_dir    = '/dev/disk/by-label'
 wallet_dir   = '/dev/shm/autosign'
 key_fn       = 'autosign.key'
 
@@ -40,8 +42,13 @@ opts_data = {
 --, --longhelp      Print help message for long options (common options)
 -c, --coins=c       Coins to sign for (comma-separated list)
 -I, --no-insert-check Don't check for device insertion
+-j, --jobs=n        Sign transactions using 'n' processes (default: 1)
 -l, --led           Use status LED to signal standby, busy and error
+-L, --label-dir=d   Look for the device label in directory 'd' (default:
+                    '{ld}')
 -m, --mountpoint=m  Specify an alternate mountpoint (default: '{mp}')
+-w, --poll          Poll for device insertion once per second instead of
+                    using inotify
 -s, --stealth-led   Stealth LED mode - signal busy and error only, and only
                     after successful authorization.
 -S, --full-summary  Print a full summary of each signed transaction after
@@ -49,7 +56,7 @@ opts_data = {
                     will not be printed.
 -q, --quiet         Produce quieter output
 -v, --verbose       Produce more verbose output
-""".format(mp=mountpoint),
+""".format(mp=mountpoint,ld=label_dir),
 	'notes': """
 
                               COMMANDS
@@ -66,7 +73,11 @@ MMGen transactions, signs any unsigned transactions, unmounts the removable
 device and exits.
 
 If invoked with 'wait', the program waits in a loop, mounting, signing and
-unmounting every time the removable device is inserted.
+unmounting every time the removable device is inserted.  On Linux, device
+insertion is detected with inotify, so signing begins immediately.  If the
+device is not removable (e.g. with --no-insert-check) and its transaction
+directory remains accessible, new unsigned transactions placed there are
+also signed as soon as they appear.
 
 On supported platforms (currently Orange Pi and Raspberry Pi boards), the
 status LED indicates whether the program is busy or in standby mode, i.e.
@@ -96,6 +107,9 @@ wallet using the -P (--passwd-file) option:
 
 Note that the hash preset must be '1'.  Multiple wallets are permissible.
 
+Bitcoin, Bitcoin Cash and Litecoin transactions are signed natively, so the
+coin daemons for these coins need not be running.
+
 For good security, it's advisable to re-generate a new wallet and key for
 each signing session.
 
@@ -110,12 +124,13 @@ exit_if_mswin('autosigning')
 
 import mmgen.tx
 import mmgen.altcoins.eth.tx
-from mmgen.txsign import txsign
+from mmgen.txsign import txsign,saved_seeds,saved_keys,generate_keys_for_txs,map_txs
 from mmgen.protocol import CoinProtocol,init_coin
 
 if opt.stealth_led: opt.led = True
 
 if opt.mountpoint: mountpoint = opt.mountpoint # TODO: make global
+if opt.label_dir: label_dir = opt.label_dir
 opt.outdir = tx_dir = os.path.join(mountpoint,'tx')
 
 def check_daemons_running():
@@ -168,57 +183,130 @@ def do_umount():
 		msg('Unmounting '+mountpoint)
 		subprocess.call(['umount',mountpoint])
 
-def sign_tx_file(txfile,signed_txs):
+def init_tx_proto(tmp_tx):
+	init_coin(tmp_tx.coin,testnet=False)
+
+	if tmp_tx.chain != 'mainnet':
+		if tmp_tx.chain == 'testnet' or (
+			hasattr(g.proto,'chain_name') and tmp_tx.chain != g.proto.chain_name):
+			init_coin(tmp_tx.coin,testnet=True)
+
+	if hasattr(g.proto,'chain_name'):
+		m = 'Chains do not match! tx file: {}, proto: {}'
+		assert tmp_tx.chain == g.proto.chain_name,m.format(tmp_tx.chain,g.proto.chain_name)
+
+	g.chain = tmp_tx.chain
+	g.token = tmp_tx.dcoin
+	g.dcoin = tmp_tx.dcoin or g.coin
+
+def handle_tx_exception(e,txfile):
+	msg('An error occurred: {}'.format(e.args[0] if e.args else repr(e)))
+	if g.debug or g.traceback:
+		print_stack_trace('AUTOSIGN {}'.format(txfile))
+
+def get_tx_groups(txfiles):
+	"""
+	group the transaction files by coin, chain and token, reading only their metadata, so
+	that each protocol is initialized once.  Returns a list of (metadata,file indexes)
+	pairs, in order of first appearance.  Files that can't be read are omitted
+	"""
+	groups = OrderedDict()
+	for idx,txfile in enumerate(txfiles):
+		try:
+			init_coin('BTC',testnet=False)
+			tmp_tx = mmgen.tx.MMGenTX(txfile,metadata_only=True)
+			groups.setdefault((tmp_tx.coin,tmp_tx.chain,tmp_tx.dcoin),(tmp_tx,[]))[1].append(idx)
+		except Exception as e:
+			handle_tx_exception(e,txfile)
+		except:
+			pass
+	return list(groups.values())
+
+def get_summary_data(tx):
+	"the transaction's summary, as text, so it may be passed back from a worker process"
+	if opt.full_summary:
+		return tx.format_view(terse=True)
+	return (tx.txid.fmt(width=6,color=True),
+			[(o.addr.fmt(width=44,color=True),o._amt.hl() + ' ' + yellow(tx.coin))
+				for o in tx.outputs if not o.mmid])
+
+def sign_and_write_tx(d):
+	"sign a transaction and write it to file, returning its summary data, or None on failure"
+	txfile,tx = d
 	try:
-		init_coin('BTC',testnet=False)
-		tmp_tx = mmgen.tx.MMGenTX(txfile,metadata_only=True)
-		init_coin(tmp_tx.coin)
-
-		if tmp_tx.chain != 'mainnet':
-			if tmp_tx.chain == 'testnet' or (
-				hasattr(g.proto,'chain_name') and tmp_tx.chain != g.proto.chain_name):
-				init_coin(tmp_tx.coin,testnet=True)
-
-		if hasattr(g.proto,'chain_name'):
-			m = 'Chains do not match! tx file: {}, proto: {}'
-			assert tmp_tx.chain == g.proto.chain_name,m.format(tmp_tx.chain,g.proto.chain_name)
-
-		g.chain = tmp_tx.chain
-		g.token = tmp_tx.dcoin
-		g.dcoin = tmp_tx.dcoin or g.coin
-
-		tx = mmgen.tx.MMGenTX(txfile,offline=True)
+		if txsign(tx,[],None,None):
+			tx.write_to_file(ask_write=False,atomic=True)
+			return get_summary_data(tx)
+	except Exception as e:
+		handle_tx_exception(e,txfile)
+	except:
+		pass
+	return None
+
+def load_txs():
+	"""
+	read and parse the unsigned transactions in the tx directory.  Returns the list of
+	unsigned transaction files and a list of (metadata,transactions) groups, one per coin
+	and chain, where transactions is a list of (file index,(filename,MMGenTX)) tuples.
+	Transactions that can't be loaded are omitted
+	"""
+	dirlist  = os.listdir(tx_dir)
+	raw      = [f      for f in dirlist if f[-6:] == '.rawtx']
+	signed   = [f[:-6] for f in dirlist if f[-6:] == '.sigtx']
+	unsigned = sorted(os.path.join(tx_dir,f) for f in raw if f[:-6] not in signed)
 
+	groups = []
+	for tmp_tx,idxs in get_tx_groups(unsigned):
+		txs = []
+		try:
+			init_tx_proto(tmp_tx)
+			for idx in idxs:
+				try:
+					txs.append((idx,(unsigned[idx],mmgen.tx.MMGenTX(unsigned[idx],offline=True,quiet_open=True))))
+				except Exception as e:
+					handle_tx_exception(e,unsigned[idx])
+				except:
+					pass
+		except Exception as e:
+			handle_tx_exception(e,unsigned[idxs[0]])
+		except:
+			pass
+		groups.append((tmp_tx,txs))
+	return unsigned,groups
+
+def sign_tx_group(tmp_tx,txs,jobs):
+	"""
+	sign loaded transactions of the same coin and chain, returning a list of (file index,
+	summary data) pairs, with None as the summary data of failed transactions.  Keys for
+	all the transactions are generated from the decrypted seeds up front, and forked worker
+	processes inherit them along with the transactions
+	"""
+	try:
+		init_tx_proto(tmp_tx)
 		if g.proto.sign_mode == 'daemon':
 			rpc_init(reinit=True)
-
-		if txsign(tx,wfs,None,None):
-			tx.write_to_file(ask_write=False)
-			signed_txs.append(tx)
-			return True
-		else:
-			return False
+		try:
+			generate_keys_for_txs([tx for idx,(txfile,tx) in txs],[],saved_seeds)
+		except SystemExit: # missing keys are reported when each transaction is signed
+			pass
 	except Exception as e:
-		msg('An error occurred: {}'.format(e.args[0]))
-		if g.debug or g.traceback:
-			print_stack_trace('AUTOSIGN {}'.format(txfile))
-		return False
+		handle_tx_exception(e,txs[0][1][0])
+		return []
 	except:
-		return False
+		return []
 
-def sign():
-	dirlist  = os.listdir(tx_dir)
-	raw      = [f      for f in dirlist if f[-6:] == '.rawtx']
-	signed   = [f[:-6] for f in dirlist if f[-6:] == '.sigtx']
-	unsigned = [os.path.join(tx_dir,f) for f in raw if f[:-6] not in signed]
+	return list(zip([idx for idx,d in txs],map_txs(sign_and_write_tx,[d for idx,d in txs],jobs)))
 
+def sign(unsigned,groups):
 	if unsigned:
-		signed_txs,fails = [],[]
-		for txfile in unsigned:
-			ret = sign_tx_file(txfile,signed_txs)
-			if not ret:
-				fails.append(txfile)
-			qmsg('')
+		jobs = get_jobs('signing')
+		results = [None] * len(unsigned)
+		for tmp_tx,txs in groups:
+			if txs:
+				for idx,r in sign_tx_group(tmp_tx,txs,jobs):
+					results[idx] = r
+		signed_txs = [r for r in results if r is not None]
+		fails = [f for f,r in zip(unsigned,results) if r is None]
 		time.sleep(0.3)
 		msg('{} transaction{} signed'.format(len(signed_txs),suf(signed_txs)))
 		if fails:
@@ -227,7 +315,7 @@ def sign():
 			print_summary(signed_txs)
 		if fails:
 			rmsg('{}Failed transactions:'.format('' if opt.full_summary else '\n'))
-			rmsg('  ' + '\n  '.join(sorted(fails)) + '\n')
+			rmsg('  ' + '\n  '.join(fails) + '\n')
 		return False if fails else True
 	else:
 		msg('No unsigned transactions')
@@ -241,10 +329,14 @@ def decrypt_wallets():
 #	opt.passwd_file = '/tmp/key'
 	from mmgen.seed import SeedSource
 	msg("Unlocking wallet{} with key from '{}'".format(suf(wfs),opt.passwd_file))
+	# the seeds are decrypted once per session and shared by all transactions
+	saved_seeds.clear()
+	saved_keys.clear()
 	fails = 0
 	for wf in wfs:
 		try:
-			SeedSource(wf)
+			seed = SeedSource(wf).seed
+			saved_seeds[seed.sid] = seed
 		except SystemExit as e:
 			if e.code != 0:
 				fails += 1
@@ -256,16 +348,11 @@ def print_summary(signed_txs):
 
 	if opt.full_summary:
 		bmsg('\nAutosign summary:\n')
-		for tx in signed_txs:
-			init_coin(tx.coin,tx.chain == 'testnet')
-			msg_r(tx.format_view(terse=True))
+		for view in signed_txs:
+			msg_r(view)
 		return
 
-	body = []
-	for tx in signed_txs:
-		non_mmgen = [o for o in tx.outputs if not o.mmid]
-		if non_mmgen:
-			body.append((tx,non_mmgen))
+	body = [(txid,non_mmgen) for txid,non_mmgen in signed_txs if non_mmgen]
 
 	if body:
 		bmsg('\nAutosign summary:')
@@ -273,22 +360,26 @@ def print_summary(signed_txs):
 		t_wid,a_wid = 6,44
 		msg(fs.format('TX ID ','Non-MMGen outputs'+' '*(a_wid-17),'Amount'))
 		msg(fs.format('-'*t_wid, '-'*a_wid, '-'*7))
-		for tx,non_mmgen in body:
-			for nm in non_mmgen:
-				msg(fs.format(
-					tx.txid.fmt(width=t_wid,color=True) if nm is non_mmgen[0] else ' '*t_wid,
-					nm.addr.fmt(width=a_wid,color=True),
-					nm._amt.hl() + ' ' + yellow(tx.coin)))
+		for txid,non_mmgen in body:
+			for n,(addr,amt) in enumerate(non_mmgen):
+				msg(fs.format((' '*t_wid,txid)[n == 0],addr,amt))
 	else:
 		msg('No non-MMGen outputs')
 
 def do_sign():
 	if not opt.stealth_led: set_led('busy')
 	do_mount()
-	key_ok = decrypt_wallets()
-	if key_ok:
+	# decrypt the wallets in a separate thread while the transactions are read and parsed.
+	# Decryption doesn't use the coin protocol, which is set per transaction group
+	import threading
+	key_ok = []
+	t = threading.Thread(target=lambda: key_ok.append(decrypt_wallets()),name='decrypt wallets')
+	t.start()
+	txs = load_txs()
+	t.join()
+	if key_ok and key_ok[0]:
 		if opt.stealth_led: set_led('busy')
-		ret = sign()
+		ret = sign(*txs)
 		do_umount()
 		set_led(('standby','off','error')[(not ret)*2 or bool(opt.stealth_led)])
 		return ret
@@ -388,7 +479,7 @@ def set_led(cmd):
 
 def get_insert_status():
 	if opt.no_insert_check: return True
-	try: os.stat(os.path.join('/dev/disk/by-label',part_label))
+	try: os.stat(os.path.join(label_dir,part_label))
 	except: return False
 	else: return True
 
@@ -396,18 +487,30 @@ def do_loop():
 	n,prev_status = 0,False
 	if not opt.stealth_led:
 		set_led('standby')
+	from mmgen.devwatch import DeviceWatcher
+	# with --no-insert-check, also watch the tx directory for new unsigned transactions
+	watcher = DeviceWatcher(label_dir,part_label,
+				file_dir = tx_dir if opt.no_insert_check else None,
+				file_ext = '.rawtx',
+				poll     = opt.poll )
+	vmsg('Waiting for device insertion using {}'.format(('polling','inotify')[watcher.using_inotify]))
+	new_files = False
 	while True:
 		status = get_insert_status()
 		if status and not prev_status:
 			msg('Device insertion detected')
 			do_sign()
+		elif status and new_files:
+			msg('\nNew transactions detected')
+			do_sign()
 		prev_status = status
 		if not n % 10:
 			msg_r('\r{}\rWaiting'.format(' '*17))
 			sys.stderr.flush()
-		time.sleep(1)
-		msg_r('.')
-		n += 1
+		label_changed,new_files = watcher.wait(1)
+		if not (label_changed or new_files):
+			msg_r('.')
+			n += 1
 
 def check_access(fn,desc='status LED control',init_val=None):
 	try:
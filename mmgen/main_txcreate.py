@@ -22,6 +22,7 @@ mmgen-txcreate: Create a cryptocoin transaction with MMGen- and/or non-MMGen
 """
 
 from mmgen.common import *
+from mmgen.coinselect import CoinSelector
 
 opts_data = {
 	'sets': [('yes', True, 'quiet', True)],
@@ -32,6 +33,8 @@ opts_data = {
 -h, --help            Print this help message
 --, --longhelp        Print help message for long options (common options)
 -a, --tx-fee-adj=  f  Adjust transaction fee by factor 'f' (see below)
+-A, --auto-inputs= s  Select inputs automatically using strategy 's'
+                      (options: {cs})
 -B, --no-blank        Don't blank screen before displaying unspent outputs
 -c, --comment-file=f  Source the transaction's comment from file 'f'
 -C, --tx-confs=    c  Desired number of confirmations (default: {g.tx_confs})
@@ -63,6 +66,7 @@ opts_data = {
 			fu=help_notes('rel_fee_desc'),
 			fl=help_notes('fee_spec_letters'),
 			cu=g.coin,
+			cs=', '.join(CoinSelector.strategies),
 			g=g),
 		'notes': lambda s: s.format(
 			help_notes('txcreate'),
@@ -23,6 +23,7 @@ mmgen-txdo: Create, sign and broadcast an online MMGen transaction
 from mmgen.common import *
 from mmgen.seed import SeedSource
 from mmgen.obj import SubSeedIdxRange
+from mmgen.coinselect import CoinSelector
 
 opts_data = {
 	'sets': [('yes', True, 'quiet', True)],
@@ -33,6 +34,8 @@ opts_data = {
 -h, --help             Print this help message
 --, --longhelp         Print help message for long options (common options)
 -a, --tx-fee-adj=    f Adjust transaction fee by factor 'f' (see below)
+-A, --auto-inputs=   s Select inputs automatically using strategy 's'
+                       (options: {cs})
 -b, --brain-params=l,p Use seed length 'l' and hash preset 'p' for
                        brainwallet input
 -B, --no-blank         Don't blank screen before displaying unspent outputs
@@ -94,6 +97,7 @@ column below:
 		'options': lambda s: s.format(
 			g=g,pnm=g.proj_name,pnl=g.proj_name.lower(),
 			kgs=' '.join(['{}:{}'.format(n,k) for n,k in enumerate(g.key_generators,1)]),
+			cs=', '.join(CoinSelector.strategies),
 			fu=help_notes('rel_fee_desc'),
 			fl=help_notes('fee_spec_letters'),
 			ss=g.subseeds,ss_max=SubSeedIdxRange.max_idx,
@@ -49,6 +49,7 @@ opts_data = {
 -p, --hash-preset=p   Use the scrypt hash parameters defined by preset 'p'
                       for password hashing (default: '{g.hash_preset}')
 -z, --show-hash-presets Show information on available hash presets
+-j, --jobs=        j  Search for subseeds using 'j' processes (default: 1)
 -k, --keys-from-file=f Provide additional keys for non-{pnm} addresses
 -K, --key-generator=m Use method 'm' for public key generation
                       Options: {kgs} (default: {kg})
@@ -59,6 +60,8 @@ opts_data = {
                       mappings, so the user should record its checksum.
 -P, --passwd-file= f  Get {pnm} wallet or {dn} passphrase from file 'f'
 -q, --quiet           Suppress warnings; overwrite files without prompting
+-s, --sign-with-daemon Sign with the coin daemon rather than with {pnm}'s
+                      native signing code
 -I, --info            Display information about the transaction and exit
 -t, --terse-info      Like '--info', but produce more concise output
 -u, --subseeds=     n The number of subseed pairs to scan for (default: {ss},
@@ -94,7 +97,7 @@ infiles = opts.init(opts_data,add_opts=['b16'])
 if not infiles: opts.usage()
 for i in infiles: check_infile(i)
 
-if g.proto.sign_mode == 'daemon':
+if g.proto.sign_mode == 'daemon' or (g.proto.sign_mode == 'native' and opt.sign_with_daemon):
 	rpc_init()
 
 if not opt.info and not opt.terse_info:
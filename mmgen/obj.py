@@ -485,6 +485,14 @@ class CoinAddr(str,Hilite,InitErrors,MMGenObject):
 		except Exception as e:
 			return cls.init_fail(e,s,objname='{} address'.format(g.proto.__name__))
 
+	@classmethod
+	def from_generated(cls,s,addr_fmt,hexdata):
+		"create a CoinAddr from an address just generated from a key, which needs no checking"
+		me = str.__new__(cls,s)
+		me.addr_fmt = addr_fmt
+		me.hex = hexdata
+		return me
+
 	@classmethod
 	def fmtc(cls,s,**kwargs):
 		# True -> 'cyan': use the str value override hack
@@ -683,6 +691,9 @@ class WifKey(str,Hilite,InitErrors):
 			return cls.init_fail(e,s)
 
 class PubKey(HexStr,MMGenObject): # TODO: add some real checks
+	"""
+	A public key in hex.  The binary key is available as attribute 'bytes'
+	"""
 	def __new__(cls,s,compressed,on_fail='die'):
 		try:
 			assert type(compressed) == bool,"'compressed' must be of type bool"
@@ -691,9 +702,28 @@ class PubKey(HexStr,MMGenObject): # TODO: add some real checks
 		me = HexStr.__new__(cls,s,case='lower',on_fail=on_fail)
 		if me:
 			me.compressed = compressed
+			me.bytes = bytes.fromhex(me)
 			return me
 
+	@classmethod
+	def from_bytes(cls,data,compressed):
+		"create a PubKey from a binary public key"
+		assert type(compressed) == bool,"'compressed' must be of type bool"
+		me = str.__new__(cls,data.hex()) # output of bytes.hex() needs no checking
+		me.compressed = compressed
+		me.bytes = data
+		return me
+
+	@classmethod
+	def list_from_bytes(cls,buf,key_len,compressed):
+		"create a list of PubKeys from a buffer of concatenated binary public keys"
+		assert not len(buf) % key_len,'buffer length not a multiple of key length'
+		return [cls.from_bytes(buf[i:i+key_len],compressed) for i in range(0,len(buf),key_len)]
+
 class PrivKey(str,Hilite,InitErrors,MMGenObject):
+	"""
+	A private key in hex.  The binary key is available as attribute 'bytes'
+	"""
 
 	color = 'red'
 	width = 64
@@ -715,6 +745,7 @@ class PrivKey(str,Hilite,InitErrors,MMGenObject):
 				assert set(wif) <= set(ascii_letters+digits),'not an ascii alphanumeric string'
 				w2h = g.proto.wif2hex(wif) # raises exception on error
 				me = str.__new__(cls,w2h['hex'])
+				me.bytes = bytes.fromhex(me)
 				me.compressed = w2h['compressed']
 				me.pubkey_type = w2h['pubkey_type']
 				me.wif = str.__new__(WifKey,wif) # check has been done
@@ -733,7 +764,9 @@ class PrivKey(str,Hilite,InitErrors,MMGenObject):
 					me = str.__new__(cls,s.hex())
 				else:
 					me = str.__new__(cls,g.proto.preprocess_key(s.hex(),pubkey_type))
-					me.wif = WifKey(g.proto.hex2wif(me,pubkey_type,compressed),on_fail='raise')
+					# WIF generated from a checked key needs no checking
+					me.wif = str.__new__(WifKey,g.proto.hex2wif(me,pubkey_type,compressed))
+				me.bytes = bytes.fromhex(me)
 				me.compressed = compressed
 				me.pubkey_type = pubkey_type
 				me.orig_hex = s.hex() # save the non-preprocessed key
@@ -27,10 +27,16 @@ from mmgen.globalvars import g
 import mmgen.bech32 as bech32
 
 def hash160(hexnum): # take hex, return hex - OP_HASH160
-	return hashlib.new('ripemd160',hashlib.sha256(bytes.fromhex(hexnum)).digest()).hexdigest()
+	return hash160_bytes(bytes.fromhex(hexnum)).hex()
 
 def hash256(hexnum): # take hex, return hex - OP_HASH256
-	return hashlib.sha256(hashlib.sha256(bytes.fromhex(hexnum)).digest()).hexdigest()
+	return hash256_bytes(bytes.fromhex(hexnum)).hex()
+
+def hash160_bytes(data): # take bytes, return bytes - OP_HASH160
+	return hashlib.new('ripemd160',hashlib.sha256(data).digest()).digest()
+
+def hash256_bytes(data): # take bytes, return bytes - OP_HASH256
+	return hashlib.sha256(hashlib.sha256(data).digest()).digest()
 
 _b58a='123456789ABCDEFGHJKLMNPQRSTUVWXYZabcdefghijkmnopqrstuvwxyz'
 
@@ -42,23 +48,33 @@ _b58a='123456789ABCDEFGHJKLMNPQRSTUVWXYZabcdefghijkmnopqrstuvwxyz'
 # 1111111111111111111114oLvT2 (pubkeyhash = '\0'*20)
 
 def _b58chk_encode(hexstr):
-	lzeroes = (len(hexstr) - len(hexstr.lstrip('0'))) // 2
-	def b58enc(n):
-		while n:
-			yield _b58a[n % 58]
-			n //= 58
-	return ('1' * lzeroes) + ''.join(b58enc(int(hexstr+hash256(hexstr)[:8],16)))[::-1]
+	return _b58chk_encode_bytes(bytes.fromhex(hexstr))
 
 def _b58chk_decode(s):
+	return _b58chk_decode_bytes(s).hex()
+
+_b58pairs = [a+b for a in _b58a for b in _b58a] # two digits per division
+
+def _b58chk_encode_bytes(data):
+	lzeroes = len(data) - len(data.lstrip(b'\0'))
+	n = int.from_bytes(data + hash256_bytes(data)[:4],'big')
+	ret = []
+	while n:
+		n,r = divmod(n,3364)
+		ret.append(_b58pairs[r])
+	return ('1' * lzeroes) + ''.join(reversed(ret)).lstrip('1')
+
+def _b58chk_decode_bytes(s):
 	lzeroes = len(s) - len(s.lstrip('1'))
-	hexstr = '{}{:x}'.format(
-				'00' * lzeroes,
-				sum(_b58a.index(ch) * 58**n for n,ch in enumerate(s[::-1])) )
-	if len(hexstr) % 2: hexstr = '0' + hexstr
-	if hexstr[-8:] != hash256(hexstr[:-8])[:8]:
+	n = 0
+	for ch in s:
+		n = n * 58 + _b58a.index(ch)
+	data = bytes(lzeroes) + n.to_bytes((n.bit_length() + 7) // 8,'big')
+	chk = hash256_bytes(data[:-4])[:4]
+	if data[-4:] != chk:
 		fs = '_b58chk_decode(): {}: incorrect checksum for {!r}, expected {}'
-		raise ValueError(fs.format(hexstr[-8:],hexstr[:-8],hash256(hexstr[:-8])[:8]))
-	return hexstr[:-8]
+		raise ValueError(fs.format(data[-4:].hex(),data[:-4].hex(),chk.hex()))
+	return data[:-4]
 
 # chainparams.cpp
 class BitcoinProtocol(MMGenObject):
@@ -92,7 +108,7 @@ class BitcoinProtocol(MMGenObject):
 	witness_vernum_hex = '00'
 	witness_vernum     = int(witness_vernum_hex,16)
 	bech32_hrp         = 'bc'
-	sign_mode          = 'daemon'
+	sign_mode          = 'native' # 'daemon': sign with the coin daemon
 	secp256k1_ge       = 0xfffffffffffffffffffffffffffffffebaaedce6af48a03bbfd25e8cd0364141
 	privkey_len        = 32
 
@@ -182,25 +198,41 @@ class BitcoinProtocol(MMGenObject):
 	@classmethod
 	def pubhash2addr(cls,pubkey_hash,p2sh):
 		assert len(pubkey_hash) == 40,'{}: invalid length for pubkey hash'.format(len(pubkey_hash))
-		s = cls.addr_ver_num[('p2pkh','p2sh')[p2sh]][0] + pubkey_hash
-		return _b58chk_encode(s)
+		return cls.pubhash2addr_bytes(bytes.fromhex(pubkey_hash),p2sh)
 
 	# Segwit:
 	@classmethod
 	def pubhex2redeem_script(cls,pubhex):
+		return cls.pubkey2redeem_script_bytes(bytes.fromhex(pubhex)).hex()
+
+	@classmethod
+	def pubhex2segwitaddr(cls,pubhex):
+		return cls.pubkey2segwitaddr_bytes(bytes.fromhex(pubhex))
+
+	@classmethod
+	def pubhash2bech32addr(cls,pubhash):
+		return cls.pubhash2bech32addr_bytes(bytes.fromhex(pubhash))
+
+	# Binary versions of the above, used for address generation:
+	@classmethod
+	def pubhash2addr_bytes(cls,pubkey_hash,p2sh):
+		assert len(pubkey_hash) == 20,'{}: invalid length for pubkey hash'.format(len(pubkey_hash)*2)
+		return _b58chk_encode_bytes(bytes.fromhex(cls.addr_ver_num[('p2pkh','p2sh')[p2sh]][0]) + pubkey_hash)
+
+	@classmethod
+	def pubkey2redeem_script_bytes(cls,pubkey):
 		# https://bitcoincore.org/en/segwit_wallet_dev/
 		# The P2SH redeemScript is always 22 bytes. It starts with a OP_0, followed
 		# by a canonical push of the keyhash (i.e. 0x0014{20-byte keyhash})
-		return cls.witness_vernum_hex + '14' + hash160(pubhex)
+		return bytes([cls.witness_vernum,0x14]) + hash160_bytes(pubkey)
 
 	@classmethod
-	def pubhex2segwitaddr(cls,pubhex):
-		return cls.pubhash2addr(hash160(cls.pubhex2redeem_script(pubhex)),p2sh=True)
+	def pubkey2segwitaddr_bytes(cls,pubkey):
+		return cls.pubhash2addr_bytes(hash160_bytes(cls.pubkey2redeem_script_bytes(pubkey)),p2sh=True)
 
 	@classmethod
-	def pubhash2bech32addr(cls,pubhash):
-		d = list(bytes.fromhex(pubhash))
-		return bech32.bech32_encode(cls.bech32_hrp,[cls.witness_vernum]+bech32.convertbits(d,8,5))
+	def pubhash2bech32addr_bytes(cls,pubhash):
+		return bech32.bech32_encode(cls.bech32_hrp,[cls.witness_vernum]+bech32.convertbits(pubhash,8,5))
 
 class BitcoinTestnetProtocol(BitcoinProtocol):
 	addr_ver_num         = { 'p2pkh': ('6f',('m','n')), 'p2sh':  ('c4','2') }
@@ -230,6 +262,10 @@ class BitcoinCashProtocol(BitcoinProtocol):
 	def pubhex2redeem_script(cls,pubhex): raise NotImplementedError
 	@classmethod
 	def pubhex2segwitaddr(cls,pubhex):    raise NotImplementedError
+	@classmethod
+	def pubkey2redeem_script_bytes(cls,pubkey): raise NotImplementedError
+	@classmethod
+	def pubkey2segwitaddr_bytes(cls,pubkey):    raise NotImplementedError
 
 class BitcoinCashTestnetProtocol(BitcoinCashProtocol):
 	rpc_port      = 18442
@@ -28,9 +28,34 @@ from mmgen.common import *
 def dmsg_rpc(s):
 	if g.debug_rpc: msg(s)
 
+# Raised when the daemon closed a kept-alive connection before replying, so that the
+# request was not performed and may safely be sent again.  Timeouts are not included:
+# the daemon may still be performing the request.
+conn_closed_errors = (http.client.RemoteDisconnected,ConnectionResetError,BrokenPipeError)
+
+class RPCJSONEncoder(json.JSONEncoder):
+
+	def __init__(self,ca_type):
+		self.ca_type = ca_type
+		json.JSONEncoder.__init__(self)
+
+	def default(self,obj):
+		from mmgen.obj import HexStr
+		if isinstance(obj,g.proto.coin_amt):
+			return self.ca_type(obj)
+		elif isinstance(obj,HexStr):
+			return obj
+		else:
+			return json.JSONEncoder.default(self,obj)
+
+# Persistent HTTP/1.1 connections, one per process and daemon host/port
+_http_conns = {}
+
 class CoinDaemonRPCConnection(MMGenObject):
 
 	auth = True
+	keepalive = True
+	batch_chunk_size = 500
 	db_fs = '    host [{h}] port [{p}] user [{u}] passwd [{pw}] auth_cookie [{c}]\n'
 
 	def __init__(self,host=None,port=None,user=None,passwd=None,auth_cookie=None):
@@ -38,12 +63,6 @@ class CoinDaemonRPCConnection(MMGenObject):
 		dmsg_rpc('=== {}.__init__() debug ==='.format(type(self).__name__))
 		dmsg_rpc(self.db_fs.format(h=host,p=port,u=user,pw=passwd,c=auth_cookie))
 
-		import socket
-		try:
-			socket.create_connection((host,port),timeout=3).close()
-		except:
-			raise SocketError('Unable to connect to {}:{}'.format(host,port))
-
 		if not self.auth:
 			pass
 		elif user and passwd:
@@ -67,9 +86,39 @@ class CoinDaemonRPCConnection(MMGenObject):
 		self.host = host
 		self.port = port
 
+		self.http_hdr = { 'Content-Type': 'application/json' }
+		if self.auth:
+			fs = '    RPC AUTHORIZATION data ==> raw: [{}]\n{:>31}enc: [Basic {}]\n'
+			as_enc = base64.b64encode(self.auth_str.encode())
+			dmsg_rpc(fs.format(self.auth_str,'',as_enc))
+			self.http_hdr.update({ 'Host':self.host, 'Authorization':'Basic {}'.format(as_enc.decode()) })
+
+		self.json_encoder = None
+
+		# open the persistent connection now, so that we fail immediately if the daemon is down
+		try:
+			hc = self.get_conn(timeout=3)
+			if hc.sock == None: hc.connect()
+		except:
+			raise SocketError('Unable to connect to {}:{}'.format(host,port))
+
+		def make_method(m):
+			return lambda self,*args,**kwargs: self.request(m,*args,**kwargs)
+
 		for method in self.rpcmethods:
-			exec('{c}.{m} = lambda self,*args,**kwargs: self.request("{m}",*args,**kwargs)'.format(
-						c=type(self).__name__,m=method))
+			setattr(type(self),method,make_method(method))
+
+	def get_conn(self,timeout):
+		"return the kept-alive connection to the daemon, creating it if necessary"
+		key = (os.getpid(),self.host,self.port) # never share a socket with a forked process
+		hc = _http_conns.get(key)
+		if hc == None or not self.keepalive:
+			if hc: hc.close()
+			hc = _http_conns[key] = http.client.HTTPConnection(self.host,self.port,timeout)
+		elif hc.timeout != timeout:
+			hc.timeout = timeout
+			if hc.sock: hc.sock.settimeout(timeout)
+		return hc
 
 	# Normal mode: call with arg list unrolled, exactly as with cli
 	# Batch mode:  call with list of arg lists as first argument
@@ -80,6 +129,40 @@ class CoinDaemonRPCConnection(MMGenObject):
 	# With on_fail='return', returns 'rpcfail',(resp_object,(die_args))
 	def request(self,cmd,*args,**kwargs):
 
+		cf,data = self.prepare_request(cmd,args,kwargs)
+
+		# A kept-alive connection may have been closed by the daemon since the last request.
+		# If so, the request fails before a response is received, and we retry once with a
+		# fresh connection.
+		for retry in (True,False):
+			hc = self.get_conn(cf['timeout'])
+			reused = hc.sock != None
+
+			try:
+				hc.request('POST','/',data,self.http_hdr)
+			except Exception as e:
+				hc.close()
+				if reused and retry and isinstance(e,conn_closed_errors): continue
+				m = '{}\nUnable to connect to {} at {}:{}'
+				return self.do_fail(cf,None,2,m.format(
+					e.args[0] if e.args else e,g.proto.daemon_name,self.host,self.port))
+
+			try:
+				r = hc.getresponse() # returns HTTPResponse instance
+				break
+			except Exception as e:
+				hc.close()
+				if reused and retry and isinstance(e,conn_closed_errors): continue
+				m = 'Unable to connect to {} at {}:{} (but port is bound?)'
+				return self.do_fail(cf,None,2,m.format(g.proto.daemon_name,self.host,self.port))
+
+		dmsg_rpc('    RPC GETRESPONSE data ==> {}\n'.format(r.__dict__))
+
+		return self.process_response(cf,r,r.read().decode())
+
+	def prepare_request(self,cmd,args,kwargs):
+		"return the request config and JSON-encoded POST data for a request"
+
 		if g.debug:
 			print_stack_trace('RPC REQUEST {}\n  args: {!r}\n  kwargs: {!r}'.format(cmd,args,kwargs))
 
@@ -88,100 +171,93 @@ class CoinDaemonRPCConnection(MMGenObject):
 
 		cf = { 'timeout':g.http_timeout, 'batch':False, 'on_fail':'raise' }
 
-		if cf['on_fail'] not in ('raise','return','silent'):
-			raise ValueError("request(): {}: illegal value for 'on_fail'".format(cf['on_fail']))
-
 		for k in cf:
 			if k in kwargs and kwargs[k]: cf[k] = kwargs[k]
 
-		hc = http.client.HTTPConnection(self.host,self.port,cf['timeout'])
+		if cf['on_fail'] not in ('raise','return','silent'):
+			raise ValueError("request(): {}: illegal value for 'on_fail'".format(cf['on_fail']))
 
 		if cf['batch']:
 			p = [{'method':cmd,'params':r,'id':n,'jsonrpc':'2.0'} for n,r in enumerate(args[0],1)]
 		else:
 			p = {'method':cmd,'params':args,'id':1,'jsonrpc':'2.0'}
 
-		def do_fail(*args): # args[0] is either None or HTTPResponse object
-			if cf['on_fail'] in ('return','silent'): return 'rpcfail',args
-
-			try:    s = '{}'.format(args[2])
-			except: s = repr(args[2])
-
-			if s == '' and args[0] != None:
-				from http import HTTPStatus
-				hs = HTTPStatus(args[0].code)
-				s = '{} {}'.format(hs.value,hs.name)
-
-			raise RPCFailure(s)
-
 		dmsg_rpc('=== request() debug ===')
 		dmsg_rpc('    RPC POST data ==> {}\n'.format(p))
 
 		ca_type = self.coin_amt_type if hasattr(self,'coin_amt_type') else str
-		from mmgen.obj import HexStr
-		class MyJSONEncoder(json.JSONEncoder):
-			def default(self,obj):
-				if isinstance(obj,g.proto.coin_amt):
-					return ca_type(obj)
-				elif isinstance(obj,HexStr):
-					return obj
-				else:
-					return json.JSONEncoder.default(self,obj)
-
-		http_hdr = { 'Content-Type': 'application/json' }
-		if self.auth:
-			fs = '    RPC AUTHORIZATION data ==> raw: [{}]\n{:>31}enc: [Basic {}]\n'
-			as_enc = base64.b64encode(self.auth_str.encode())
-			dmsg_rpc(fs.format(self.auth_str,'',as_enc))
-			http_hdr.update({ 'Host':self.host, 'Authorization':'Basic {}'.format(as_enc.decode()) })
+		if not self.json_encoder or self.json_encoder.ca_type != ca_type:
+			self.json_encoder = RPCJSONEncoder(ca_type)
 
-		try:
-			hc.request('POST','/',json.dumps(p,cls=MyJSONEncoder),http_hdr)
-		except Exception as e:
-			m = '{}\nUnable to connect to {} at {}:{}'
-			return do_fail(None,2,m.format(e.args[0],g.proto.daemon_name,self.host,self.port))
+		return cf,self.json_encoder.encode(p)
 
-		try:
-			r = hc.getresponse() # returns HTTPResponse instance
-		except Exception:
-			m = 'Unable to connect to {} at {}:{} (but port is bound?)'
-			return do_fail(None,2,m.format(g.proto.daemon_name,self.host,self.port))
+	@staticmethod
+	def do_fail(cf,*args): # args[0] is either None or HTTPResponse object
+		if cf['on_fail'] in ('return','silent'): return 'rpcfail',args
 
-		dmsg_rpc('    RPC GETRESPONSE data ==> {}\n'.format(r.__dict__))
+		try:    s = '{}'.format(args[2])
+		except: s = repr(args[2])
+
+		if s == '' and args[0] != None:
+			from http import HTTPStatus
+			hs = HTTPStatus(args[0].code)
+			s = '{} {}'.format(hs.value,hs.name)
+
+		raise RPCFailure(s)
+
+	def process_response(self,cf,r,r2):
+		"check the HTTP response 'r' with body 'r2' and return the result(s) it contains"
 
 		if r.status != 200:
 			if cf['on_fail'] not in ('silent','raise'):
 				msg_r(yellow('{} RPC Error: '.format(g.proto.daemon_name.capitalize())))
 				msg(red('{} {}'.format(r.status,r.reason)))
-			e1 = r.read().decode()
 			try:
-				e3 = json.loads(e1)['error']
+				e3 = json.loads(r2)['error']
 				e2 = '{} (code {})'.format(e3['message'],e3['code'])
 			except:
-				e2 = str(e1)
-			return do_fail(r,1,e2)
-
-		r2 = r.read().decode()
+				e2 = str(r2)
+			return self.do_fail(cf,r,1,e2)
 
 		dmsg_rpc('    RPC REPLY data ==> {}\n'.format(r2))
 
 		if not r2:
-			return do_fail(r,2,'Empty reply')
+			return self.do_fail(cf,r,2,'Empty reply')
 
 		r3 = json.loads(r2,parse_float=Decimal)
 		ret = []
 
 		for resp in r3 if cf['batch'] else [r3]:
 			if 'error' in resp and resp['error'] != None:
-				return do_fail(r,1,'{} returned an error: {}'.format(
+				return self.do_fail(cf,r,1,'{} returned an error: {}'.format(
 					g.proto.daemon_name.capitalize(),resp['error']))
 			elif 'result' not in resp:
-				return do_fail(r,1, 'Missing JSON-RPC result\n' + repr(resps))
+				return self.do_fail(cf,r,1, 'Missing JSON-RPC result\n' + repr(resp))
 			else:
 				ret.append(resp['result'])
 
 		return ret if cf['batch'] else ret[0]
 
+	def batch_request(self,cmd,arg_lists,**kwargs):
+		"""
+		Like request() in batch mode, but split 'arg_lists' into batches of at most
+		'batch_chunk_size' calls, so that replies from the daemon remain of manageable size
+		"""
+		ret,n = [],self.batch_chunk_size
+		for i in range(0,len(arg_lists),n):
+			r = self.request(cmd,arg_lists[i:i+n],batch=True,**kwargs)
+			if rpc_error(r): return r
+			ret += r
+		return ret
+
+	def gather(self,calls,max_concurrency=None):
+		"""
+		Perform the RPC calls in 'calls' concurrently, returning their results in order.
+		Each call is a tuple (method,*args), optionally followed by a dict of request
+		kwargs, e.g. ('getmempoolentry',txid,{'on_fail':'silent'})
+		"""
+		return AsyncRPCConnection(self,max_concurrency).run(calls)
+
 	rpcmethods = (
 		'backupwallet',
 		'createrawtransaction',
@@ -192,10 +268,12 @@ class CoinDaemonRPCConnection(MMGenObject):
 		'getaddressesbyaccount',
 		'getaddressesbylabel',
 		'getbalance',
+		'getbestblockhash',
 		'getblock',
 		'getblockchaininfo',
 		'getblockcount',
 		'getblockhash',
+		'getblockheader',
 		'getmempoolinfo',
 		'getmempoolentry',
 		'getnettotals',
@@ -208,7 +286,9 @@ class CoinDaemonRPCConnection(MMGenObject):
 		'importaddress',
 		'listaccounts',
 		'listlabels',
+		'listsinceblock',
 		'listunspent',
+		'rescanblockchain',
 		'setlabel',
 		'sendrawtransaction',
 		'signrawtransaction',
@@ -261,6 +341,138 @@ class EthereumRPCConnection(CoinDaemonRPCConnection):
 		'parity_versionInfo',
 	)
 
+class AsyncRPCResponse(object):
+	def __init__(self,status,reason):
+		self.status = self.code = status
+		self.reason = reason
+
+class AsyncRPCConnection(MMGenObject):
+	"""
+	asyncio RPC client for the daemon of an existing CoinDaemonRPCConnection, with the
+	same method surface and 'on_fail' semantics.  Methods are coroutines:
+
+	  results = await asyncio.gather(c.getblockcount(),c.getmempoolentry(txid,on_fail='silent'))
+
+	At most 'max_concurrency' requests are in flight at any time, each on its own
+	kept-alive connection.  Synchronous callers may use run() or conn.gather().
+	"""
+
+	def __init__(self,conn,max_concurrency=None):
+		self.conn = conn
+		self.max_concurrency = max_concurrency or g.rpc_max_concurrency
+		self.sem = None
+		self.streams = [] # idle kept-alive connections
+
+		def make_method(m):
+			return lambda *args,**kwargs: self.request(m,*args,**kwargs)
+
+		for method in conn.rpcmethods:
+			setattr(self,method,make_method(method))
+
+	async def request(self,cmd,*args,**kwargs):
+		import asyncio
+		if not self.sem:
+			self.sem = asyncio.Semaphore(self.max_concurrency)
+
+		c = self.conn
+		cf,data = c.prepare_request(cmd,args,kwargs)
+
+		async with self.sem:
+			for retry in (True,False): # retry once if the daemon closed a kept-alive connection
+				reused = bool(self.streams)
+				try:
+					if not reused:
+						self.streams.append(await asyncio.wait_for(
+							asyncio.open_connection(c.host,c.port),cf['timeout']))
+				except Exception as e:
+					m = '{}\nUnable to connect to {} at {}:{}'
+					return c.do_fail(cf,None,2,m.format(
+						e.args[-1] if e.args else repr(e),g.proto.daemon_name,c.host,c.port))
+
+				stream = self.streams.pop()
+				try:
+					r,body,keepalive = await asyncio.wait_for(self.post(stream,data),cf['timeout'])
+					break
+				except Exception as e:
+					stream[1].close()
+					if reused and retry and isinstance(e,conn_closed_errors): continue
+					m = 'Unable to connect to {} at {}:{} (but port is bound?)'
+					return c.do_fail(cf,None,2,m.format(g.proto.daemon_name,c.host,c.port))
+
+			if keepalive:
+				self.streams.append(stream)
+			else:
+				stream[1].close()
+
+		return c.process_response(cf,r,body)
+
+	async def post(self,stream,data):
+		"send a POST request over 'stream', returning the response, body and keep-alive status"
+		reader,writer = stream
+		body = data.encode()
+		hdrs = dict(self.conn.http_hdr,**{'Host':self.conn.host,'Content-Length':str(len(body))})
+		writer.write(''.join(
+			['POST / HTTP/1.1\r\n'] + ['{}: {}\r\n'.format(k,v) for k,v in hdrs.items()] + ['\r\n']
+			).encode() + body)
+		await writer.drain()
+
+		status_line = (await reader.readline()).decode()
+		if not status_line:
+			raise http.client.RemoteDisconnected('connection closed by daemon')
+		version,status,reason = (status_line.rstrip('\r\n').split(' ',2) + [''])[:3]
+
+		hdrs = {}
+		while True:
+			line = (await reader.readline()).decode().rstrip('\r\n')
+			if not line: break
+			k,v = line.split(':',1)
+			hdrs[k.strip().lower()] = v.strip()
+
+		if hdrs.get('transfer-encoding','').lower() == 'chunked':
+			body = b''
+			while True:
+				size = int((await reader.readline()).split(b';')[0],16)
+				chunk = await reader.readexactly(size+2)
+				if not size: break
+				body += chunk[:-2]
+		else:
+			body = await reader.readexactly(int(hdrs.get('content-length',0)))
+
+		keepalive = hdrs.get('connection','').lower() != 'close' and version != 'HTTP/1.0'
+		return AsyncRPCResponse(int(status),reason),body.decode(),keepalive
+
+	def close(self):
+		for reader,writer in self.streams:
+			writer.close()
+		self.streams = []
+
+	def run(self,calls):
+		"perform 'calls' (see CoinDaemonRPCConnection.gather()) concurrently, returning results in order"
+		import asyncio
+
+		def make_coro(call):
+			if call and type(call[-1]) == dict:
+				return self.request(*call[:-1],**call[-1])
+			return self.request(*call)
+
+		async def do_gather():
+			tasks = [asyncio.ensure_future(make_coro(call)) for call in calls]
+			try:
+				return await asyncio.gather(*tasks)
+			except:
+				for t in tasks: t.cancel() # don't leave requests pending when one of them raises
+				await asyncio.gather(*tasks,return_exceptions=True)
+				raise
+			finally:
+				self.close()
+
+		loop = asyncio.new_event_loop()
+		try:
+			return loop.run_until_complete(do_gather())
+		finally:
+			self.sem = None # the semaphore is bound to the loop
+			loop.close()
+
 def rpc_error(ret):
 	return type(ret) is tuple and ret and ret[0] == 'rpcfail'
 
@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+#
+# mmgen = Multi-Mode GENerator, command-line Bitcoin cold storage solution
+# Copyright (C)2013-2019 The MMGen Project <mmgen@tuta.io>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+secp256k1_python: Pure-Python secp256k1 public key generation for the MMGen suite,
+                  used when the secp256k1 extension module is unavailable
+
+Multiples of the generator point are looked up in a table built once per process,
+points are accumulated in Jacobian coordinates, and lists of points are converted to
+affine coordinates with a single field inversion (Montgomery's trick).  Unlike the
+extension module, this code does not protect against timing attacks.
+"""
+
+# secp256k1: http://www.oid-info.com/get/1.3.132.0.10
+p  = 0xfffffffffffffffffffffffffffffffffffffffffffffffffffffffefffffc2f
+n  = 0xfffffffffffffffffffffffffffffffebaaedce6af48a03bbfd25e8cd0364141
+Gx = 0x79be667ef9dcbbac55a06295ce870b07029bfcdb2dce28d959f2815b16f81798
+Gy = 0x483ada7726a3c4655da4fbfc0e1108a8fd17b448a68554199c47d08ffb10d4b8
+
+def inv(x):
+	return pow(x,p-2,p)
+
+def jpt_double(pt):
+	"double a point in Jacobian coordinates (dbl-2009-l, a == 0)"
+	(X1, Y1, Z1) = pt
+	YY = (Y1*Y1) % p
+	S = (4*X1*YY) % p
+	M = (3*X1*X1) % p
+	X3 = (M*M - 2*S) % p
+	Y3 = (M*(S-X3) - 8*YY*YY) % p
+	Z3 = (2*Y1*Z1) % p
+	return (X3, Y3, Z3)
+
+def jpt_add_affine(pt1, x2, y2):
+	"""
+	add affine point (x2,y2) to a point in Jacobian coordinates (add-1998-cmo-2, Z2 == 1).
+	The points must be neither equal nor opposite, and pt1 must not be the point at infinity
+	"""
+	(X1, Y1, Z1) = pt1
+	ZZ = (Z1*Z1) % p
+	H = (x2*ZZ - X1) % p
+	R = (y2*ZZ*Z1 - Y1) % p
+	HH = (H*H) % p
+	HHH = (H*HH) % p
+	V = (X1*HH) % p
+	X3 = (R*R - HHH - 2*V) % p
+	Y3 = (R*(V-X3) - Y1*HHH) % p
+	Z3 = (Z1*H) % p
+	return (X3, Y3, Z3)
+
+def jpt_to_affine_many(pts):
+	"convert a list of points in Jacobian coordinates to affine, with a single inversion"
+	if not pts: return []
+	acc,prods = 1,[]
+	for pt in pts:
+		prods.append(acc)
+		acc = (acc * pt[2]) % p
+	acc_inv = inv(acc)
+	ret = [None] * len(pts)
+	for i in range(len(pts)-1,-1,-1):
+		(X, Y, Z) = pts[i]
+		zi = (acc_inv * prods[i]) % p
+		acc_inv = (acc_inv * Z) % p
+		zi2 = (zi*zi) % p
+		ret[i] = ((X*zi2) % p, (Y*zi2*zi) % p)
+	return ret
+
+fb_table = None
+
+def get_fb_table():
+	"""
+	Return the fixed-base table, with entry 255*i + j-1 holding the affine point j * 256**i * G
+	for byte position i of a little-endian scalar and byte value j
+	"""
+	global fb_table
+	if not fb_table:
+		pts = []
+		x,y = Gx,Gy
+		for i in range(32):
+			row = [(x, y, 1), jpt_double((x, y, 1))]
+			for j in range(254): # the last point, 256 * 256**i * G, begins the next row
+				row.append(jpt_add_affine(row[-1],x,y))
+			pts += row[:255]
+			(X, Y, Z) = row[255]
+			zi = inv(Z)
+			x,y = (X*zi*zi) % p, (Y*zi*zi*zi) % p
+		fb_table = jpt_to_affine_many(pts)
+	return fb_table
+
+def jpt_mult_base(e):
+	"return e*G in Jacobian coordinates, for 0 < e < n"
+	assert 0 < e < n,'private key out of range'
+	tbl = get_fb_table()
+	ret = None
+	# Partial sums are smaller multiples of G than each point added to them, so the two
+	# are never equal or opposite
+	for i,c in enumerate(e.to_bytes(32,'little')):
+		if c:
+			x,y = tbl[255*i+c-1]
+			ret = jpt_add_affine(ret,x,y) if ret else (x, y, 1)
+	return ret
+
+def priv2pub_many(privkeys,compressed):
+	"""
+	Return the serialized public keys for a list of 32-byte private keys, compressed if
+	'compressed' is true
+	"""
+	pts = jpt_to_affine_many([jpt_mult_base(int.from_bytes(k,'big')) for k in privkeys])
+	if compressed:
+		return [bytes([2 + (y & 1)]) + x.to_bytes(32,'big') for x,y in pts]
+	else:
+		return [b'\x04' + x.to_bytes(32,'big') + y.to_bytes(32,'big') for x,y in pts]
+
+def priv2pub(privkey,compressed):
+	return priv2pub_many([privkey],compressed)[0]
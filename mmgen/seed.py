@@ -82,6 +82,8 @@ class SeedBase(MMGenObject):
 class SubSeedList(MMGenObject):
 	have_short = True
 	nonce_start = 0
+	use_cache = True
+	parallel_min = 1000 # generate fewer subseeds than this in a single process
 
 	def __init__(self,parent_seed):
 		self.member_type = SubSeed
@@ -173,22 +175,76 @@ class SubSeedList(MMGenObject):
 		if last_sid != None:
 			last_sid = SeedID(sid=last_sid)
 
-		def add_subseed(idx,length):
+		def add_subseed(idx,length,sid=None):
 			for nonce in range(self.nonce_start,self.member_type.max_nonce+1): # handle SeedID collisions
-				sid = make_chksum_8(self.member_type.make_subseed_bin(self,idx,nonce,length))
+				if sid == None:
+					sid = make_chksum_8(self.member_type.make_subseed_bin(self,idx,nonce,length))
 				if not (sid in self.data['long'] or sid in self.data['short'] or sid == self.parent_seed.sid):
 					self.data[length][sid] = (idx,nonce)
 					return last_sid == sid
 				elif g.debug_subseed: # should get ≈450 collisions for first 1,000,000 subseeds
 					self._collision_debug_msg(sid,idx,nonce)
+				sid = None
 			else: # must exit here, as this could leave self.data in inconsistent state
 				raise SubSeedNonceRangeExceeded('add_subseed(): nonce range exceeded')
 
-		for idx in SubSeedIdxRange(first_idx,last_idx).iterate():
-			match1 = add_subseed(idx,'long')
-			match2 = add_subseed(idx,'short') if self.have_short else False
+		cache = self._get_cache()
+		if cache is not None:
+			first_idx,done = cache.restore(self,first_idx,last_idx,last_sid)
+			if done: return None
+
+		# Seed IDs for the starting nonce may be computed in advance and in parallel, as
+		# collisions are resolved here in index order, exactly as in serial generation
+		for idx,sids in self._precompute_sids(first_idx,last_idx):
+			match1 = add_subseed(idx,'long',sids[0])
+			match2 = add_subseed(idx,'short',sids[1]) if self.have_short else False
 			if match1 or match2: break
 
+		if cache is not None:
+			cache.save(self)
+
+	def _get_cache(self):
+		if not (self.use_cache and g.subseed_index_cache):
+			return None
+		if not hasattr(self,'_cache'):
+			self._cache = SubSeedIndexCache(self.parent_seed)
+		return self._cache
+
+	def _precompute_sids(self,first_idx,last_idx):
+		"yield (idx,(long_sid,short_sid)) for the starting nonce, in index order"
+		count = last_idx - first_idx + 1
+		jobs = get_jobs('subseed generation') if count >= self.parallel_min else 1
+		if jobs == 1:
+			for idx in SubSeedIdxRange(first_idx,last_idx).iterate():
+				yield idx,_subseed_sids(self,idx,idx)[0]
+			return
+
+		import multiprocessing as mp
+		from collections import deque
+		from concurrent.futures import ProcessPoolExecutor
+		chunk = max(1,min(5000,count//(jobs*8)))
+		starts = iter(range(first_idx,last_idx+1,chunk))
+		pool = ProcessPoolExecutor(
+			max_workers = jobs,
+			mp_context  = mp.get_context('fork'),
+			initializer = _subseed_worker_init,
+			initargs    = (self,) )
+		try:
+			pending = deque()
+			def submit():
+				n = next(starts,None)
+				if n != None:
+					pending.append((n,pool.submit(_subseed_worker,(n,min(n+chunk-1,last_idx)))))
+			for i in range(jobs*2): submit() # don't run too far ahead, as the caller may stop early
+			while pending:
+				n,fut = pending.popleft()
+				submit()
+				for idx,sids in enumerate(fut.result(),n):
+					yield idx,sids
+		finally:
+			for n,fut in pending: fut.cancel()
+			pool.shutdown()
+
 	def format(self,first_idx,last_idx):
 
 		r = SubSeedIdxRange(first_idx,last_idx)
@@ -209,6 +265,101 @@ class SubSeedList(MMGenObject):
 
 		return hdr + ''.join(body)
 
+_subseed_worker_list = None
+
+def _subseed_worker_init(ss_list):
+	global _subseed_worker_list
+	_subseed_worker_list = ss_list
+
+def _subseed_worker(idx_range): # return plain strings, as HexStr doesn't survive pickling
+	return [tuple(s and str(s) for s in sids) for sids in _subseed_sids(_subseed_worker_list,*idx_range)]
+
+def _subseed_sids(ss_list,first_idx,last_idx):
+	"Seed IDs of long and short subseeds 'first_idx' through 'last_idx' for the starting nonce"
+	make_bin,n = ss_list.member_type.make_subseed_bin,ss_list.nonce_start
+	return [(
+		make_chksum_8(make_bin(ss_list,idx,n,'long')),
+		make_chksum_8(make_bin(ss_list,idx,n,'short')) if ss_list.have_short else None
+		) for idx in range(first_idx,last_idx+1) ]
+
+class SubSeedIndexCache(MMGenObject):
+	"""
+	Encrypted on-disk cache of a seed's subseed table (Seed ID and nonce for each
+	index), allowing subseed lookups by Seed ID without regenerating the table.
+	The cache is encrypted with a key derived from the parent seed and named using
+	a fingerprint of the seed, never the seed itself.
+	"""
+	subdir = 'subseed_index'
+	chk_len = 8
+
+	def __init__(self,parent_seed,data_dir=None):
+		self.key = sha256(b'subseed-index-key:' + parent_seed.data).digest()
+		fp = make_chksum_8(b'subseed-index-id:' + parent_seed.data)
+		self.dir = os.path.join(data_dir or g.data_dir,self.subdir)
+		self.fn = os.path.join(self.dir,fp+'.bin')
+		self.data = self.load() # { 'long': [sid,...], 'short': [sid,...], 'nonces': {'L5':1,...} }
+
+	def __len__(self):
+		return len(self.data['long']) if self.data else 0
+
+	def mac(self,d):
+		import hmac
+		return hmac.new(self.key,d,sha256).digest()[:self.chk_len]
+
+	def load(self):
+		try:
+			with open(self.fn,'rb') as f:
+				d = f.read()
+			iv,enc = d[:g.aesctr_iv_len],d[g.aesctr_iv_len:]
+			dec = aesctr_crypt(enc,self.key,iv)
+			d,chk = dec[:-self.chk_len],dec[-self.chk_len:]
+			assert chk == self.mac(d),'checksum mismatch'
+			import json
+			ret = json.loads(d.decode())
+			ret['long'] = [ret['long'][i:i+8] for i in range(0,len(ret['long']),8)]
+			ret['short'] = [ret['short'][i:i+8] for i in range(0,len(ret['short']),8)]
+			assert len(ret['long']) == len(ret['short']),'table length mismatch'
+			return ret
+		except Exception as e:
+			if os.path.exists(self.fn):
+				dmsg("Ignoring subseed index cache '{}': {}".format(self.fn,e.args[0]))
+			return None
+
+	def save(self,ss_list):
+		"save the table in 'ss_list' if it has grown beyond the cached one"
+		if len(ss_list) <= len(self): return
+		import json
+		self.data = {
+			'long':  ss_list.data['long'].keys[:],
+			'short': ss_list.data['short'].keys[:],
+			'nonces': {'{}{}'.format(k[0].upper(),v[0]):v[1]
+						for k in ('long','short') for v in ss_list.data[k].values() if v[1]} }
+		d = json.dumps({
+			'long':   ''.join(self.data['long']),
+			'short':  ''.join(self.data['short']),
+			'nonces': self.data['nonces'] }).encode()
+		iv = os.urandom(g.aesctr_iv_len) # file is rewritten as the table grows, so IV must change
+		check_or_create_dir(self.dir)
+		with open(self.fn,'wb') as f:
+			f.write(iv + aesctr_crypt(d + self.mac(d),self.key,iv))
+		os.chmod(self.fn,0o600)
+
+	def restore(self,ss_list,first_idx,last_idx,last_sid):
+		"""
+		copy cached entries 'first_idx' through 'last_idx' to 'ss_list', stopping after
+		'last_sid'.  Return the index to continue generating from and whether we're done
+		"""
+		if not self.data: return first_idx,False
+		nonces = self.data['nonces']
+		for idx in range(first_idx,min(last_idx,len(self))+1):
+			sid_l,sid_s = self.data['long'][idx-1],self.data['short'][idx-1]
+			ss_list.data['long'][sid_l] = (idx,nonces.get('L{}'.format(idx),0))
+			ss_list.data['short'][sid_s] = (idx,nonces.get('S{}'.format(idx),0))
+			if last_sid in (sid_l,sid_s):
+				return idx+1,True
+		first_idx = len(ss_list) + 1
+		return first_idx,first_idx > last_idx
+
 class Seed(SeedBase):
 
 	def __init__(self,seed_bin=None):
@@ -276,6 +427,7 @@ class SubSeed(SeedBase):
 
 class SeedShareList(SubSeedList):
 	have_short = False
+	use_cache = False
 	split_type = 'N-of-N'
 
 	count = MMGenImmutableAttr('count',SeedShareCount)
@@ -19,7 +19,9 @@
 """
 sha2.py: A non-optimized but very compact implementation of the SHA2 hash
          algorithm for the MMGen suite.  Implements SHA256, SHA512 and
-         SHA256Compress (unpadded SHA256, required for Zcash addresses)
+         SHA256Compress (unpadded SHA256, required for Zcash addresses).
+         SHA256Compress is also implemented separately by the optimized
+         functions sha256_compress() and sha256_compress_many()
 """
 
 from struct import pack,unpack
@@ -197,3 +199,77 @@ class Sha512(Sha2):
 	def pack_msglen(self):
 		return  pack('>Q', (len(self.M)*8) // (2**64)) + \
 				pack('>Q', (len(self.M)*8) % (2**64))
+
+def _make_sha256_compress():
+	"""
+	Generate SHA256Compress, the SHA256 compression function applied to a single 512-bit
+	block with the standard initial hash value and no padding.  The message schedule and
+	rounds are unrolled, with the working variables renamed instead of shifted each round.
+
+	Words are masked with 'M' after each addition, so the function also operates on packed
+	words, each holding the words of several blocks in consecutive 64-bit fields, with 'M',
+	'K' and 'H' repeated in each field.  The upper 32 bits of each field absorb the carries,
+	and those shifted in from neighboring fields, and are cleared by the mask
+	"""
+	rrot = lambda v,n: '({v} >> {n} | {v} << {m})'.format(v=v,n=n,m=32-n)
+	body = [
+		'def sha256_compress_words(W,M,K,H):',
+		'\t"SHA256Compress of the message words \'W\', using mask \'M\', round constants \'K\' and initial hash \'H\'"',
+		'\t{} = W'.format(','.join('w{}'.format(i) for i in range(16))),
+		'\t{} = H'.format(','.join('v{}'.format(i) for i in range(8))),
+		'\t{} = K'.format(','.join('k{}'.format(i) for i in range(64))) ]
+	for i in range(16,64):
+		body.append('\tw{i} = (({s1}) + w{a} + (({s0}) & M) + w{b}) & M'.format(
+			i  = i,
+			a  = i - 7,
+			b  = i - 16,
+			s0 = '{} ^ {} ^ w{} >> 3'.format(rrot('w{}'.format(i-15),7),rrot('w{}'.format(i-15),18),i-15),
+			s1 = '({} ^ {} ^ w{} >> 10) & M'.format(rrot('w{}'.format(i-2),17),rrot('w{}'.format(i-2),19),i-2) ))
+	v = ['v{}'.format(i) for i in range(8)] # a,b,c,d,e,f,g,h
+	for i in range(64):
+		a,b,c,d,e,f,g,h = v
+		body.append('\tt = {h} + (({e1} ^ {e2} ^ {e3}) & M) + ({e} & {f} ^ ~{e} & {g}) + k{i} + w{i}'.format(
+			h=h,e=e,f=f,g=g,i=i,e1=rrot(e,6),e2=rrot(e,11),e3=rrot(e,25)))
+		body.append('\t{d} = ({d} + t) & M'.format(d=d)) # the new e
+		body.append('\t{h} = (t + (({a1} ^ {a2} ^ {a3}) & M) + ({a} & {b} ^ {a} & {c} ^ {b} & {c})) & M'.format(
+			h=h,a=a,b=b,c=c,a1=rrot(a,2),a2=rrot(a,13),a3=rrot(a,22))) # the new a
+		v = [h,a,b,c,d,e,f,g]
+	body.append('\treturn ({},)'.format(','.join('({} + H[{}]) & M'.format(v[i],i) for i in range(8))))
+	ns = {}
+	exec('\n'.join(body),ns)
+	return ns['sha256_compress_words']
+
+sha256_compress_words = _make_sha256_compress()
+
+def sha256_compress(block):
+	"SHA256Compress of the 64-byte 'block'"
+	assert len(block) == 64,'{}: incorrect block length'.format(len(block))
+	if Sha256.K == None:
+		Sha256.initConstants()
+	return pack('>8I',*sha256_compress_words(unpack('>16I',block),0xffffffff,Sha256.K,Sha256.H_init))
+
+def sha256_compress_many(blocks,batch_size=256):
+	"""
+	SHA256Compress of each 64-byte block in the iterable 'blocks'.  Blocks are processed in
+	batches of up to 'batch_size' using packed words
+	"""
+	from struct import Struct
+	blocks = [bytes(b) for b in blocks]
+	for b in blocks:
+		assert len(b) == 64,'{}: incorrect block length'.format(len(b))
+	if Sha256.K == None:
+		Sha256.initConstants()
+	ret,n = [],None
+	for pos in range(0,len(blocks),batch_size):
+		batch = blocks[pos:pos+batch_size]
+		if len(batch) != n: # only the last batch may differ in size
+			n = len(batch)
+			rep = int.from_bytes((b'\x01' + bytes(7)) * n,'little') # 1 in each 64-bit field
+			consts = (0xffffffff * rep,[k * rep for k in Sha256.K],[h * rep for h in Sha256.H_init])
+			words,fields = Struct('>{}I'.format(16*n)),Struct('<{}Q'.format(n))
+		# word i of block j is at index 16*j + i of the unpacked blocks
+		w = words.unpack(b''.join(batch))
+		out = sha256_compress_words([int.from_bytes(fields.pack(*w[i::16]),'little') for i in range(16)],*consts)
+		out = [fields.unpack(o.to_bytes(8*n,'little')) for o in out]
+		ret += [pack('>8I',*d) for d in zip(*out)]
+	return ret
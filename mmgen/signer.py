@@ -0,0 +1,196 @@
+#!/usr/bin/env python3
+#
+# mmgen = Multi-Mode GENerator, command-line Bitcoin cold storage solution
+# Copyright (C)2013-2019 The MMGen Project <mmgen@tuta.io>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+signer: Native transaction signing for the MMGen suite
+"""
+
+import struct
+from hashlib import sha256
+from mmgen.obj import MMGenObject
+from mmgen.protocol import hash160
+
+SIGHASH_ALL    = 0x01
+SIGHASH_FORKID = 0x40
+
+secp256k1_n = 0xfffffffffffffffffffffffffffffffebaaedce6af48a03bbfd25e8cd0364141
+
+def dsha256(data):
+	return sha256(sha256(data).digest()).digest()
+
+def vint(n):
+	return (bytes([n]) if n < 0xfd else
+			b'\xfd' + struct.pack('<H',n) if n <= 0xffff else
+			b'\xfe' + struct.pack('<I',n) if n <= 0xffffffff else
+			b'\xff' + struct.pack('<Q',n) )
+
+def push(data): # push opcode for data of less than 76 bytes
+	return bytes([len(data)]) + data
+
+def der_encode(r,s):
+	def der_int(n):
+		b = n.to_bytes((n.bit_length() + 8) // 8,'big') # add a leading zero byte if the high bit is set
+		return b'\x02' + bytes([len(b)]) + b
+	body = der_int(r) + der_int(s)
+	return b'\x30' + bytes([len(body)]) + body
+
+def ecdsa_sign_python(msghash,privkey):
+	"""
+	sign as Bitcoin Core and libsecp256k1 do: RFC6979 deterministic nonce, low S, and the nonce
+	reseeded with an incrementing counter as extra entropy until R is low
+	"""
+	import ecdsa
+	sk = ecdsa.SigningKey.from_string(privkey,curve=ecdsa.SECP256k1,hashfunc=sha256)
+	extra,counter = b'',0
+	while True:
+		r,s = sk.sign_digest_deterministic(
+			msghash,
+			hashfunc      = sha256,
+			sigencode     = lambda r,s,order: (r,s),
+			extra_entropy = extra )
+		if r >> 255 == 0:
+			return der_encode(r,min(s,secp256k1_n-s))
+		counter += 1
+		extra = struct.pack('<I',counter) + bytes(28)
+
+def ecdsa_sign_many(hashes,privkeys):
+	"sign a list of 32-byte hashes with a list of 32-byte private keys, returning DER signatures"
+	if not hashes:
+		return []
+	try:
+		from mmgen.secp256k1 import sign_many
+	except ImportError: # extension module missing, or built without signing support
+		return [ecdsa_sign_python(h,k) for h,k in zip(hashes,privkeys)]
+	return list(sign_many(b''.join(hashes),b''.join(privkeys),len(hashes)))
+
+class TxSigner(MMGenObject):
+	"""
+	Sign the P2PKH, P2SH-P2WPKH and P2WPKH inputs of an unsigned transaction, producing the
+	same signed serialization as the coin daemon.  The outpoints, sequence numbers and
+	outputs are sliced from the unsigned serialization.
+
+	'inputs' is a list of (scriptPubKey,amount,privkey,pubkey) tuples, one per input, with
+	hex scriptPubKeys, amounts in satoshis, 32-byte private keys and serialized public keys.
+	If 'forkid' is set, all inputs are signed with the BIP143 digest and SIGHASH_FORKID, as
+	on the Bitcoin Cash chain
+	"""
+	def __init__(self,unsigned_hex,inputs,forkid=False,witness_vernum_hex='00'):
+		tx = bytes.fromhex(unsigned_hex)
+		n = len(inputs)
+		p = 4 + len(vint(n))
+		self.version  = tx[:4]
+		self.locktime = tx[-4:]
+		self.outpoints = [tx[i:i+36] for i in range(p,p+41*n,41)]
+		self.seqs      = [tx[i+37:i+41] for i in range(p,p+41*n,41)]
+		self.outputs   = tx[p+41*n:-4]
+		self.hashtype  = SIGHASH_ALL | (SIGHASH_FORKID if forkid else 0)
+		self.forkid    = forkid
+		self.segwit_pfx = bytes.fromhex(witness_vernum_hex + '14')
+
+		self.inputs = []
+		for spk,amt,privkey,pubkey in inputs:
+			spk = bytes.fromhex(spk)
+			keyhash = bytes.fromhex(hash160(pubkey.hex()))
+			if len(spk) == 25 and spk[:3] == b'\x76\xa9\x14' and spk[-2:] == b'\x88\xac':
+				t,match = 'p2pkh',spk[3:23] == keyhash
+			elif len(spk) == 23 and spk[:2] == b'\xa9\x14' and spk[-1:] == b'\x87':
+				redeem_script = self.segwit_pfx + keyhash
+				t,match = 'p2sh-p2wpkh',spk[2:22] == bytes.fromhex(hash160(redeem_script.hex()))
+			elif len(spk) == 22 and spk[:2] == self.segwit_pfx:
+				t,match = 'p2wpkh',spk[2:] == keyhash
+			else:
+				raise NotImplementedError('{}: unsupported scriptPubKey type'.format(spk.hex()))
+			if not match:
+				raise ValueError('public key does not match scriptPubKey {}'.format(spk.hex()))
+			if t == 'p2pkh' and forkid:
+				t = 'p2pkh-forkid'
+			self.inputs.append((t,spk,amt,privkey,pubkey,keyhash))
+
+	@property
+	def has_witness(self):
+		return any(i[0] in ('p2sh-p2wpkh','p2wpkh') for i in self.inputs)
+
+	def legacy_sighash(self,idx,script_code):
+		"the original signature hash, with the scriptSigs of the other inputs blanked"
+		n = len(self.inputs)
+		blank = [op + b'\x00' + seq for op,seq in zip(self.outpoints,self.seqs)]
+		return dsha256(b''.join(
+			[self.version,vint(n)] + blank[:idx] +
+			[self.outpoints[idx] + vint(len(script_code)) + script_code + self.seqs[idx]] +
+			blank[idx+1:] +
+			[self.outputs,self.locktime,struct.pack('<I',self.hashtype)] ))
+
+	def bip143_sighash(self,idx,script_code,amt):
+		"the BIP143 signature hash, also used with SIGHASH_FORKID"
+		if not hasattr(self,'bip143_hashes'):
+			nout_len = {0xfd:3,0xfe:5,0xff:9}.get(self.outputs[0],1) # skip the output count
+			self.bip143_hashes = (
+				dsha256(b''.join(self.outpoints)),
+				dsha256(b''.join(self.seqs)),
+				dsha256(self.outputs[nout_len:]) )
+		hash_prevouts,hash_seqs,hash_outputs = self.bip143_hashes
+		return dsha256(b''.join((
+			self.version,
+			hash_prevouts,
+			hash_seqs,
+			self.outpoints[idx],
+			vint(len(script_code)) + script_code,
+			struct.pack('<Q',amt),
+			self.seqs[idx],
+			hash_outputs,
+			self.locktime,
+			struct.pack('<I',self.hashtype) )))
+
+	def get_sighashes(self):
+		"return a list of (sighash,privkey) pairs, one per input"
+		ret = []
+		for idx,(t,spk,amt,privkey,pubkey,keyhash) in enumerate(self.inputs):
+			if t == 'p2pkh':
+				h = self.legacy_sighash(idx,spk)
+			elif t == 'p2pkh-forkid':
+				h = self.bip143_sighash(idx,spk,amt)
+			else:
+				h = self.bip143_sighash(idx,b'\x76\xa9\x14' + keyhash + b'\x88\xac',amt)
+			ret.append((h,privkey))
+		return ret
+
+	def serialize(self,sigs):
+		"return the signed transaction hex, given the DER signatures for the inputs"
+		ht = bytes([self.hashtype])
+		ins,wit = [],[]
+		for (t,spk,amt,privkey,pubkey,keyhash),sig,op,seq in zip(self.inputs,sigs,self.outpoints,self.seqs):
+			if t in ('p2pkh','p2pkh-forkid'):
+				ss,w = push(sig + ht) + push(pubkey),b'\x00'
+			else:
+				ss = push(self.segwit_pfx + keyhash) if t == 'p2sh-p2wpkh' else b''
+				w = b'\x02' + push(sig + ht) + push(pubkey)
+			ins.append(op + vint(len(ss)) + ss + seq)
+			wit.append(w)
+		has_witness = self.has_witness
+		return b''.join(
+			[self.version,(b'',b'\x00\x01')[has_witness],vint(len(ins))] + ins +
+			[self.outputs] + (wit if has_witness else []) + [self.locktime] ).hex()
+
+def sign_txs(signers):
+	"""
+	sign the inputs of all transactions in 'signers' (a list of TxSigner instances) in one
+	pass, returning a list of signed transaction hex strings
+	"""
+	reqs = [s.get_sighashes() for s in signers]
+	sigs = iter(ecdsa_sign_many([h for r in reqs for h,k in r],[k for r in reqs for h,k in r]))
+	return [s.serialize([next(sigs) for i in r]) for s,r in zip(signers,reqs)]
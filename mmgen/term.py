@@ -144,7 +144,7 @@ def _get_terminal_size_linux():
 		return tuple(os.get_terminal_size())
 	except:
 		try:
-			return (os.environ['LINES'],os.environ['COLUMNS'])
+			return (int(os.environ['COLUMNS']),int(os.environ['LINES']))
 		except:
 			return (80,25)
 
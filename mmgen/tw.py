@@ -34,6 +34,140 @@ def get_tw_label(s):
 	except BadTwComment: raise
 	except: return None
 
+class TwUnspentRow(object):
+	"""
+	lightweight view of a row of a TwUnspentTable, with the same attributes as
+	TwUnspentOutputs.MMGenTwUnspentOutput
+	"""
+	__slots__ = ('tbl','n')
+	mutable = ('amt2','label','days','skip')
+
+	def __init__(self,tbl,n):
+		self.tbl = tbl
+		self.n = n
+
+	def item(self):
+		"return the row as a fully validated MMGenTwUnspentOutput"
+		return self.tbl.item_cls(**{k:col[self.n] for k,col in self.tbl.cols.items()})
+
+class TwUnspentTable(MMGenObject):
+	"""
+	Columnar table of unspent outputs, holding one list per attribute.  Rows are accessed
+	in display order through TwUnspentRow views.  Sorting and reversal permute only
+	'order', using a list of sort keys computed once for each sort field.
+
+	Maximum column widths and formatted display rows are cached, and kept up to date
+	when a row's value is reassigned.
+	"""
+	col_names = ('txid','vout','amt','amt2','label','twmmid','addr','confs','scriptPubKey','days','skip')
+	sort_keys = ('addr','age','amt','txid','twmmid')
+	width_funcs = {
+		'addr':   len,
+		'twmmid': lambda m: len(m) if m.type == 'mmgen' else 0,
+		'label':  lambda l: l.screen_width }
+
+	def __init__(self,item_cls,rows=()):
+		"'rows' is a sequence of tuples of values in the order of 'col_names'"
+		self.item_cls = item_cls
+		cols = list(zip(*rows)) or [()] * len(self.col_names)
+		self.cols = {k:list(col) for k,col in zip(self.col_names,cols)}
+		self.order = list(range(len(rows)))
+		self.key_cols = {}
+		self.widths = {}
+		self.fmt_cache = {} # display layout -> {row: {skip: formatted row}}
+		self._total = None
+
+	def __len__(self):
+		return len(self.order)
+
+	def __iter__(self):
+		for n in self.order:
+			yield TwUnspentRow(self,n)
+
+	def __getitem__(self,idx):
+		return TwUnspentRow(self,self.order[idx])
+
+	def col(self,name):
+		return self.cols[name]
+
+	@property
+	def total(self):
+		if self._total is None:
+			self._total = sum(self.cols['amt'])
+		return self._total
+
+	def width(self,name):
+		"maximum width of the values in column 'name'"
+		if name not in self.widths:
+			self.widths[name] = max(map(self.width_funcs[name],self.cols[name]),default=0)
+		return self.widths[name]
+
+	def set_val(self,name,n,val):
+		col = self.cols[name]
+		if name in self.widths:
+			f,w = self.width_funcs[name],self.widths[name]
+			if f(val) >= w:
+				self.widths[name] = f(val)
+			elif f(col[n]) == w: # the column may have narrowed, so recompute when next needed
+				del self.widths[name]
+		if name != 'skip':
+			for rows in self.fmt_cache.values():
+				rows.pop(n,None)
+		col[n] = val
+
+	def get_fmt_cache(self,layout):
+		"return the formatted row cache for 'layout', discarding those of other layouts"
+		if layout not in self.fmt_cache:
+			self.fmt_cache = {layout:{}}
+		return self.fmt_cache[layout]
+
+	def get_key_col(self,key):
+		if key not in self.key_cols:
+			c = self.cols
+			self.key_cols[key] = {
+				'addr':   lambda: c['addr'],
+				'age':    lambda: [0 - n for n in c['confs']],
+				'amt':    lambda: c['amt'],
+				'txid':   lambda: ['{} {:04}'.format(*a) for a in zip(c['txid'],c['vout'])],
+				'twmmid': lambda: [m.sort_key for m in c['twmmid']],
+			}[key]()
+		return self.key_cols[key]
+
+	def sort(self,key,reverse=False):
+		self.order.sort(key=self.get_key_col(key).__getitem__,reverse=reverse)
+
+	def reverse(self):
+		self.order.reverse()
+
+	def get_skips(self,key,start=0,stop=None):
+		"""
+		return the skip values of display positions 'start' to 'stop', marking rows whose
+		'key' field repeats that of the previous row, for grouped display
+		"""
+		order = self.order
+		stop = len(order) if stop is None else min(stop,len(order))
+		if not key:
+			return [''] * (stop - start)
+		col,val = self.cols[key],(key,'addr')[key=='twmmid']
+		return [val if p and col[order[p-1]] == col[order[p]] else '' for p in range(start,stop)]
+
+	def set_skips(self,key):
+		skip = self.cols['skip']
+		for n,val in zip(self.order,self.get_skips(key)):
+			skip[n] = val
+
+def _make_row_attr(name):
+	def fget(self):
+		return self.tbl.cols[name][self.n]
+	def fset(self,value):
+		if name not in TwUnspentRow.mutable:
+			raise AttributeError("Attribute '{}' of {} instance cannot be reassigned".format(name,type(self)))
+		self.tbl.set_val(name,self.n,value)
+	return property(fget,fset)
+
+for name in TwUnspentTable.col_names:
+	setattr(TwUnspentRow,name,_make_row_attr(name))
+
 class TwUnspentOutputs(MMGenObject):
 
 	def __new__(cls,*args,**kwargs):
@@ -55,7 +189,8 @@ Actions: [q]uit view, [p]rint to file, pager [v]iew, [w]ide view, add [l]abel:
 	key_mappings = {
 		't':'s_txid','a':'s_amt','d':'s_addr','A':'s_age','r':'d_reverse','M':'s_twmmid',
 		'D':'d_days','g':'d_group','m':'d_mmid','e':'d_redraw',
-		'q':'a_quit','p':'a_print','v':'a_view','w':'a_view_wide','l':'a_lbl_add' }
+		'q':'a_quit','p':'a_print','v':'a_view','w':'a_view_wide','l':'a_lbl_add',
+		'n':'d_next_page','b':'d_prev_page' }
 	col_adj = 38
 
 	class MMGenTwOutputList(list,MMGenObject): pass
@@ -82,7 +217,7 @@ watch-only wallet using '{}-addrimport' and then re-run this program.
 	}
 
 	def __init__(self,minconf=1,addrs=[]):
-		self.unspent      = self.MMGenTwOutputList()
+		self.unspent      = TwUnspentTable(self.MMGenTwUnspentOutput)
 		self.fmt_display  = ''
 		self.fmt_print    = ''
 		self.cols         = None
@@ -93,6 +228,8 @@ watch-only wallet using '{}-addrimport' and then re-run this program.
 		self.addrs        = addrs
 		self.age_fmt      = 'days'
 		self.sort_key     = 'age'
+		self.page_start   = 0
+		self.page_rows    = 0
 		self.disp_prec    = self.get_display_precision()
 
 		self.wallet = TrackingWallet('w')
@@ -116,7 +253,7 @@ watch-only wallet using '{}-addrimport' and then re-run this program.
 
 	@property
 	def total(self):
-		return sum(i.amt for i in self.unspent)
+		return self.unspent.total
 
 	def get_unspent_rpc(self):
 		# bitcoin-cli help listunspent:
@@ -128,8 +265,9 @@ watch-only wallet using '{}-addrimport' and then re-run this program.
 		# 5. query_options  (json object, optional) JSON with query options
 
 		# for now, self.addrs is just an empty list for Bitcoin and friends
-		add_args = (9999999,self.addrs) if self.addrs else ()
-		return g.rpch.listunspent(self.minconf,*add_args)
+		if self.addrs:
+			return g.rpch.listunspent(self.minconf,9999999,self.addrs)
+		return tw_listunspent(self.minconf)
 
 	def get_unspent_data(self):
 		if g.bogus_wallet_data: # for debugging purposes only
@@ -138,45 +276,53 @@ watch-only wallet using '{}-addrimport' and then re-run this program.
 			us_rpc = self.get_unspent_rpc()
 
 		if not us_rpc: die(0,self.wmsg['no_spendable_outputs'])
+		self.unspent = self.make_table(us_rpc)
+		if not self.unspent:
+			die(1,'No tracked {}s in tracking wallet!'.format(self.item_desc))
+
+	def make_table(self,us_rpc):
+		"""
+		convert the listunspent data in 'us_rpc' to a TwUnspentTable.  Each distinct label
+		and address is parsed only once, and the resulting objects are shared between rows
+		"""
 		confs_per_day = 60*60*24 // g.proto.secs_per_block
-		tr_rpc = []
 		lbl_id = ('account','label')['label_api' in g.rpch.caps]
+		coin_amt = g.proto.coin_amt
+		labels,addrs,spks = {},{},{None:None}
+		rows = []
 		for o in us_rpc:
 			if not lbl_id in o: continue # coinbase outputs have no account field
-			l = get_tw_label(o[lbl_id])
+			lbl = o[lbl_id]
+			if lbl not in labels:
+				labels[lbl] = get_tw_label(lbl)
+			l = labels[lbl]
 			if l:
-				o.update({
-					'twmmid': l.mmid,
-					'label':  l.comment,
-					'days':   int(o['confirmations'] // confs_per_day),
-					'amt':    g.proto.coin_amt(o['amount']),
-					'addr':   CoinAddr(o['address']),
-					'confs':  o['confirmations']
-				})
-				tr_rpc.append(o)
-		self.unspent = self.MMGenTwOutputList(
-						self.MMGenTwUnspentOutput(
-							**{k:v for k,v in o.items() if k in dir(self.MMGenTwUnspentOutput)}
-						) for o in tr_rpc)
-		for u in self.unspent:
-			if u.label == None: u.label = ''
-		if not self.unspent:
-			die(1,'No tracked {}s in tracking wallet!'.format(self.item_desc))
+				addr,spk = o['address'],o.get('scriptPubKey')
+				if addr not in addrs:
+					addrs[addr] = CoinAddr(addr,on_fail='raise')
+				if spk not in spks:
+					spks[spk] = HexStr(spk,on_fail='raise')
+				rows.append((
+					CoinTxID(o['txid'],on_fail='raise') if 'txid' in o else None, # txid
+					o.get('vout'),                                                # vout
+					coin_amt(o['amount']),                                        # amt
+					None,                                                         # amt2
+					l.comment or TwComment(''),                                   # label
+					l.mmid,                                                       # twmmid
+					addrs[addr],                                                  # addr
+					o['confirmations'],                                           # confs
+					spks[spk],                                                    # scriptPubKey
+					int(o['confirmations'] // confs_per_day),                     # days
+					None ))                                                       # skip
+		return TwUnspentTable(self.MMGenTwUnspentOutput,rows)
 
 	def do_sort(self,key=None,reverse=False):
-		sort_funcs = {
-			'addr':  lambda i: i.addr,
-			'age':   lambda i: 0 - i.confs,
-			'amt':   lambda i: i.amt,
-			'txid':  lambda i: '{} {:04}'.format(i.txid,i.vout),
-			'twmmid':  lambda i: i.twmmid.sort_key
-		}
 		key = key or self.sort_key
-		if key not in sort_funcs:
-			die(1,"'{}': invalid sort key.  Valid options: {}".format(key,' '.join(sort_funcs.keys())))
+		if key not in TwUnspentTable.sort_keys:
+			die(1,"'{}': invalid sort key.  Valid options: {}".format(key,' '.join(TwUnspentTable.sort_keys)))
 		self.sort_key = key
 		assert type(reverse) == bool
-		self.unspent.sort(key=sort_funcs[key],reverse=reverse or self.reverse)
+		self.unspent.sort(key,reverse=reverse or self.reverse)
 
 	def sort_info(self,include_group=True):
 		ret = ([],['Reverse'])[self.reverse]
@@ -194,116 +340,155 @@ watch-only wallet using '{}-addrimport' and then re-run this program.
 			m2 = 'Please resize your screen to at least {} characters and hit ENTER '
 			my_raw_input((m1+m2).format(g.min_screen_width))
 
-	def format_for_display(self):
+	@property
+	def group_key(self):
+		return self.sort_key if self.group and self.sort_key in ('addr','txid','twmmid') else None
+
+	def get_display_layout(self):
+		"""
+		column widths for the display listing, computed from the table's cached maximum
+		column widths.  Also used as a key to the table's formatted row cache
+		"""
 		unsp = self.unspent
 		self.set_term_columns()
 
 		# allow for 7-digit confirmation nums
 		col1_w = max(3,len(str(len(unsp)))+1) # num + ')'
-		mmid_w = max(len(('',i.twmmid)[i.twmmid.type=='mmgen']) for i in unsp) or 12 # DEADBEEF:S:1
-		max_acct_w = max(i.label.screen_width for i in unsp) + mmid_w + 1
-		max_btcaddr_w = max(len(i.addr) for i in unsp)
+		mmid_w = unsp.width('twmmid') or 12 # DEADBEEF:S:1
+		max_acct_w = unsp.width('label') + mmid_w + 1
+		max_btcaddr_w = unsp.width('addr')
 		min_addr_w = self.cols - self.col_adj
 		addr_w = min(max_btcaddr_w + (0,1+max_acct_w)[self.show_mmid],min_addr_w)
 		acct_w = min(max_acct_w, max(24,addr_w-10))
 		btaddr_w = addr_w - acct_w - 1
 		label_w = acct_w - mmid_w - 1
 		tx_w = min(self.txid_w,self.cols-addr_w-28-col1_w) # min=7
+		return (col1_w,mmid_w,addr_w,btaddr_w,label_w,tx_w,self.show_mmid,self.age_fmt,self.disp_prec)
+
+	def gen_display_lines(self,start=0,stop=None):
+		"""
+		generate the lines of the display listing, with table rows limited to display
+		positions 'start' to 'stop'.  Only the rows in this range are formatted, and each
+		is formatted only once for a given layout
+		"""
+		unsp = self.unspent
+		layout = self.get_display_layout()
+		col1_w,mmid_w,addr_w,btaddr_w,label_w,tx_w = layout[:6]
 		txdots = ('','..')[tx_w < self.txid_w]
-
-		for i in unsp: i.skip = ''
-		if self.group and (self.sort_key in ('addr','txid','twmmid')):
-			for a,b in [(unsp[i],unsp[i+1]) for i in range(len(unsp)-1)]:
-				for k in ('addr','txid','twmmid'):
-					if self.sort_key == k and getattr(a,k) == getattr(b,k):
-						b.skip = (k,'addr')[k=='twmmid']
-
-		out  = [self.hdr_fmt.format(' '.join(self.sort_info()),g.dcoin,self.total.hl())]
-		if g.chain != 'mainnet': out += ['Chain: '+green(g.chain.upper())]
-		fs = {  'btc':   ' {n:%s} {t:%s} {v:2} {a} {A} {c:<}' % (col1_w,tx_w),
-				'eth':   ' {n:%s} {a} {A}' % col1_w,
-				'token': ' {n:%s} {a} {A} {A2}' % col1_w }[self.disp_type]
-		out += [fs.format(  n='Num',
-							t='TXid'.ljust(tx_w - 5) + ' Vout',
-							v='',
-							a='Address'.ljust(addr_w),
-							A='Amt({})'.format(g.dcoin).ljust(self.disp_prec+3),
-							A2=' Amt({})'.format(g.coin).ljust(self.disp_prec+4),
-							c=('Confs','Age(d)')[self.age_fmt=='days']
-							).rstrip()]
-
-		for n,i in enumerate(unsp):
-			addr_dots = '|' + '.'*(addr_w-1)
-			mmid_disp = MMGenID.fmtc('.'*mmid_w if i.skip=='addr'
-				else i.twmmid if i.twmmid.type=='mmgen'
-					else 'Non-{}'.format(g.proj_name),width=mmid_w,color=True)
-			if self.show_mmid:
-				addr_out = '{} {}'.format(
-					type(i.addr).fmtc(addr_dots,width=btaddr_w,color=True) if i.skip == 'addr' \
-							else i.addr.fmt(width=btaddr_w,color=True),
-					'{} {}'.format(mmid_disp,i.label.fmt(width=label_w,color=True) \
-							if label_w > 0 else ''))
-			else:
-				addr_out = type(i.addr).fmtc(addr_dots,width=addr_w,color=True) \
-					if i.skip=='addr' else i.addr.fmt(width=addr_w,color=True)
-
-			out.append(fs.format(   n=str(n+1)+')',
-									t='' if not i.txid else \
-										' ' * (tx_w-4) + '|...' if i.skip == 'txid' \
-											else i.txid[:tx_w-len(txdots)] + txdots,
-									v=i.vout,
-									a=addr_out,
-									A=i.amt.fmt(color=True,prec=self.disp_prec),
-									A2=(i.amt2.fmt(color=True,prec=self.disp_prec) if i.amt2 is not None else ''),
-									c=i.days if self.age_fmt == 'days' else i.confs
-									).rstrip())
-
-		self.fmt_display = '\n'.join(out) + '\n'
+		stop = len(unsp) if stop is None else min(stop,len(unsp))
+
+		yield self.hdr_fmt.format(' '.join(self.sort_info()),g.dcoin,self.total.hl())
+		if g.chain != 'mainnet': yield 'Chain: '+green(g.chain.upper())
+		nfs = ' {n:%s}' % col1_w
+		fs = {  'btc':   ' {t:%s} {v:2} {a} {A} {c:<}' % tx_w,
+				'eth':   ' {a} {A}',
+				'token': ' {a} {A} {A2}' }[self.disp_type]
+		yield (nfs+fs).format(  n='Num',
+								t='TXid'.ljust(tx_w - 5) + ' Vout',
+								v='',
+								a='Address'.ljust(addr_w),
+								A='Amt({})'.format(g.dcoin).ljust(self.disp_prec+3),
+								A2=' Amt({})'.format(g.coin).ljust(self.disp_prec+4),
+								c=('Confs','Age(d)')[self.age_fmt=='days']
+								).rstrip()
+
+		addr_dots = '|' + '.'*(addr_w-1)
+		cache = unsp.get_fmt_cache(layout)
+		for pos,skip in zip(range(start,stop),unsp.get_skips(self.group_key,start,stop)):
+			row = cache.setdefault(unsp.order[pos],{})
+			if skip not in row:
+				i = TwUnspentRow(unsp,unsp.order[pos])
+				mmid_disp = MMGenID.fmtc('.'*mmid_w if skip=='addr'
+					else i.twmmid if i.twmmid.type=='mmgen'
+						else 'Non-{}'.format(g.proj_name),width=mmid_w,color=True)
+				if self.show_mmid:
+					addr_out = '{} {}'.format(
+						type(i.addr).fmtc(addr_dots,width=btaddr_w,color=True) if skip == 'addr' \
+								else i.addr.fmt(width=btaddr_w,color=True),
+						'{} {}'.format(mmid_disp,i.label.fmt(width=label_w,color=True) \
+								if label_w > 0 else ''))
+				else:
+					addr_out = type(i.addr).fmtc(addr_dots,width=addr_w,color=True) \
+						if skip=='addr' else i.addr.fmt(width=addr_w,color=True)
+
+				row[skip] = fs.format(  t='' if not i.txid else \
+											' ' * (tx_w-4) + '|...' if skip == 'txid' \
+												else i.txid[:tx_w-len(txdots)] + txdots,
+										v=i.vout,
+										a=addr_out,
+										A=i.amt.fmt(color=True,prec=self.disp_prec),
+										A2=(i.amt2.fmt(color=True,prec=self.disp_prec) if i.amt2 is not None else ''),
+										c=i.days if self.age_fmt == 'days' else i.confs
+										).rstrip()
+			yield nfs.format(n=str(pos+1)+')') + row[skip]
+
+	def format_for_display(self,start=0,nrows=None):
+		lines = self.gen_display_lines(start,None if nrows is None else start+nrows)
+		self.fmt_display = '\n'.join(lines) + '\n'
 		return self.fmt_display
 
-	def format_for_printing(self,color=False):
-
-		addr_w = max(len(i.addr) for i in self.unspent)
-		mmid_w = max(len(('',i.twmmid)[i.twmmid.type=='mmgen']) for i in self.unspent) or 12 # DEADBEEF:S:1
+	def format_page(self,extra_lines):
+		"""
+		format the page of the display listing starting at self.page_start, sized to fit
+		the terminal with 'extra_lines' lines to spare
+		"""
+		from mmgen.term import get_terminal_size
+		n = len(self.unspent)
+		hdr_lines = self.hdr_fmt.count('\n') + (g.chain != 'mainnet') + 2
+		self.page_rows = max(5,int(get_terminal_size()[1]) - hdr_lines - extra_lines - 1)
+		if n <= self.page_rows:
+			self.page_start = 0
+			return self.format_for_display()
+		self.page_rows -= 1 # make room for the page line
+		if self.page_start >= n:
+			self.page_start = max(0,n-self.page_rows)
+		stop = min(n,self.page_start+self.page_rows)
+		return self.format_for_display(self.page_start,self.page_rows) + \
+			'{}s {}-{} of {} ([n]ext page, [b]ack)\n'.format(capfirst(self.item_desc),self.page_start+1,stop,n)
+
+	def gen_print_lines(self,color=False):
+		unsp = self.unspent
+		addr_w = unsp.width('addr')
+		mmid_w = unsp.width('twmmid') or 12 # DEADBEEF:S:1
 		amt_w = g.proto.coin_amt.max_prec + 4
 		fs = {  'btc':   ' {n:4} {t:%s} {a} {m} {A:%s} {c:<8} {g:<6} {l}' % (self.txid_w+3,amt_w),
 				'eth':   ' {n:4} {a} {m} {A:%s} {l}' % amt_w,
 				'token': ' {n:4} {a} {m} {A:%s} {A2:%s} {l}' % (amt_w,amt_w)
 				}[self.disp_type]
-		out = [fs.format(   n='Num',
-							t='Tx ID,Vout',
-							a='Address'.ljust(addr_w),
-							m='MMGen ID'.ljust(mmid_w+1),
-							A='Amount({})'.format(g.dcoin).ljust(amt_w+1),
-							A2='Amount({})'.format(g.coin),
-							c='Confs',  # skipped for eth
-							g='Age(d)', # skipped for eth
-							l='Label')]
-
-		max_lbl_len = max([len(i.label) for i in self.unspent if i.label] or [2])
-		for n,i in enumerate(self.unspent):
-			addr = '|'+'.' * addr_w if i.skip == 'addr' and self.group else i.addr.fmt(color=color,width=addr_w)
-			out.append(fs.format(
-						n=str(n+1)+')',
-						t='{},{}'.format('|'+'.'*63 if i.skip == 'txid' and self.group else i.txid,i.vout),
-						a=addr,
-						m=MMGenID.fmtc(i.twmmid if i.twmmid.type=='mmgen'
-							else 'Non-{}'.format(g.proj_name),width=mmid_w,color=color),
-						A=i.amt.fmt(color=color),
-						A2=(i.amt2.fmt(color=color) if i.amt2 is not None else ''),
-						c=i.confs,
-						g=i.days,
-						l=i.label.hl(color=color) if i.label else
-							TwComment.fmtc('',color=color,nullrepl='-',width=max_lbl_len)).rstrip())
-
-		fs = '{} ({} UTC)\nSort order: {}\n{}\n\nTotal {}: {}\n'
-		self.fmt_print = fs.format(
-				capfirst(self.desc),
-				make_timestr(),
-				' '.join(self.sort_info(include_group=False)),
-				'\n'.join(out),
-				g.dcoin,
-				self.total.hl(color=color))
+
+		yield '{} ({} UTC)'.format(capfirst(self.desc),make_timestr())
+		yield 'Sort order: {}'.format(' '.join(self.sort_info(include_group=False)))
+		yield fs.format(n='Num',
+						t='Tx ID,Vout',
+						a='Address'.ljust(addr_w),
+						m='MMGen ID'.ljust(mmid_w+1),
+						A='Amount({})'.format(g.dcoin).ljust(amt_w+1),
+						A2='Amount({})'.format(g.coin),
+						c='Confs',  # skipped for eth
+						g='Age(d)', # skipped for eth
+						l='Label')
+
+		max_lbl_len = max([len(l) for l in unsp.col('label') if l] or [2])
+		for n,(i,skip) in enumerate(zip(unsp,unsp.get_skips(self.group_key))):
+			addr = '|'+'.' * addr_w if skip == 'addr' else i.addr.fmt(color=color,width=addr_w)
+			yield fs.format(
+					n=str(n+1)+')',
+					t='{},{}'.format('|'+'.'*63 if skip == 'txid' else i.txid,i.vout),
+					a=addr,
+					m=MMGenID.fmtc(i.twmmid if i.twmmid.type=='mmgen'
+						else 'Non-{}'.format(g.proj_name),width=mmid_w,color=color),
+					A=i.amt.fmt(color=color),
+					A2=(i.amt2.fmt(color=color) if i.amt2 is not None else ''),
+					c=i.confs,
+					g=i.days,
+					l=i.label.hl(color=color) if i.label else
+						TwComment.fmtc('',color=color,nullrepl='-',width=max_lbl_len)).rstrip()
+
+		yield ''
+		yield 'Total {}: {}'.format(g.dcoin,self.total.hl(color=color))
+
+	def format_for_printing(self,color=False):
+		self.fmt_print = '\n'.join(self.gen_print_lines(color=color)) + '\n'
 		return self.fmt_print
 
 	def display_total(self):
@@ -345,7 +530,10 @@ watch-only wallet using '{}-addrimport' and then re-run this program.
 		no_output,oneshot_msg = False,None
 		while True:
 			msg_r('' if no_output else '\n\n' if opt.no_blank else CUR_HOME+ERASE_ALL)
-			reply = get_char('' if no_output else self.format_for_display()+'\n'+(oneshot_msg or '')+prompt,
+			if not no_output:
+				extra_lines = 1 + (oneshot_msg or '').count('\n') + prompt.count('\n') + 1
+				listing = self.format_page(extra_lines)
+			reply = get_char('' if no_output else listing+'\n'+(oneshot_msg or '')+prompt,
 								immed_chars=''.join(self.key_mappings.keys())).decode()
 			no_output = False
 			oneshot_msg = '' if oneshot_msg else None # tristate, saves previous state
@@ -357,6 +545,7 @@ watch-only wallet using '{}-addrimport' and then re-run this program.
 			action = self.key_mappings[reply]
 			if action[:2] == 's_':
 				self.do_sort(action[2:])
+				self.page_start = 0
 				if action == 's_twmmid': self.show_mmid = True
 			elif action == 'd_days': self.age_fmt = ('days','confs')[self.age_fmt=='days']
 			elif action == 'd_mmid': self.show_mmid = not self.show_mmid
@@ -365,6 +554,10 @@ watch-only wallet using '{}-addrimport' and then re-run this program.
 					self.group = not self.group
 			elif action == 'd_redraw': pass
 			elif action == 'd_reverse': self.unspent.reverse(); self.reverse = not self.reverse
+			elif action == 'd_next_page':
+				if self.page_start + self.page_rows < len(self.unspent):
+					self.page_start += self.page_rows
+			elif action == 'd_prev_page': self.page_start = max(0,self.page_start - self.page_rows)
 			elif action == 'a_quit': msg(''); return self.unspent
 			elif action == 'a_balance_refresh':
 				idx = self.get_idx_from_user(action)
@@ -400,13 +593,14 @@ watch-only wallet using '{}-addrimport' and then re-run this program.
 										','.join(self.sort_info(include_group=False)).lower())
 				msg('')
 				try:
-					write_data_to_file(of,self.format_for_printing(),desc='{} listing'.format(self.desc))
+					write_data_to_file(of,(l+'\n' for l in self.gen_print_lines()),desc='{} listing'.format(self.desc))
 				except UserNonConfirmation as e:
 					oneshot_msg = red("File '{}' not overwritten by user request\n\n".format(of))
 				else:
 					oneshot_msg = yellow("Data written to '{}'\n\n".format(of))
 			elif action in ('a_view','a_view_wide'):
-				do_pager(self.fmt_display if action == 'a_view' else self.format_for_printing(color=True))
+				lines = self.gen_display_lines() if action == 'a_view' else self.gen_print_lines(color=True)
+				do_pager(l+'\n' for l in lines)
 				if g.platform == 'linux' and oneshot_msg == None:
 					msg_r(CUR_RIGHT(len(prompt.split('\n')[-1])-2))
 					no_output = True
@@ -441,9 +635,10 @@ class TwAddrList(MMGenDict):
 
 		self.total = g.proto.coin_amt('0')
 		rpc_init()
+		usr_addr_list = set(usr_addr_list) # hashed lookup, as the wallet may be large
 
 		lbl_id = ('account','label')['label_api' in g.rpch.caps]
-		for d in g.rpch.listunspent(0):
+		for d in tw_listunspent(0):
 			if not lbl_id in d: continue  # skip coinbase outputs with missing account
 			if d['confirmations'] < minconf: continue
 			label = get_tw_label(d[lbl_id])
@@ -649,12 +844,12 @@ class TrackingWallet(MMGenObject):
 	def data_root_desc(self):
 		return self.data_key
 
-	def cache_balance(self,addr,bal,session_cache,data_root,force=False):
+	def cache_balance(self,addr,bal,session_cache,data_root,force=False,sync=True):
 		if force or addr not in session_cache:
 			session_cache[addr] = str(bal)
 			if addr in data_root:
 				data_root[addr]['balance'] = str(bal)
-				if self.aggressive_sync:
+				if self.aggressive_sync and sync:
 					self.write()
 
 	def get_cached_balance(self,addr,session_cache,data_root):
@@ -675,6 +870,25 @@ class TrackingWallet(MMGenObject):
 	def rpc_get_balance(self,addr):
 		raise NotImplementedError('not implemented')
 
+	def get_balances(self,addrs,force_rpc=False):
+		"like get_balance(), for a list of addresses.  Returns a dict of balances keyed by address"
+		return self.get_balances_common(addrs,force_rpc,self.rpc_get_balances,self.cur_balances,self.data_root)
+
+	def get_balances_common(self,addrs,force_rpc,rpc_func,session_cache,data_root):
+		ret = {} if force_rpc else {a:self.get_cached_balance(a,session_cache,data_root) for a in addrs}
+		need = [a for a in dict.fromkeys(addrs) if ret.get(a) == None]
+		if need:
+			for addr,bal in zip(need,rpc_func(need)):
+				ret[addr] = bal
+				self.cache_balance(addr,bal,session_cache,data_root,force=force_rpc,sync=False)
+			if self.aggressive_sync:
+				self.write()
+		return ret
+
+	def rpc_get_balances(self,addrs):
+		"subclasses should override this to fetch the balances with as few requests as possible"
+		return [self.rpc_get_balance(addr) for addr in addrs]
+
 	@property
 	def sorted_list(self):
 		return sorted(
@@ -691,11 +905,18 @@ class TrackingWallet(MMGenObject):
 
 	@write_mode
 	def import_address(self,addr,label,rescan):
+		TwUnspentSnapshot().invalidate()
 		return g.rpch.importaddress(addr,label,rescan,timeout=(False,3600)[rescan])
 
 	@write_mode
 	def batch_import_address(self,arg_list):
-		return g.rpch.importaddress(arg_list,batch=True)
+		TwUnspentSnapshot().invalidate()
+		return g.rpch.batch_request('importaddress',arg_list)
+
+	@write_mode
+	def rescan_blockchain(self,start,stop):
+		TwUnspentSnapshot().invalidate()
+		return g.rpch.rescanblockchain(start,stop,timeout=3600)
 
 	def force_write(self):
 		mode_save = self.mode
@@ -730,8 +951,19 @@ class TrackingWallet(MMGenObject):
 	def is_in_wallet(self,addr):
 		return addr in TwAddrList([],0,True,True,True,wallet=self).coinaddr_list()
 
+	def get_label_map(self):
+		"return a dict mapping all addresses in the tracking wallet to their labels"
+		if 'label_api' in g.rpch.caps:
+			labels = [l for l in g.rpch.listlabels() if l]
+			alists = [list(a.keys()) for a in g.rpch.batch_request('getaddressesbylabel',[[l] for l in labels])]
+		else:
+			labels = [l for l in g.rpch.listaccounts(0,True) if l]
+			alists = g.rpch.batch_request('getaddressesbyaccount',[[l] for l in labels])
+		return {addr:label for label,addrs in zip(labels,alists) for addr in addrs}
+
 	@write_mode
 	def set_label(self,coinaddr,lbl):
+		TwUnspentSnapshot().invalidate()
 		if 'label_api' in g.rpch.caps:
 			return g.rpch.setlabel(coinaddr,lbl,on_fail='return')
 		else:
@@ -802,6 +1034,160 @@ class TrackingWallet(MMGenObject):
 	def remove_address(self,addr):
 		raise NotImplementedError('address removal not implemented for coin {}'.format(g.coin))
 
+def tw_listunspent(minconf=0):
+	"listunspent for the tracking wallet, from the unspent outputs snapshot if enabled"
+	if g.tw_utxo_cache:
+		return [o for o in TwUnspentSnapshot().get_unspent() if o['confirmations'] >= minconf]
+	return g.rpch.listunspent(minconf)
+
+class TwUnspentSnapshot(MMGenObject):
+	"""
+	On-disk snapshot of the confirmed unspent outputs in the tracking wallet, recording the
+	block it's valid for.  On each use, the snapshot is brought up to date using
+	listsinceblock, and unconfirmed transactions are applied on top of it.  A reorg of the
+	snapshot block or a dropped mempool transaction spending one of our outputs causes a full
+	reload with listunspent.
+
+	Rows are lists of the fields in 'fields'.  'height' is None for unconfirmed outputs.
+	"""
+	version = 1
+	fields = ('txid','vout','address','label','amount','height','scriptPubKey','spendable','coinbase')
+	coinbase_maturity = 100
+
+	def __init__(self):
+		self.lbl_id = ('account','label')['label_api' in g.rpch.caps]
+		key = make_chksum_8('{}:{}'.format(g.rpch.host,g.rpch.port).encode()).lower()
+		self.fn = os.path.join(g.data_dir,'tw-utxo-{}-{}.json'.format(g.coin.lower(),key))
+
+	def load(self):
+		try:
+			with open(self.fn) as f:
+				d = json.loads(f.read())
+			assert d['version'] == self.version,'version mismatch'
+			assert (d['coin'],d['chain'],d['lbl_id']) == (g.coin,g.chain,self.lbl_id),'wallet mismatch'
+			return d
+		except Exception as e:
+			if os.path.exists(self.fn):
+				dmsg("Ignoring unspent outputs snapshot '{}': {}".format(self.fn,e.args[0]))
+			return None
+
+	def save(self,d):
+		tmp_fn = self.fn + '.tmp'
+		with open(tmp_fn,'w') as f:
+			f.write(json.dumps(d))
+		os.chmod(tmp_fn,0o600)
+		os.replace(tmp_fn,self.fn)
+
+	def invalidate(self):
+		"delete the snapshot, e.g. after addresses have been imported or relabeled"
+		if os.path.exists(self.fn):
+			os.unlink(self.fn)
+
+	def reload(self):
+		vmsg('Loading unspent outputs from {}'.format(g.proto.daemon_name))
+		while True: # make sure no block arrives while we're reading
+			blockhash = g.rpch.getbestblockhash()
+			us = g.rpch.listunspent(1) # confirmed outputs not spent in the mempool
+			if g.rpch.getbestblockhash() == blockhash: break
+		height = g.rpch.getblockheader(blockhash)['height']
+		utxos = {(o['txid'],o['vout']): [
+			o['txid'], o['vout'], o['address'], o.get(self.lbl_id), str(o['amount']),
+			height - o['confirmations'] + 1, o['scriptPubKey'], o['spendable'], False ] for o in us }
+
+		# listunspent omits immature coinbase outputs, so get them separately
+		r = g.rpch.listsinceblock(g.rpch.getblockhash(max(0,height-self.coinbase_maturity)),1,True)
+		tip = g.rpch.getblockheader(r['lastblock'])['height']
+		entries = {}
+		for e in r['transactions']:
+			if e['category'] == 'immature' and e['confirmations'] > 0:
+				entries.setdefault(e['txid'],[]).append(e)
+		self.apply_txs(utxos,entries,{t:tip-es[0]['confirmations']+1 for t,es in entries.items()})
+
+		return {
+			'version': self.version,
+			'coin': g.coin,
+			'chain': g.chain,
+			'lbl_id': self.lbl_id,
+			'blockhash': blockhash,
+			'height': height,
+			'pending': [],
+			'utxos': list(utxos.values()) }
+
+	def get_delta(self,d):
+		"""
+		return the result of listsinceblock for the snapshot's block, with its entries grouped
+		by txid, or None if the snapshot must be reloaded
+		"""
+		hdr = g.rpch.getblockheader(d['blockhash'],on_fail='silent')
+		from mmgen.rpc import rpc_error
+		if rpc_error(hdr) or hdr['confirmations'] < 1: # block is unknown or no longer in main chain
+			return None
+		r = g.rpch.listsinceblock(d['blockhash'],1,True)
+		entries = {}
+		for e in r['transactions']:
+			entries.setdefault(e['txid'],[]).append(e)
+		for txid in d['pending']: # mempool txs may have spent outputs missing from the snapshot
+			if txid not in entries or entries[txid][0]['confirmations'] < 0:
+				return None
+		return r,entries
+
+	def apply_txs(self,utxos,entries,heights):
+		"add the outputs received by, and remove the outputs spent by, the transactions in 'entries'"
+		if not entries: return
+		txids = list(entries)
+		txs = g.rpch.batch_request('gettransaction',[[txid,True] for txid in txids])
+		dec = dict(zip(txids,g.rpch.batch_request('decoderawtransaction',[[tx['hex']] for tx in txs])))
+		for txid,es in entries.items():
+			for e in es:
+				if e['category'] in ('receive','generate','immature'):
+					utxos[(txid,e['vout'])] = [
+						txid, e['vout'], e['address'], e.get(self.lbl_id), str(e['amount']),
+						heights[txid], dec[txid]['vout'][e['vout']]['scriptPubKey']['hex'],
+						not e.get('involvesWatchonly'), e['category'] != 'receive' ]
+		for txid in txids: # do this last, as txs may spend outputs of txs later in the list
+			for i in dec[txid]['vin']:
+				if 'txid' in i:
+					utxos.pop((i['txid'],i['vout']),None)
+
+	def get_unspent(self):
+		"return the unspent outputs in the tracking wallet in the format of 'listunspent 0'"
+		d = self.load()
+		delta = self.get_delta(d) if d else None
+		reloaded = not delta
+		if reloaded:
+			d = self.reload()
+			delta = self.get_delta(d)
+			if not delta:
+				die(2,'Unable to get unspent outputs: blockchain reorganized during reload')
+
+		r,entries = delta
+		tip = g.rpch.getblockheader(r['lastblock'])['height']
+		utxos = {(u[0],u[1]):u for u in d['utxos']}
+		confirmed = {t:es for t,es in entries.items() if es[0]['confirmations'] > 0}
+		unconfirmed = {t:es for t,es in entries.items() if es[0]['confirmations'] == 0}
+
+		self.apply_txs(utxos,confirmed,{t:tip-es[0]['confirmations']+1 for t,es in confirmed.items()})
+
+		pending = sorted(unconfirmed)
+		if reloaded or (r['lastblock'],pending) != (d['blockhash'],d['pending']):
+			d.update({ 'blockhash': r['lastblock'], 'height': tip, 'pending': pending, 'utxos': list(utxos.values()) })
+			self.save(d)
+
+		self.apply_txs(utxos,unconfirmed,{t:None for t in unconfirmed})
+
+		from decimal import Decimal
+		ret = []
+		for txid,vout,addr,label,amt,height,spk,spendable,coinbase in utxos.values():
+			confs = 0 if height == None else tip - height + 1
+			if coinbase and confs <= self.coinbase_maturity: # immature
+				continue
+			o = { 'txid': txid, 'vout': vout, 'address': addr, 'amount': Decimal(amt),
+					'confirmations': confs, 'scriptPubKey': spk, 'spendable': spendable }
+			if label != None:
+				o[self.lbl_id] = label
+			ret.append(o)
+		return ret
+
 class TwGetBalance(MMGenObject):
 
 	fs = '{w:13} {u:<16} {p:<16} {c}\n'
@@ -820,7 +1206,7 @@ class TwGetBalance(MMGenObject):
 	def create_data(self):
 		# 0: unconfirmed, 1: below minconf, 2: confirmed, 3: spendable (privkey in wallet)
 		lbl_id = ('account','label')['label_api' in g.rpch.caps]
-		for d in g.rpch.listunspent(0):
+		for d in tw_listunspent(0):
 			lbl = get_tw_label(d[lbl_id])
 			if lbl:
 				if lbl.mmid.type == 'mmgen':
@@ -20,7 +20,7 @@
 tx.py:  Transaction routines for the MMGen suite
 """
 
-import sys,os,json
+import sys,os,json,struct
 from stat import *
 from mmgen.common import *
 from mmgen.obj import *
@@ -117,107 +117,149 @@ def scriptPubKey2addr(s):
 	else:
 		raise NotImplementedError('Unknown scriptPubKey ({})'.format(s))
 
+class DeserializedTxOutput(dict):
+	"a transaction output whose address is computed from its scriptPubKey on first access"
+	def __missing__(self,key):
+		if key != 'address':
+			raise KeyError(key)
+		ret = self['address'] = scriptPubKey2addr(self['scriptPubKey'])[0]
+		return ret
+
 class DeserializedTX(dict,MMGenObject):
 	"""
 	Parse a serialized Bitcoin transaction
 	For checking purposes, additionally reconstructs the raw (unsigned) tx hex from signed tx hex
+
+	The data is read in place from a memoryview, and the unsigned serialization is assembled
+	from slices of it, with null bytes substituted for the scriptSigs
 	"""
-	def __init__(self,txhex):
+	u16 = struct.Struct('<H').unpack_from
+	u32 = struct.Struct('<I').unpack_from
+	u64 = struct.Struct('<Q').unpack_from
+	null = b'\x00'
 
-		def bytes2int(bytes_le):
-			if bytes_le[-1] & 0x80: # sign bit is set
-				die(3,"{}: Negative values not permitted in transaction!".format(bytes_le[::-1].hex()))
-			return int(bytes_le[::-1].hex(),16)
+	def __init__(self,txhex):
 
-		def bytes2coin_amt(bytes_le):
-			return g.proto.coin_amt(bytes2int(bytes_le) * g.proto.coin_amt.min_coin_unit)
+		u32,u64 = self.u32,self.u64
 
-		def bshift(n,skip=False,sub_null=False):
-			ret = tx[self.idx:self.idx+n]
-			self.idx += n
-			if sub_null:
-				self.raw_tx += b'\x00'
-			elif not skip:
-				self.raw_tx += ret
-			return ret
+		def check_sign(val,nbytes):
+			if val >> (nbytes*8 - 1): # sign bit is set
+				die(3,"{:0{}x}: Negative values not permitted in transaction!".format(val,nbytes*2))
+			return val
 
 		# https://bitcoin.org/en/developer-reference#compactsize-unsigned-integers
 		# For example, the number 515 is encoded as 0xfd0302.
-		def readVInt(skip=False):
-			s = tx[self.idx]
-			self.idx += 1
-			if not skip: self.raw_tx.append(s)
-
-			vbytes_len = 1 if s < 0xfd else 2 if s == 0xfd else 4 if s == 0xfe else 8
-
-			if vbytes_len == 1:
-				return s
+		def readVInt(pos):
+			s = tx[pos]
+			if s < 0xfd:
+				return s,pos+1
+			elif s == 0xfd:
+				return self.u16(tx,pos+1)[0],pos+3
+			elif s == 0xfe:
+				return u32(tx,pos+1)[0],pos+5
 			else:
-				vbytes = tx[self.idx:self.idx+vbytes_len]
-				self.idx += vbytes_len
-				if not skip: self.raw_tx += vbytes
-				return int(vbytes[::-1].hex(),16)
-
-		def make_txid(tx_bytes):
-			return sha256(sha256(tx_bytes).digest()).digest()[::-1].hex()
-
-		self.idx = 0
-		self.raw_tx = bytearray()
-
-		tx = bytes.fromhex(txhex)
-		d = { 'version': bytes2int(bshift(4)) }
-
-		has_witness = tx[self.idx] == 0
-		if has_witness:
-			u = bshift(2,skip=True).hex()
-			if u != '0001':
-				raise IllegalWitnessFlagValue("'{}': Illegal value for flag in transaction!".format(u))
-
-		d['num_txins'] = readVInt()
-
-		d['txins'] = MMGenList([{
-			'txid':      bshift(32)[::-1].hex(),
-			'vout':      bytes2int(bshift(4)),
-			'scriptSig': bshift(readVInt(skip=True),sub_null=True).hex(),
-			'nSeq':      bshift(4)[::-1].hex()
-		} for i in range(d['num_txins'])])
-
-		d['num_txouts'] = readVInt()
+				return u64(tx,pos+1)[0],pos+9
 
-		d['txouts'] = MMGenList([{
-			'amount':       bytes2coin_amt(bshift(8)),
-			'scriptPubKey': bshift(readVInt()).hex()
-		} for i in range(d['num_txouts'])])
+		def make_txid(*parts):
+			h = sha256()
+			for p in parts:
+				h.update(p)
+			return sha256(h.digest()).digest()[::-1].hex()
 
-		for o in d['txouts']:
-			o['address'] = scriptPubKey2addr(o['scriptPubKey'])[0]
-
-		if has_witness:
-			# https://github.com/bitcoin/bips/blob/master/bip-0141.mediawiki
-			# A non-witness program (defined hereinafter) txin MUST be associated with an empty
-			# witness field, represented by a 0x00.
-
-			d['txid'] = make_txid(tx[:4] + tx[6:self.idx] + tx[-4:])
-			d['witness_size'] = len(tx) - self.idx + 2 - 4 # add len(marker+flag), subtract len(locktime)
-
-			for txin in d['txins']:
-				if tx[self.idx] == 0:
-					bshift(1,skip=True)
-					continue
-				txin['witness'] = [
-					bshift(readVInt(skip=True),skip=True).hex() for item in range(readVInt(skip=True)) ]
-		else:
-			d['txid'] = make_txid(tx)
-			d['witness_size'] = 0
+		try:
+			tx = memoryview(bytes.fromhex(txhex))
+			d = { 'version': check_sign(u32(tx,0)[0],4) }
+
+			has_witness = tx[4] == 0
+			if has_witness:
+				u = tx[4:6].hex()
+				if u != '0001':
+					raise IllegalWitnessFlagValue("'{}': Illegal value for flag in transaction!".format(u))
+			pos = 6 if has_witness else 4
+
+			raw_parts = [tx[:4]]
+			d['num_txins'],p = readVInt(pos)
+			raw_parts.append(tx[pos:p])
+			pos = p
+
+			txins = MMGenList()
+			null = self.null
+			for i in range(d['num_txins']):
+				ss_len,p = readVInt(pos+36)
+				seq = p + ss_len
+				txins.append({
+					'txid':      tx[pos:pos+32].tobytes()[::-1].hex(),
+					'vout':      check_sign(u32(tx,pos+32)[0],4),
+					'scriptSig': tx[p:seq].hex(),
+					'nSeq':      tx[seq:seq+4].tobytes()[::-1].hex() })
+				raw_parts += (tx[pos:pos+36],null,tx[seq:seq+4])
+				pos = seq + 4
+			d['txins'] = txins
+
+			outs_start = pos
+			d['num_txouts'],pos = readVInt(pos)
+
+			min_coin_unit,coin_amt = g.proto.coin_amt.min_coin_unit,g.proto.coin_amt
+			txouts = MMGenList()
+			for i in range(d['num_txouts']):
+				spk_len,p = readVInt(pos+8)
+				txouts.append(DeserializedTxOutput(
+					amount       = coin_amt(check_sign(u64(tx,pos)[0],8) * min_coin_unit),
+					scriptPubKey = tx[p:p+spk_len].hex() ))
+				pos = p + spk_len
+			d['txouts'] = txouts
+			raw_parts.append(tx[outs_start:pos])
+
+			if has_witness:
+				# https://github.com/bitcoin/bips/blob/master/bip-0141.mediawiki
+				# A non-witness program (defined hereinafter) txin MUST be associated with an empty
+				# witness field, represented by a 0x00.
+
+				d['txid'] = make_txid(tx[:4],tx[6:pos],tx[-4:])
+				d['witness_size'] = len(tx) - pos + 2 - 4 # add len(marker+flag), subtract len(locktime)
+
+				for txin in txins:
+					nitems,pos = readVInt(pos)
+					if nitems == 0:
+						continue
+					w = txin['witness'] = []
+					for item in range(nitems):
+						n,pos = readVInt(pos)
+						w.append(tx[pos:pos+n].hex())
+						pos += n
+			else:
+				d['txid'] = make_txid(tx)
+				d['witness_size'] = 0
+		except (IndexError,struct.error):
+			raise TxHexParseError('TX hex has invalid length: data truncated')
 
-		if len(tx) - self.idx != 4:
-			raise TxHexParseError('TX hex has invalid length: {} extra bytes'.format(len(tx)-self.idx-4))
+		if len(tx) - pos != 4:
+			raise TxHexParseError('TX hex has invalid length: {} extra bytes'.format(len(tx)-pos-4))
 
-		d['lock_time'] = bytes2int(bshift(4))
-		d['unsigned_hex'] = self.raw_tx.hex()
+		d['lock_time'] = check_sign(u32(tx,pos)[0],4)
+		raw_parts.append(tx[pos:])
+		d['unsigned_hex'] = b''.join(raw_parts).hex()
 
 		dict.__init__(self,d)
 
+def verify_txs(txs):
+	"""
+	Check the hex data of each of a list of signed transactions against its MMGen data.
+	Each transaction's hex is parsed only once, the result being cached on the instance.
+	Return a list of (tx,exception) pairs for the transactions that failed
+	"""
+	ret = []
+	for tx in txs:
+		try:
+			dt = tx.get_deserialized()
+			tx.check_hex_tx_matches_mmgen_tx(dt)
+			assert tx.check_sigs(dt), 'transaction is unsigned'
+			if tx.coin_txid and tx.coin_txid != dt['txid']:
+				raise BadMMGenTxID('txid mismatch')
+		except Exception as e:
+			ret.append((tx,e))
+	return ret
+
 class MMGenTxIO(MMGenListItem):
 	vout     = MMGenListItemAttr('vout',int,typeconv=False)
 	_amt     = MMGenImmutableAttr('amt',None,no_type_check=True,typeconv=False)
@@ -326,6 +368,7 @@ Selected non-{pnm} inputs: {{}}""".strip().format(pnm=g.proj_name,pnl=g.proj_nam
 		self.send_amt    = g.proto.coin_amt('0')  # total amt minus change
 		self.fee         = g.proto.coin_amt('0')
 		self.hex         = ''          # raw serialized hex transaction
+		self._deserialized = (None,None) # (hex,DeserializedTX) cached by get_deserialized()
 		self.label       = MMGenTXLabel('')
 		self.txid        = ''
 		self.coin_txid    = ''
@@ -449,9 +492,9 @@ Selected non-{pnm} inputs: {{}}""".strip().format(pnm=g.proj_name,pnl=g.proj_nam
 
 	def compare_size_and_estimated_size(self):
 		est_vsize = self.estimate_size()
-		d = g.rpch.decoderawtransaction(self.hex)
-		vsize = d['vsize'] if 'vsize' in d else d['size']
-		vmsg('\nSize: {}, Vsize: {} (true) {} (estimated)'.format(d['size'],vsize,est_vsize))
+		size = len(self.hex) // 2
+		vsize = (3 * (size - self.get_deserialized()['witness_size']) + size + 3) // 4 # BIP141
+		vmsg('\nSize: {}, Vsize: {} (true) {} (estimated)'.format(size,vsize,est_vsize))
 		m1 = 'Estimated transaction vsize is {:1.2f} times the true vsize\n'
 		m2 = 'Your transaction fee estimates will be inaccurate\n'
 		m3 = 'Please re-create and re-sign the transaction using the option --vsize-adj={:1.2f}'
@@ -470,34 +513,46 @@ Selected non-{pnm} inputs: {{}}""".strip().format(pnm=g.proj_name,pnl=g.proj_nam
 	# vsize: 3 times of the size with original serialization, plus the size with new
 	# serialization, divide the result by 4 and round up to the next integer.
 
+	@staticmethod
+	def get_est_input_sizes():
+		"""
+		estimated size of each type of input, and of its witness field in a transaction
+		with segwit inputs
+		"""
+		sig_size = 72 # sig in DER format
+		pubkey_size_uncompressed = 65
+		pubkey_size_compressed = 33
+
+		# txid vout [scriptSig size (vInt)] scriptSig (<sig> <pubkey>) nSeq
+		isize_common = 32 + 4 + 1 + 4 # txid vout [scriptSig size] nSeq = 41
+		wf_size = 1 + 1 + sig_size + 1 + pubkey_size_compressed # vInt vInt sig vInt pubkey = 108
+		return {
+			'L': (isize_common + sig_size + pubkey_size_uncompressed, 1), # = 180
+			'C': (isize_common + sig_size + pubkey_size_compressed, 1),   # = 148
+			'S': (isize_common + 23, wf_size),                            # = 64
+			'B': (isize_common + 0, wf_size)                              # = 41
+		}
+
+	# output bytes = amt: 8, byte_count: 1+, pk_script
+	# pk_script bytes: p2pkh: 25, p2sh: 23, bech32: 22
+	est_output_sizes = {'p2pkh':34,'p2sh':32,'bech32':31}
+
 	# TODO: results differ slightly from actual transaction size
 	def estimate_size(self):
 		if not self.inputs or not self.outputs: return None
 
-		sig_size = 72 # sig in DER format
-		pubkey_size_uncompressed = 65
-		pubkey_size_compressed = 33
+		input_sizes = self.get_est_input_sizes()
 
 		def get_inputs_size():
-			# txid vout [scriptSig size (vInt)] scriptSig (<sig> <pubkey>) nSeq
-			isize_common = 32 + 4 + 1 + 4 # txid vout [scriptSig size] nSeq = 41
-			input_size = {
-				'L': isize_common + sig_size + pubkey_size_uncompressed, # = 180
-				'C': isize_common + sig_size + pubkey_size_compressed,   # = 148
-				'S': isize_common + 23,                                  # = 64
-				'B': isize_common + 0                                    # = 41
-			}
-			ret = sum(input_size[i.mmid.mmtype] for i in self.inputs if i.mmid)
+			ret = sum(input_sizes[i.mmid.mmtype][0] for i in self.inputs if i.mmid)
 
 			# We have no way of knowing whether a non-MMGen addr is compressed or uncompressed until
 			# we see the key, so assume compressed for fee-estimation purposes.  If fee estimate is
 			# off by more than 5%, sign() aborts and user is instructed to use --vsize-adj option
-			return ret + sum(input_size['C'] for i in self.inputs if not i.mmid)
+			return ret + sum(input_sizes['C'][0] for i in self.inputs if not i.mmid)
 
 		def get_outputs_size():
-			# output bytes = amt: 8, byte_count: 1+, pk_script
-			# pk_script bytes: p2pkh: 25, p2sh: 23, bech32: 22
-			return sum({'p2pkh':34,'p2sh':32,'bech32':31}[o.addr.addr_fmt] for o in self.outputs)
+			return sum(self.est_output_sizes[o.addr.addr_fmt] for o in self.outputs)
 
 		# https://github.com/bitcoin/bips/blob/master/bip-0141.mediawiki
 		# The witness is a serialization of all witness data of the transaction. Each txin is
@@ -509,8 +564,7 @@ Selected non-{pnm} inputs: {{}}""".strip().format(pnm=g.proj_name,pnl=g.proj_nam
 		# by a 0x00. If all txins are not witness program, a transaction's wtxid is equal to its txid.
 		def get_witness_size():
 			if not self.has_segwit_inputs(): return 0
-			wf_size = 1 + 1 + sig_size + 1 + pubkey_size_compressed # vInt vInt sig vInt pubkey = 108
-			return sum((1,wf_size)[bool(i.mmid) and i.mmid.mmtype in ('S','B')] for i in self.inputs)
+			return sum(input_sizes[i.mmid.mmtype if i.mmid else 'C'][1] for i in self.inputs)
 
 		isize = get_inputs_size()
 		osize = get_outputs_size()
@@ -740,6 +794,36 @@ Selected non-{pnm} inputs: {{}}""".strip().format(pnm=g.proj_name,pnl=g.proj_nam
 
 		self.check_pubkey_scripts()
 
+		if g.proto.sign_mode == 'native' and not opt.sign_with_daemon:
+			ret = self.sign_native(tx_num_str,keys)
+		else:
+			ret = self.sign_with_daemon(tx_num_str,keys)
+		if not ret:
+			return False
+
+		try:
+			self.hex = HexStr(ret)
+			self.compare_size_and_estimated_size()
+			dt = self.get_deserialized()
+			self.check_hex_tx_matches_mmgen_tx(dt)
+			self.coin_txid = CoinTxID(dt['txid'],on_fail='raise')
+			self.check_sigs(dt)
+			if hasattr(g.rpch,'decoderawtransaction') and not (
+					self.coin_txid == g.rpch.decoderawtransaction(ret)['txid']):
+				raise BadMMGenTxID('txid mismatch (after signing)')
+			msg('OK')
+			return True
+		except Exception as e:
+			try: m = '{}'.format(e.args[0])
+			except: m = repr(e.args[0])
+			msg('\n'+yellow(m))
+			if g.traceback:
+				import traceback
+				ymsg('\n'+''.join(traceback.format_exception(*sys.exc_info())))
+			return False
+
+	def sign_with_daemon(self,tx_num_str,keys):
+		"sign the transaction with the coin daemon, returning the signed hex, or None on failure"
 		qmsg('Passing {} key{} to {}'.format(len(keys),suf(keys),g.proto.daemon_name))
 
 		if self.has_segwit_inputs():
@@ -767,32 +851,44 @@ Selected non-{pnm} inputs: {{}}""".strip().format(pnm=g.proj_name,pnl=g.proj_nam
 		except Exception as e:
 			msg(yellow('This is not the BCH chain.\nRe-run the script without the --coin=bch option.'
 				if 'Invalid sighash param' in e.args[0] else e.args[0]))
-			return False
+			return None
 
 		if not ret['complete']:
 			msg('failed\n{} returned the following errors:'.format(g.proto.daemon_name.capitalize()))
 			msg(repr(ret['errors']))
-			return False
+			return None
+
+		return ret['hex']
+
+	def sign_native(self,tx_num_str,keys):
+		"sign the transaction without a coin daemon, returning the signed hex, or None on failure"
+		from mmgen.signer import TxSigner,sign_txs
+		from mmgen.addr import KeyGenerator
 
+		keydict = {d.addr:d.sec for d in keys}
+		missing = [d.addr for d in self.inputs if d.addr not in keydict]
+		if missing:
+			msg('No key found for input address{} {}'.format(suf(missing,'es'),' '.join(missing)))
+			return None
+
+		privkeys = [keydict[d.addr] for d in self.inputs]
+		pubkeys = KeyGenerator('std').to_pubhex_batch(privkeys)
+		dt = self.get_deserialized()
+
+		msg_r('Signing transaction{}...'.format(tx_num_str))
 		try:
-			self.hex = HexStr(ret['hex'])
-			self.compare_size_and_estimated_size()
-			dt = DeserializedTX(self.hex)
-			self.check_hex_tx_matches_mmgen_tx(dt)
-			self.coin_txid = CoinTxID(dt['txid'],on_fail='raise')
-			self.check_sigs(dt)
-			if not self.coin_txid == g.rpch.decoderawtransaction(ret['hex'])['txid']:
-				raise BadMMGenTxID('txid mismatch (after signing)')
-			msg('OK')
-			return True
+			assert [(i['txid'],i['vout']) for i in dt['txins']] == [(i.txid,i.vout) for i in self.inputs],(
+				'Inputs in hex transaction data do not match those in MMGen transaction')
+			signer = TxSigner(
+				dt['unsigned_hex'],
+				[(d.scriptPubKey,d.amt.toSatoshi(),bytes.fromhex(k),bytes.fromhex(p))
+					for d,k,p in zip(self.inputs,privkeys,pubkeys)],
+				forkid = 'FORKID' in g.proto.sighash_type,
+				witness_vernum_hex = g.proto.witness_vernum_hex )
+			return sign_txs([signer])[0]
 		except Exception as e:
-			try: m = '{}'.format(e.args[0])
-			except: m = repr(e.args[0])
-			msg('\n'+yellow(m))
-			if g.traceback:
-				import traceback
-				ymsg('\n'+''.join(traceback.format_exception(*sys.exc_info())))
-			return False
+			msg('failed\n{}'.format(e.args[0]))
+			return None
 
 	def mark_raw(self):
 		self.desc = 'transaction'
@@ -806,6 +902,12 @@ Selected non-{pnm} inputs: {{}}""".strip().format(pnm=g.proj_name,pnl=g.proj_nam
 		ret = self.desc == 'signed transaction'
 		return (red,green)[ret](str(ret)) if color else ret
 
+	def get_deserialized(self):
+		"parse the hex transaction, reusing the previous result if the hex is unchanged"
+		if self._deserialized[0] != self.hex:
+			self._deserialized = (self.hex,DeserializedTX(self.hex))
+		return self._deserialized[1]
+
 	# check that a malicious, compromised or malfunctioning coin daemon hasn't altered hex tx data:
 	# does not check witness or signature data
 	def check_hex_tx_matches_mmgen_tx(self,deserial_tx):
@@ -853,7 +955,7 @@ Selected non-{pnm} inputs: {{}}""".strip().format(pnm=g.proj_name,pnl=g.proj_nam
 
 	# check signature and witness data
 	def check_sigs(self,deserial_tx=None): # return False if no sigs, raise exception on error
-		txins = (deserial_tx or DeserializedTX(self.hex))['txins']
+		txins = (deserial_tx or self.get_deserialized())['txins']
 		has_ss = any(ti['scriptSig'] for ti in txins)
 		has_witness = any('witness' in ti and ti['witness'] for ti in txins)
 		if not (has_ss or has_witness):
@@ -885,8 +987,15 @@ Selected non-{pnm} inputs: {{}}""".strip().format(pnm=g.proj_name,pnl=g.proj_nam
 
 		class r(object): pass
 
+		# the lookups are independent, so perform them concurrently
+		sf = {'on_fail':'silent'}
+		mp_entry,wallet_tx,raw_tx = g.rpch.gather([
+			('getmempoolentry',self.coin_txid,sf),
+			('gettransaction',self.coin_txid,sf),
+			('getrawtransaction',self.coin_txid,True,sf) ])
+
 		def is_in_wallet():
-			ret = g.rpch.gettransaction(self.coin_txid,on_fail='silent')
+			ret = wallet_tx
 			if 'confirmations' in ret and ret['confirmations'] > 0:
 				r.confs = ret['confirmations']
 				return True
@@ -894,14 +1003,14 @@ Selected non-{pnm} inputs: {{}}""".strip().format(pnm=g.proj_name,pnl=g.proj_nam
 				return False
 
 		def is_in_utxos():
-			return 'txid' in g.rpch.getrawtransaction(self.coin_txid,True,on_fail='silent')
+			return 'txid' in raw_tx
 
 		def is_in_mempool():
-			return 'size' in g.rpch.getmempoolentry(self.coin_txid,on_fail='silent')
+			return 'size' in mp_entry
 
 		def is_replaced():
 			if is_in_mempool(): return False
-			ret = g.rpch.gettransaction(self.coin_txid,on_fail='silent')
+			ret = wallet_tx
 
 			if not 'bip125-replaceable' in ret or not 'confirmations' in ret or ret['confirmations'] > 0:
 				return False
@@ -912,7 +1021,7 @@ Selected non-{pnm} inputs: {{}}""".strip().format(pnm=g.proj_name,pnl=g.proj_nam
 
 		if is_in_mempool():
 			if status:
-				d = g.rpch.gettransaction(self.coin_txid,on_fail='silent')
+				d = wallet_tx
 				brs = 'bip125-replaceable'
 				rep = '{}replaceable'.format(('NOT ','')[brs in d and d[brs]=='yes'])
 				t = d['timereceived']
@@ -937,7 +1046,7 @@ Selected non-{pnm} inputs: {{}}""".strip().format(pnm=g.proj_name,pnl=g.proj_nam
 			msg('{}\n{}'.format(m1,m2))
 			if not opt.quiet:
 				msg('Replacing transactions:')
-				d = ((t,g.rpch.getmempoolentry(t,on_fail='silent')) for t in r.replacing_txs)
+				d = zip(r.replacing_txs,g.rpch.gather([('getmempoolentry',t,sf) for t in r.replacing_txs]))
 				for txid,mp_entry in d:
 					msg('  {}{}'.format(txid,' in mempool' if ('size' in mp_entry) else ''))
 			die(0,'')
@@ -958,7 +1067,7 @@ Selected non-{pnm} inputs: {{}}""".strip().format(pnm=g.proj_name,pnl=g.proj_nam
 
 		self.check_pubkey_scripts()
 
-		self.check_hex_tx_matches_mmgen_tx(DeserializedTX(self.hex))
+		self.check_hex_tx_matches_mmgen_tx(self.get_deserialized())
 
 		if self.has_segwit_outputs() and not segwit_is_active() and not g.bogus_send:
 			m = 'Transaction has MMGen Segwit outputs, but this blockchain does not support Segwit'
@@ -1029,7 +1138,8 @@ Selected non-{pnm} inputs: {{}}""".strip().format(pnm=g.proj_name,pnl=g.proj_nam
 						ask_write=True,
 						ask_write_default_yes=False,
 						ask_tty=True,
-						ask_overwrite=True):
+						ask_overwrite=True,
+						atomic=False):
 
 		if ask_write == False: ask_write_default_yes = True
 		if not self.fmt_data:  self.format()
@@ -1039,7 +1149,8 @@ Selected non-{pnm} inputs: {{}}""".strip().format(pnm=g.proj_name,pnl=g.proj_nam
 			ask_overwrite=ask_overwrite,
 			ask_write=ask_write,
 			ask_tty=ask_tty,
-			ask_write_default_yes=ask_write_default_yes)
+			ask_write_default_yes=ask_write_default_yes,
+			atomic=atomic)
 
 	def view_with_prompt(self,prompt=''):
 		prompt += ' (y)es, (N)o, pager (v)iew, (t)erse view'
@@ -1127,7 +1238,7 @@ Selected non-{pnm} inputs: {{}}""".strip().format(pnm=g.proj_name,pnl=g.proj_nam
 		ts = len(self.hex)//2 if self.hex else 'unknown'
 		out = 'Transaction size: Vsize {} (estimated), Total {}'.format(self.estimate_size(),ts)
 		if self.marked_signed():
-			ws = DeserializedTX(self.hex)['witness_size']
+			ws = self.get_deserialized()['witness_size']
 			out += ', Base {}, Witness {}'.format(ts-ws,ws)
 		return out + '\n'
 
@@ -1365,17 +1476,20 @@ Selected non-{pnm} inputs: {{}}""".strip().format(pnm=g.proj_name,pnl=g.proj_nam
 		return m.format(g.proto.coin_amt(change_amt).hl(),g.coin)
 
 	def select_unspent_cmdline(self,unspent):
+
+		# index the outputs' MMGen IDs and addresses, so each input spec is a single lookup
+		by_twmmid,by_addr = {},{}
+		for j,e in enumerate(unspent,1):
+			by_twmmid.setdefault(e.twmmid,[]).append(j)
+			by_addr.setdefault(e.addr,[]).append(j)
+
 		sel_nums = []
 		for i in opt.inputs.split(','):
 			ls = len(sel_nums)
 			if is_mmgen_id(i):
-				for j in range(len(unspent)):
-					if unspent[j].twmmid == i:
-						sel_nums.append(j+1)
+				sel_nums += by_twmmid.get(i,[])
 			elif is_coin_addr(i):
-				for j in range(len(unspent)):
-					if unspent[j].addr == i:
-						sel_nums.append(j+1)
+				sel_nums += by_addr.get(i,[])
 			else:
 				die(1,"'{}': not an MMGen ID or coin address".format(i))
 
@@ -1394,14 +1508,125 @@ Selected non-{pnm} inputs: {{}}""".strip().format(pnm=g.proj_name,pnl=g.proj_nam
 		# Bitcoin full node, call doesn't go to the network, so just call listunspent with addrs=[]
 		return []
 
+	def get_auto_inputs_fee_rate(self):
+		"""
+		return the fee rate, in minimum coin units per byte, and the fixed fee, in minimum
+		coin units, for automatic input selection
+		"""
+		unit = g.proto.coin_amt.min_coin_unit
+		if opt.tx_fee:
+			if g.proto.coin_amt(opt.tx_fee,on_fail='silent'):
+				return 0,int(g.proto.coin_amt(opt.tx_fee) // unit)
+			rate = self.process_fee_spec(opt.tx_fee,1) / unit
+		else:
+			fee_per_kb,fe_type = self.get_rel_fee_from_network()
+			if fee_per_kb < 0:
+				die(2,self.fee_fail_fs.format(c=opt.tx_confs,t=fe_type) +
+					'\nPlease specify a fee with the --tx-fee option')
+			rate = Decimal(str(fee_per_kb)) * Decimal(str(opt.tx_fee_adj)) / 1024 / unit
+		return float(rate) * float(opt.vsize_adj or 1),0
+
+	def get_coin_selector(self):
+		"""
+		return a CoinSelector for the spendable MMGen outputs in the tracking wallet, with
+		a size model matching estimate_size()
+		"""
+		from mmgen.coinselect import CoinSelector
+		unsp = self.twuo.unspent
+		unit = g.proto.coin_amt.min_coin_unit
+		input_sizes = self.get_est_input_sizes()
+		twmmids = unsp.col('twmmid')
+		# non-MMGen inputs require keys to be supplied separately at signing, so skip them
+		idxs = [n for n in range(len(twmmids)) if twmmids[n].type == 'mmgen']
+		have_segwit = any(twmmids[n].obj.mmtype in ('S','B') for n in idxs)
+
+		def weight(mmtype):
+			size,wsize = input_sizes[mmtype]
+			return size * 4 + (0,wsize)[have_segwit]
+
+		weights = {k:weight(k) for k in input_sizes}
+		amts = unsp.col('amt')
+		osize = sum(self.est_output_sizes[o.addr.addr_fmt] for o in self.outputs)
+		chg_idx = self.get_chg_output_idx()
+		chg_size = self.est_output_sizes[self.outputs[chg_idx].addr.addr_fmt]
+		fee_rate,fixed_fee = self.get_auto_inputs_fee_rate()
+
+		cs = CoinSelector(
+			amts        = [int(amts[n] // unit) for n in idxs],
+			weights     = [weights[twmmids[n].obj.mmtype] for n in idxs],
+			target      = int(self.send_amt // unit),
+			fee_rate    = fee_rate,
+			fixed_fee   = fixed_fee,
+			base_weight = (4 + 1 + 1 + osize + 4) * 4 + (0,2)[have_segwit],
+			chg_weight  = chg_size * 4,
+			# the dust threshold: the cost of creating and spending the change at 3 satoshis/byte
+			min_change  = 3 * (chg_size + input_sizes['C'][0]),
+			max_fee     = int(g.proto.max_tx_fee // unit) - fixed_fee,
+			# with no send amount, the change output is the only output and must be kept
+			require_change = not self.send_amt )
+		return cs,idxs
+
+	def get_inputs_auto(self):
+		"""
+		select inputs using the coin selection strategy given by --auto-inputs.  The fee
+		is then determined as usual.  If the selection allows it, the remaining excess is
+		added to the fee and the change output is dropped
+		"""
+		cs,idxs = self.get_coin_selector()
+		unsp,unit = self.twuo.unspent,g.proto.coin_amt.min_coin_unit
+
+		for i in range(3): # the fee may differ from the selector's estimate, so retry on shortfall
+			t = time.time()
+			ret = cs.select(opt.auto_inputs)
+			if not ret:
+				m = 'Automatic input selection failed: insufficient spendable {} funds in tracking wallet,'
+				die(2,(m+'\nor too many inputs required for a standard-sized transaction').format(g.proj_name))
+			sel,changeless = ret
+			from mmgen.tw import TwUnspentRow
+			sel_unspent = self.twuo.MMGenTwOutputList([TwUnspentRow(unsp,idxs[j]).item() for j in sel])
+			inputs_sum = sum(s.amt for s in sel_unspent)
+			msg('Selected {} input{} ({}), total {} {}, using the {!r} strategy ({:.3f}s)'.format(
+				len(sel),
+				suf(sel),
+				('with change','no change')[changeless],
+				inputs_sum.hl(),
+				g.dcoin,
+				opt.auto_inputs,
+				time.time() - t ))
+
+			self.copy_inputs_from_tw(sel_unspent)  # makes self.inputs
+
+			self.fee = self.get_fee_from_user()
+
+			change_amt = self.get_change_amt()
+
+			if change_amt >= 0:
+				if changeless and change_amt <= cs.cost_of_change * unit:
+					msg('Adding {} {} of excess input value to the fee'.format(change_amt,g.coin))
+					self.fee += change_amt
+					change_amt = g.proto.coin_amt('0')
+				p = self.final_inputs_ok_msg(change_amt)
+				if opt.yes or keypress_confirm(p+'. OK?',default_yes=True):
+					if opt.yes: msg(p)
+					return change_amt
+				die(1,'Exiting at user request')
+
+			cs.target -= int(change_amt // unit) # change_amt is negative
+			self.warn_insufficient_chg(change_amt)
+
+		die(2,'Unable to fund transaction with automatically selected inputs')
+
 	def get_inputs_from_user(self):
 
+		if opt.auto_inputs:
+			return self.get_inputs_auto()
+
 		while True:
 			us_f = self.select_unspent_cmdline if opt.inputs else self.select_unspent
 			sel_nums = us_f(self.twuo.unspent)
 
 			msg('Selected output{}: {}'.format(suf(sel_nums),' '.join(map(str,sel_nums))))
-			sel_unspent = self.twuo.MMGenTwOutputList([self.twuo.unspent[i-1] for i in sel_nums])
+			sel_unspent = self.twuo.MMGenTwOutputList([self.twuo.unspent[i-1].item() for i in sel_nums])
 
 			inputs_sum = sum(s.amt for s in sel_unspent)
 			if not self.precheck_sufficient_funds(inputs_sum,sel_unspent):
@@ -1450,7 +1675,7 @@ Selected non-{pnm} inputs: {{}}""".strip().format(pnm=g.proj_name,pnl=g.proj_nam
 
 		do_license_msg()
 
-		if not opt.inputs:
+		if not (opt.inputs or opt.auto_inputs):
 			self.twuo.view_and_sort(self)
 
 		self.twuo.display_total()
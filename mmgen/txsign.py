@@ -67,21 +67,70 @@ def get_seed_for_seed_id(sid,infiles,saved_seeds):
 		else:
 			die(2,'ERROR: No seed source found for Seed ID: {}'.format(sid))
 
-def generate_kals_for_mmgen_addrs(need_keys,infiles,saved_seeds):
+# key-address list entries generated from seeds, by protocol and (al_id,idx), for reuse by
+# later transactions
+saved_keys = {}
+
+def generate_keys_for_mmgen_addrs(need_keys,infiles,saved_seeds):
+	"return the key-address list entries for 'need_keys' by (al_id,idx), generating only unsaved ones"
+	keys = saved_keys.setdefault(g.proto.__name__,{})
 	mmids = [e.mmid for e in need_keys]
-	sids = {i.sid for i in mmids}
-	vmsg('Need seed{}: {}'.format(suf(sids),' '.join(sids)))
-	d = MMGenList()
+	idxs = {}
+	for i in mmids:
+		if (i.al_id,i.idx) not in keys:
+			idxs.setdefault((i.sid,i.mmtype),[]).append(i.idx)
+	sids = {sid for sid,t in idxs}
+	if sids:
+		vmsg('Need seed{}: {}'.format(suf(sids),' '.join(sids)))
 	from mmgen.addr import KeyAddrList
 	for sid in sids:
 		# Returns only if seed is found
 		seed = get_seed_for_seed_id(sid,infiles,saved_seeds)
 		for t in MMGenAddrType.mmtypes:
-			idx_list = [i.idx for i in mmids if i.sid == sid and i.mmtype == t]
+			idx_list = idxs.get((sid,t))
 			if idx_list:
 				addr_idxs = AddrIdxList(idx_list=idx_list)
-				d.append(KeyAddrList(seed=seed,addr_idxs=addr_idxs,mmtype=MMGenAddrType(t)))
-	return d
+				kal = KeyAddrList(seed=seed,addr_idxs=addr_idxs,mmtype=MMGenAddrType(t))
+				keys.update(((kal.al_id,f.idx),f) for f in kal.data)
+	return {(i.al_id,i.idx):keys[(i.al_id,i.idx)] for i in mmids if (i.al_id,i.idx) in keys}
+
+def generate_keys_for_txs(txs,infiles,saved_seeds):
+	"generate the keys for the MMGen inputs and outputs of 'txs' in one pass, saving them for txsign()"
+	generate_keys_for_mmgen_addrs([e for tx in txs for e in tx.inputs + tx.outputs if e.mmid],infiles,saved_seeds)
+
+_txsign_worker_data = None
+
+def _txsign_worker_init(func,txs,in_process=False):
+	global _txsign_worker_data
+	if not in_process:
+		opt.quiet = True
+		opt.jobs = None
+		if g.proto.sign_mode == 'daemon': # don't share the parent's connection
+			rpc_init(reinit=True)
+	_txsign_worker_data = (func,txs)
+
+def _txsign_worker(idx):
+	func,txs = _txsign_worker_data
+	return func(txs[idx])
+
+def map_txs(func,txs,jobs):
+	"""
+	return the results of 'func' applied to each transaction in 'txs', using 'jobs' forked
+	processes.  The workers inherit the transactions and any seeds and keys held by the
+	parent, so only indexes and results are passed between processes
+	"""
+	worker_args = (func,txs)
+	if min(jobs,len(txs)) <= 1:
+		_txsign_worker_init(*worker_args,in_process=True)
+		return list(map(_txsign_worker,range(len(txs))))
+	import multiprocessing as mp
+	from concurrent.futures import ProcessPoolExecutor
+	with ProcessPoolExecutor(
+			max_workers = min(jobs,len(txs)),
+			mp_context  = mp.get_context('fork'),
+			initializer = _txsign_worker_init,
+			initargs    = worker_args ) as ex:
+		return list(ex.map(_txsign_worker,range(len(txs))))
 
 def add_keys(tx,src,infiles=None,saved_seeds=None,keyaddr_list=None):
 	need_keys = [e for e in getattr(tx,src) if e.mmid and not e.have_wif]
@@ -89,20 +138,19 @@ def add_keys(tx,src,infiles=None,saved_seeds=None,keyaddr_list=None):
 	desc,m1 = ('key-address file','From key-address file:') if keyaddr_list else \
 					('seed(s)','Generated from seed:')
 	qmsg('Checking {} -> {} address mappings for {} (from {})'.format(pnm,g.coin,src,desc))
-	d = MMGenList([keyaddr_list]) if keyaddr_list else \
-		generate_kals_for_mmgen_addrs(need_keys,infiles,saved_seeds)
+	# index the keys by (al_id,idx), so matching is O(inputs + keys)
+	kal_keys = {(keyaddr_list.al_id,f.idx):f for f in keyaddr_list.data} if keyaddr_list else \
+		generate_keys_for_mmgen_addrs(need_keys,infiles,saved_seeds)
 	new_keys = []
 	for e in need_keys:
-		for kal in d:
-			for f in kal.data:
-				mmid = '{}:{}'.format(kal.al_id,f.idx)
-				if mmid == e.mmid:
-					if f.addr == e.addr:
-						e.have_wif = True
-						if src == 'inputs':
-							new_keys.append(f)
-					else:
-						die(3,wmsg['mapping_error'].format(m1,mmid,f.addr,'tx file:',e.mmid,e.addr))
+		f = kal_keys.get((e.mmid.al_id,e.mmid.idx))
+		if f:
+			if f.addr == e.addr:
+				e.have_wif = True
+				if src == 'inputs':
+					new_keys.append(f)
+			else:
+				die(3,wmsg['mapping_error'].format(m1,e.mmid,f.addr,'tx file:',e.mmid,e.addr))
 	if new_keys:
 		vmsg('Added {} wif key{} from {}'.format(len(new_keys),suf(new_keys),desc))
 	return new_keys
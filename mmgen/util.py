@@ -192,6 +192,17 @@ def suf(arg,suf_type='s'):
 		die(2,'{}: invalid parameter for suf()'.format(arg))
 	return suf_types[suf_type] if n == 1 else suf_type
 
+def get_jobs(desc):
+	"return the number of worker processes requested with '--jobs', falling back to 1 if unsupported"
+	jobs = int(opt.jobs) if hasattr(opt,'jobs') and opt.jobs else 1
+	if jobs > 1:
+		import multiprocessing as mp
+		try: mp.get_context('fork')
+		except ValueError:
+			msg('Parallel {} not supported on this platform, using one process'.format(desc))
+			return 1
+	return jobs
+
 def get_extension(f):
 	a,b = os.path.splitext(f)
 	return ('',b[1:])[len(b) > 1]
@@ -588,7 +599,8 @@ def write_data_to_file( outfile,data,desc='data',
 						binary=False,
 						ignore_opt_outdir=False,
 						check_data=False,
-						cmp_data=None):
+						cmp_data=None,
+						atomic=False):
 
 	if quiet: ask_tty = ask_overwrite = False
 	if opt.quiet: ask_overwrite = False
@@ -623,7 +635,11 @@ def write_data_to_file( outfile,data,desc='data',
 			import msvcrt
 			msvcrt.setmode(sys.stdout.fileno(),os.O_BINARY)
 
-		sys.stdout.write(data.decode() if isinstance(data,bytes) else data)
+		if isinstance(data,(str,bytes)):
+			sys.stdout.write(data.decode() if isinstance(data,bytes) else data)
+		else:
+			for chunk in data:
+				sys.stdout.write(chunk)
 
 	def do_file(outfile,ask_write_prompt):
 		if opt.outdir and not ignore_opt_outdir and not os.path.isabs(outfile):
@@ -656,13 +672,22 @@ def write_data_to_file( outfile,data,desc='data',
 
 		# To maintain portability, always open files in binary mode
 		# If 'binary' option not set, encode/decode data before writing and after reading
-		f = open_file_or_exit(outfile,'wb')
+		# If 'atomic' is set, write to a temporary file and rename it, so that a partially
+		# written file is never seen under the output filename
+		f = open_file_or_exit((outfile,outfile+'.tmp')[atomic],'wb')
 
 		try:
-			f.write(data if binary else data.encode())
+			if isinstance(data,(str,bytes)):
+				f.write(data if binary else data.encode())
+			else: # an iterable of chunks, written as they're generated
+				for chunk in data:
+					f.write(chunk if binary else chunk.encode())
 		except:
 			die(2,"Failed to write {} to file '{}'".format(desc,outfile))
-		f.close
+		f.close()
+
+		if atomic:
+			os.replace(outfile+'.tmp',outfile)
 
 		if not (hush or quiet):
 			msg("{} written to file '{}'".format(capfirst(desc),outfile))
@@ -831,6 +856,10 @@ def prompt_and_get_char(prompt,chars,enter_ok=False,verbose=False):
 		else: msg_r('\r')
 
 def do_pager(text):
+	"""
+	'text' may also be an iterable of strings, which are generated only as they're
+	consumed by the pager
+	"""
 
 	pagers = ['less','more']
 	end_msg = '\n(end of text)\n\n'
@@ -847,10 +876,20 @@ def do_pager(text):
 			p = Popen([pager],stdin=PIPE,shell=False)
 		except: pass
 		else:
-			p.communicate((text+(end_msg,'')[pager=='less']).encode())
+			if isinstance(text,str):
+				p.communicate((text+(end_msg,'')[pager=='less']).encode())
+			else:
+				try:
+					for chunk in text:
+						p.stdin.write(chunk.encode())
+					p.stdin.write(('',end_msg)[pager!='less'].encode())
+					p.stdin.close()
+				except BrokenPipeError: # user quit the pager before the end of the text
+					pass
+				p.wait()
 			msg_r('\r')
 			break
-	else: Msg(text+end_msg)
+	else: Msg((text if isinstance(text,str) else ''.join(text))+end_msg)
 
 def do_license_msg(immed=False):
 
@@ -38,6 +38,8 @@ opts_data = {
 		'options': """
 -h, --help       Print this help message
 -a, --all        Test all supported coins for external generator 'ext'
+-b, --batch      In speed test mode, compare per-key and batched public key
+                 and address generation
 -k, --use-internal-keccak-module Force use of the internal keccak module
 --, --longhelp   Print help message for long options (common options)
 -q, --quiet      Produce quieter output
@@ -48,18 +50,30 @@ opts_data = {
     Tests:
        A/B:     {prog} a:b [rounds]  (compare output of two key generators)
        Speed:   {prog} a [rounds]    (test speed of one key generator)
+       Batch:   {prog} -b a [rounds] (compare per-key and batched speed of one key generator
+                                     and address generator)
        Compare: {prog} a <dump file> (compare output of a key generator against wallet dump)
           where a and b are one of:
              '1' - native Python ecdsa library (very slow)
-             '2' - bitcoincore.org's secp256k1 library (default from v0.8.6)
+             '2' - bitcoincore.org's secp256k1 library (default from v0.8.6).
+                   Tests fail if the library is unavailable
+             '3' - pure-Python secp256k1 code (used if the secp256k1 library
+                   is unavailable)
 
 EXAMPLES:
   {prog} 1:2 100
     (compare output of native Python ECDSA with secp256k1 library, 100 rounds)
+  {prog} 3:2 1000
+    (compare output of pure-Python secp256k1 code with secp256k1 library, 1000 rounds)
   {prog} 2:ext 100
     (compare output of secp256k1 library with external library (see below), 100 rounds)
   {prog} 2 1000
     (test speed of secp256k1 library address generation, 1000 rounds)
+  {prog} -b 2 10000
+    (compare per-key and batched pubkey generation with secp256k1 library, 10000 rounds)
+  {prog} --coin=xmr -b 1 1000
+    (compare per-key and batched Monero address generation, and variable-base
+    and fixed-base ed25519 scalar multiplication, 1000 rounds)
   {prog} 2 my.dump
     (compare addrs generated with secp256k1 library to {dn} wallet dump)
 
@@ -232,6 +246,75 @@ def speed_test():
 	qmsg_r('\rRound {}/{} '.format(i+1,rounds))
 	qmsg('\n{} addresses generated in {:.2f} seconds'.format(rounds,time.time()-start))
 
+def batch_speed_test():
+	m = "Comparing per-key and batched public key generation for generator '{}'"
+	qmsg(green(m.format(kg_a.desc)))
+	from struct import pack
+	seed = os.urandom(28)
+	secs = [PrivKey(seed+pack('I',i),compressed=addr_type.compressed,pubkey_type=addr_type.pubkey_type)
+				for i in range(rounds)]
+
+	start = time.time()
+	a_pubs = [kg_a.to_pubhex(sec) for sec in secs]
+	a_t = time.time() - start
+
+	start = time.time()
+	b_pubs = kg_a.to_pubhex_batch(secs)
+	b_t = time.time() - start
+
+	for sec,a_pub,b_pub in zip(secs,a_pubs,b_pubs):
+		if a_pub != b_pub or a_pub.compressed != b_pub.compressed:
+			match_error(sec,sec.wif,a_pub,b_pub,'per-key','batched')
+
+	fs = '{:10} {:>8} {} in {:.4f} seconds ({:.0f} {}/sec)'
+	qmsg('Public keys:')
+	qmsg(fs.format('per-key:',rounds,'keys',a_t,rounds/a_t,'keys'))
+	qmsg(fs.format('batched:',rounds,'keys',b_t,rounds/b_t,'keys'))
+
+	start = time.time()
+	a_addrs = [ag.to_addr(pub) for pub in a_pubs]
+	a_t = time.time() - start
+
+	start = time.time()
+	b_addrs = ag.to_addr_batch(b_pubs)
+	b_t = time.time() - start
+
+	for sec,a_addr,b_addr in zip(secs,a_addrs,b_addrs):
+		if a_addr != b_addr:
+			match_error(sec,sec.wif,a_addr,b_addr,'per-key','batched')
+
+	qmsg('Addresses:')
+	qmsg(fs.format('per-key:',rounds,'addrs',a_t,rounds/a_t,'addrs'))
+	qmsg(fs.format('batched:',rounds,'addrs',b_t,rounds/b_t,'addrs'))
+
+	if addr_type.pubkey_type == 'monero' and not opt.use_old_ed25519:
+		import mmgen.ed25519ll_djbec as ed
+		from mmgen.ed25519 import encodepoint,B
+		scalars = [int.from_bytes(bytes.fromhex(sec),'little') for sec in secs]
+
+		start = time.time()
+		ed.fb_table = None # rebuild the table, already built for the addresses above
+		ed.get_fb_table()
+		t_t = time.time() - start
+
+		start = time.time()
+		a_pts = [encodepoint(ed.scalarmult(B,e)) for e in scalars]
+		a_t = time.time() - start
+
+		start = time.time()
+		b_pts = ed.scalarmult_base_encoded_many(scalars)
+		b_t = time.time() - start
+
+		for sec,a_pt,b_pt in zip(secs,a_pts,b_pts):
+			if a_pt != b_pt:
+				match_error(sec,sec.wif,a_pt.hex(),b_pt.hex(),'variable-base','fixed-base')
+
+		qmsg('ed25519 scalar multiplication by the base point (table built in {:.4f} seconds):'.format(t_t))
+		qmsg(fs.format('variable:',rounds,'points',a_t,rounds/a_t,'points'))
+		qmsg(fs.format('table:',rounds,'points',b_t,rounds/b_t,'points'))
+
+	qmsg(green('OK'))
+
 def dump_test():
 	m = "Comparing output of address generator '{}' against wallet dump '{}'"
 	qmsg(green(m.format(kg_a.desc,cmd_args[1])))
@@ -294,6 +377,11 @@ else:
 from mmgen.addr import KeyGenerator,AddrGenerator
 from mmgen.obj import PrivKey
 
+# KeyGenerator() falls back to generator 3 if the extension module is missing, which would
+# leave generator 2 untested
+if 2 in (a,b) and not KeyGenerator.test_for_secp256k1():
+	die(2,'secp256k1 extension module unavailable: unable to test key generator 2')
+
 kg_a = KeyGenerator(addr_type,a)
 ag = AddrGenerator(addr_type)
 
@@ -315,7 +403,7 @@ if a and b:
 			b_desc = kg_b.desc
 		compare_test()
 elif a and not fh:
-	speed_test()
+	batch_speed_test() if opt.batch else speed_test()
 elif a and dump:
 	b_desc = 'dump'
 	dump_test()
@@ -79,16 +79,109 @@ class TestHashFunc(object):
 			self.compare_hashes(dlen,os.urandom(dlen))
 		msg('OK\n')
 
+class KeccakRef(object):
+	"""
+	The previous internal Keccak-256 implementation, with nested-list state, per-lane
+	rotations and per-lane byte conversions, as a reference when pysha3 is unavailable
+	and as a benchmark baseline
+	"""
+	from mmgen.keccak import RoundConstants as RC,RotationConstants as R
+
+	def __init__(self,data=b''):
+		self.s = [[0] * 5 for x in range(5)]
+		self.buf = list(data)
+
+	@staticmethod
+	def rol(v,n):
+		return ((v & ((1 << (64 - n)) - 1)) << n) | (v >> (64 - n))
+
+	def keccak_f(self):
+		from functools import reduce
+		from operator import xor
+		A,R,rol = self.s,self.R,self.rol
+		for rc in self.RC:
+			C = [reduce(xor,A[x]) for x in range(5)]
+			for x in range(5):
+				D = C[(x - 1) % 5] ^ rol(C[(x + 1) % 5],1)
+				for y in range(5):
+					A[x][y] ^= D
+			B = [[0] * 5 for x in range(5)]
+			for x in range(5):
+				for y in range(5):
+					B[y][(2 * x + 3 * y) % 5] = rol(A[x][y],R[y][x])
+			for x in range(5):
+				for y in range(5):
+					A[x][y] = B[x][y] ^ ((~ B[(x + 1) % 5][y]) & B[(x + 2) % 5][y])
+			A[0][0] ^= rc
+
+	def absorb(self,bb):
+		bb = bb + [0] * 64
+		for i in range(25):
+			r = 0
+			for b in reversed(bb[i*8:i*8+8]):
+				r = r << 8 | b
+			self.s[i % 5][i // 5] ^= r
+		self.keccak_f()
+
+	def digest(self):
+		buf = self.buf
+		while len(buf) >= 136:
+			self.absorb(buf[:136])
+			buf = buf[136:]
+		padlen = 136 - len(buf)
+		self.absorb(buf + ([0x81] if padlen == 1 else [0x01] + [0] * (padlen - 2) + [0x80]))
+		return bytes((self.s[i % 5][i // 5] >> b) & 0xff for i in range(4) for b in range(0,64,8))
+
+	def hexdigest(self):
+		return self.digest().hex()
+
 class TestKeccak(TestHashFunc):
 	desc = 'keccak_256'
 	def __init__(self):
 		from mmgen.keccak import keccak_256
-		import sha3
 		self.t_cls = keccak_256
-		self.hashlib = sha3
+		try:
+			import sha3
+			self.hashlib = sha3
+		except ImportError:
+			msg('pysha3 not installed, using previous internal implementation as reference\n')
+			self.hashlib = type('',(),{'keccak_256':KeccakRef})
 
 	def test_constants(self): pass
 
+	def test_speed(self):
+		"throughput on 64-byte messages (public keys), and on long messages"
+		import time
+		from mmgen.keccak import keccak_256,keccak_256_many
+		impls = [('previous',KeccakRef),('mmgen.keccak',keccak_256)]
+		try:
+			from sha3 import keccak_256 as pysha3
+			impls.append(('pysha3',pysha3))
+		except ImportError:
+			pass
+		msg('Testing batch hashing:        ')
+		msgs = [os.urandom(n % 300) for n in range(0,3000,7)]
+		assert keccak_256_many(msgs,batch_size=50) == [self.hashlib.keccak_256(m).digest() for m in msgs]
+		msg('OK\n')
+
+		short = [os.urandom(64) for i in range(500)]
+		long_msg = os.urandom(136 * 200)
+
+		def bench(func):
+			t = time.time()
+			func()
+			return time.time() - t
+
+		msg('Benchmarking ({} 64-byte messages, one {}-byte message):\n'.format(len(short),len(long_msg)))
+		fs = '  {:24} {:>12} {:>10}\n'
+		msg(fs.format('','messages/s','kB/s'))
+		res = [(desc,
+				len(short) / bench(lambda: [f(m).digest() for m in short]),
+				len(long_msg) / 1000 / bench(lambda: f(long_msg).digest())) for desc,f in impls]
+		res.insert(2,('mmgen.keccak (batch)',len(short) / bench(lambda: keccak_256_many(short)),None))
+		for desc,mps,kbps in res:
+			msg(fs.format(desc+':','{:.0f}'.format(mps),'{:.1f}'.format(kbps) if kbps else '-'))
+
 class TestSha2(TestHashFunc):
 
 	def __init__(self):
@@ -111,6 +204,31 @@ class TestSha256(TestSha2):
 		0x19a4c116, 0x1e376c08, 0x2748774c, 0x34b0bcb5, 0x391c0cb3, 0x4ed8aa4a, 0x5b9cca4f, 0x682e6ff3,
 		0x748f82ee, 0x78a5636f, 0x84c87814, 0x8cc70208, 0x90befffa, 0xa4506ceb, 0xbef9a3f7, 0xc67178f2 )
 
+	def test_speed(self):
+		"check SHA256Compress against the Sha256 class, and benchmark it"
+		import time
+		from mmgen.sha2 import Sha256,sha256_compress,sha256_compress_many
+		msg('Testing SHA256Compress:       ')
+		blocks = [os.urandom(64) for i in range(500)]
+		ref = [Sha256(b,preprocess=False).digest() for b in blocks]
+		assert [sha256_compress(b) for b in blocks] == ref
+		assert sha256_compress_many(blocks,batch_size=70) == ref
+		msg('OK\n')
+
+		def bench(func):
+			t = time.time()
+			func()
+			return time.time() - t
+
+		msg('Benchmarking SHA256Compress ({} blocks):\n'.format(len(blocks)))
+		fs = '  {:28} {:>10}\n'
+		msg(fs.format('','blocks/s'))
+		for desc,func in (
+				('Sha256(preprocess=False):', lambda: [Sha256(b,preprocess=False).digest() for b in blocks]),
+				('sha256_compress():',        lambda: [sha256_compress(b) for b in blocks]),
+				('sha256_compress_many():',   lambda: sha256_compress_many(blocks)) ):
+			msg(fs.format(desc,'{:.0f}'.format(len(blocks) / bench(func))))
+
 class TestSha512(TestSha2):
 	desc = 'sha512'
 	H_ref = (
@@ -139,3 +257,5 @@ msg(green('Testing internal implementation of {}\n'.format(t.desc)))
 t.test_constants()
 t.test_ref()
 t.test_random(random_rounds)
+if hasattr(t,'test_speed'):
+	t.test_speed()
@@ -435,9 +435,15 @@ t_gen="
 	$gentest_py -q 1:2 $rounds
 	$gentest_py -q --type=segwit 1:2 $rounds
 	$gentest_py -q --type=bech32 1:2 $rounds
+	$gentest_py -q 3 $REFDIR/btcwallet.dump
+	$gentest_py -q 3:2 $rounds_mid
+	$gentest_py -q --type=compressed 3:2 $rounds_mid
+	$gentest_py -q --type=segwit 3:2 $rounds_mid
+	$gentest_py -q --type=bech32 3:2 $rounds_mid
 	$gentest_py -q --testnet=1 2 $REFDIR/btcwallet-testnet.dump
 	$gentest_py -q --testnet=1 1:2 $rounds
 	$gentest_py -q --testnet=1 --type=segwit 1:2 $rounds
+	$gentest_py -q --testnet=1 --type=segwit 3:2 $rounds_mid
 	$gentest_py -q --coin=ltc 2 $REFDIR/litecoin/ltcwallet.dump
 	$gentest_py -q --coin=ltc --type=segwit 2 $REFDIR/litecoin/ltcwallet-segwit.dump
 	$gentest_py -q --coin=ltc --type=bech32 2 $REFDIR/litecoin/ltcwallet-bech32.dump
@@ -446,6 +452,7 @@ t_gen="
 	$gentest_py -q --coin=ltc --testnet=1 2 $REFDIR/litecoin/ltcwallet-testnet.dump
 	$gentest_py -q --coin=ltc --testnet=1 1:2 $rounds
 	$gentest_py -q --coin=ltc --testnet=1 --type=segwit 1:2 $rounds
+	$gentest_py -q --coin=ltc --type=segwit 3:2 $rounds_mid
 "
 f_gen='gentest tests completed'
 
@@ -72,6 +72,10 @@ class TestSuiteRef3Seed(TestSuiteBase,TestSuiteShared):
 			'btc': ('934F 1C33 6C06 B18C','A283 5BAB 7AF3 3EA4'),
 			'ltc': ('A6AD DF53 5968 7B6A','9572 43E0 A4DC 0B2E'),
 		},
+		'refkeyaddrgen_parallel_1': { # same as refkeyaddrgen_segwit_1
+			'btc': ('C13B F717 D4E8 CF59','BB71 175C 5416 19D8'),
+			'ltc': ('054B 9794 55B4 5D82','DE85 3CF3 9636 FE2E'),
+		},
 		'refpasswdgen_1':     'EB29 DC4F 924B 289F',
 		'ref_b32passwdgen_1': '37B6 C218 2ABC 7508',
 		'ref_hexpasswdgen_1': '523A F547 0E69 8323',
@@ -107,6 +111,10 @@ class TestSuiteRef3Seed(TestSuiteBase,TestSuiteShared):
 			'btc': ('4A6B 3762 DF30 9368','12DD 1888 36BA 85F7'),
 			'ltc': ('5C12 FDD4 17AB F179','E195 B28C 59C4 C5EC'),
 		},
+		'refkeyaddrgen_parallel_2': { # same as refkeyaddrgen_segwit_2
+			'btc': ('C98B DF08 A3D5 204B','7E7F DF50 FE04 6F68'),
+			'ltc': ('1829 7FE7 2567 CB91','BE92 D19C 7589 EF30'),
+		},
 		'refpasswdgen_2':     'ADEA 0083 094D 489A',
 		'ref_b32passwdgen_2': '2A28 C5C7 36EC 217A',
 		'ref_hexpasswdgen_2': 'B11C AC6A 1464 608D',
@@ -142,6 +150,10 @@ class TestSuiteRef3Seed(TestSuiteBase,TestSuiteShared):
 			'btc': ('D0DD BDE3 87BE 15AE','7552 D70C AAB8 DEAA'),
 			'ltc': ('74A0 7DD5 963B 6326','2CDA A007 4B9F E9A5'),
 		},
+		'refkeyaddrgen_parallel_3': { # same as refkeyaddrgen_segwit_3
+			'btc': ('A447 12C2 DD14 5A9B','C770 7391 C415 21F9'),
+			'ltc': ('E8A3 9F6E E164 A521','D3D5 BFDD F5D5 20BD'),
+		},
 		'refpasswdgen_3':     '2D6D 8FBA 422E 1315',
 		'ref_b32passwdgen_3': 'F6C1 CDFB 97D9 FCAE',
 		'ref_hexpasswdgen_3': 'BD4F A0AC 8628 4BE4',
@@ -171,6 +183,7 @@ class TestSuiteRef3Seed(TestSuiteBase,TestSuiteShared):
 		('refkeyaddrgen_compressed', (['mmdat',pwfile],'new refwallet key-addr chksum (compressed)')),
 		('refkeyaddrgen_segwit', (['mmdat',pwfile],'new refwallet key-addr chksum (segwit)')),
 		('refkeyaddrgen_bech32', (['mmdat',pwfile],'new refwallet key-addr chksum (bech32)')),
+		('refkeyaddrgen_parallel', (['mmdat',pwfile],'new refwallet key-addr chksum (segwit, multi-process)')),
 		('refpasswdgen',   (['mmdat',pwfile],'new refwallet passwd file chksum')),
 		('ref_b32passwdgen',(['mmdat',pwfile],'new refwallet passwd file chksum (base32)')),
 		('ref_hexpasswdgen',(['mmdat',pwfile],'new refwallet passwd file chksum (base32)')),
@@ -312,6 +325,9 @@ class TestSuiteRef3Seed(TestSuiteBase,TestSuiteShared):
 	def refkeyaddrgen_bech32(self,wf,pf):
 		return self.keyaddrgen(wf,pf=pf,check_ref=True,mmtype='bech32')
 
+	def refkeyaddrgen_parallel(self,wf,pf):
+		return self.keyaddrgen(wf,pf=pf,check_ref=True,mmtype='segwit',extra_args=['--jobs=3'])
+
 	def refpasswdgen(self,wf,pf):
 		return self.addrgen(wf,pf,check_ref=True,ftype='pass',id_str='alice@crypto.org')
 
@@ -215,10 +215,10 @@ class TestSuiteShared(object):
 			cmp_or_die(chk,chk_ref,desc='{}list data checksum'.format(ftype))
 		return t
 
-	def keyaddrgen(self,wf,pf=None,check_ref=False,mmtype=None):
+	def keyaddrgen(self,wf,pf=None,check_ref=False,mmtype=None,extra_args=[]):
 		if not mmtype:
 			mmtype = self.segwit_mmtype
-		args = ['-d',self.tmpdir,self.usr_rand_arg,wf,self.addr_idx_list]
+		args = ['-d',self.tmpdir,self.usr_rand_arg] + extra_args + [wf,self.addr_idx_list]
 		t = self.spawn('mmgen-keygen',
 				([],['--type='+str(mmtype)])[bool(mmtype)] + args,
 				extra_desc='({})'.format(mmtype) if mmtype in ('segwit','bech32') else '')
@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+test/unit_tests_d/ut_addr_checkpoints: address chain checkpoint unit test for the MMGen suite
+"""
+
+from mmgen.common import *
+
+class unit_test(object):
+
+	def run_test(self,name):
+		import time
+		from tempfile import TemporaryDirectory
+		from mmgen.seed import Seed
+		from mmgen.obj import AddrIdxList,MMGenAddrType
+		from mmgen.addr import AddrList,KeyAddrList,AddrChainCheckpoints
+		from mmgen.crypto import aesctr_crypt
+
+		seed = Seed(bytes.fromhex('deadbeef' * 8))
+		last_idx = (1000000,100000)[bool(opt.fast)]
+		idx_str = '3,{},{},{}'.format(last_idx//2+1,last_idx-1,last_idx)
+		interval = 1000
+
+		def gen(cls):
+			t_start = time.time()
+			al = cls(seed=seed,addr_idxs=AddrIdxList(fmt_str=idx_str),mmtype=MMGenAddrType('C'))
+			return al,time.time() - t_start
+
+		def check_equal(a,b):
+			assert a.chksum == b.chksum, (a.chksum,b.chksum)
+			assert a.coinaddrs() == b.coinaddrs(), 'address mismatch'
+
+		with TemporaryDirectory() as tmpdir:
+
+			saved_opts = (g.data_dir,g.addr_checkpoint_interval,opt.quiet)
+			g.data_dir,opt.quiet = tmpdir,True
+
+			try:
+				msg_r('Testing address chain checkpoints...')
+
+				g.addr_checkpoint_interval = 0
+				ref,t_ref = gen(AddrList)
+				ref_small = AddrList(seed=seed,addr_idxs=AddrIdxList(fmt_str='1-5,40'),mmtype=MMGenAddrType('C'))
+
+				g.addr_checkpoint_interval = interval
+				al,t_build = gen(AddrList)
+				check_equal(ref,al)
+
+				fns = os.listdir(os.path.join(tmpdir,AddrChainCheckpoints.subdir))
+				assert len(fns) == 1, fns
+				assert seed.sid in fns[0], fns[0]
+				assert seed.data.hex() not in open(os.path.join(tmpdir,AddrChainCheckpoints.subdir,fns[0])).read()
+
+				al,t_resume = gen(AddrList)
+				check_equal(ref,al)
+
+				kal,t_kal = gen(KeyAddrList) # same chain, so checkpoints are shared
+				assert kal.coinaddrs() == ref.coinaddrs(), 'address mismatch'
+
+				# a checkpoint file with a different interval is ignored and rebuilt
+				g.addr_checkpoint_interval = interval * 2
+				al,t = gen(AddrList)
+				check_equal(ref,al)
+
+				# with an interval of 1, consecutive rounds use distinct keystream blocks
+				g.addr_checkpoint_interval = 1
+				ck = AddrChainCheckpoints(bytes(32),ref.al_id,1,data_dir=tmpdir)
+				ks = b''.join(aesctr_crypt(bytes(64 + ck.chk_len),ck.key,ck.iv(n)) for n in range(1,101))
+				blocks = [ks[i:i+16] for i in range(0,len(ks),8)] # 16-byte windows at 8-byte offsets
+				assert len(set(blocks)) == len(blocks), 'keystream reused'
+				al = AddrList(seed=seed,addr_idxs=AddrIdxList(fmt_str='1-5,40'),mmtype=MMGenAddrType('C'))
+				assert al.coinaddrs()[:5] == ref_small.coinaddrs()[:5], 'address mismatch'
+				al = AddrList(seed=seed,addr_idxs=AddrIdxList(fmt_str='1-5,40'),mmtype=MMGenAddrType('C'))
+				assert al.coinaddrs() == ref_small.coinaddrs(), 'address mismatch'
+
+				msg('OK')
+
+				vmsg('  Sparse index generation ({}), {} rounds per checkpoint:'.format(idx_str,interval))
+				for desc,t in (
+						('no checkpoints',    t_ref),
+						('build checkpoints', t_build),
+						('from checkpoints',  t_resume),
+						('from checkpoints (key/address pairs)', t_kal) ):
+					vmsg('    {:38} {:.4f}s'.format(desc+':',t))
+
+			finally:
+				g.data_dir,g.addr_checkpoint_interval,opt.quiet = saved_opts
+
+		return True
@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+test/unit_tests_d/ut_addrlist_ops: AddrList lookup/merge micro-benchmark for the MMGen suite
+"""
+
+from mmgen.common import *
+
+class unit_test(object):
+
+	def run_test(self,name):
+		import time
+		from hashlib import sha256
+		from mmgen.obj import PrivKey,CoinAddr,AddrListID,SeedID,MMGenAddrType
+		from mmgen.addr import AddrList,KeyAddrList,AddrListEntry,AddrListList
+
+		def make_entries(start,n):
+			out = []
+			for i in range(start,start+n):
+				h = sha256(i.to_bytes(8,'big')).digest()
+				out.append(AddrListEntry(
+					idx  = i,
+					addr = CoinAddr(g.proto.pubhash2addr(h[:20].hex(),False)),
+					sec  = PrivKey(h,compressed=True,pubkey_type='std') ))
+			return out
+
+		al_id = AddrListID(SeedID(sid='DEADBEEF'),MMGenAddrType('L'))
+
+		def make_kal(entries):
+			return KeyAddrList(al_id=al_id,adata=AddrListList(entries))
+
+		def run(n_small,n_big,check):
+			# 'small' entries are a subset of 'big' ones, plus n_small//10 that aren't
+			big = make_entries(1,n_big)
+			extra = make_entries(n_big+1,n_small//10)
+			small = big[::n_big//n_small][:n_small-len(extra)] + extra
+			coinaddrs = [e.addr for e in small]
+			ret = []
+
+			kal = make_kal(big)
+			t = time.time()
+			d = kal.make_reverse_dict(coinaddrs)
+			ret.append(('make_reverse_dict',time.time()-t))
+			if check: # compare with a straightforward implementation
+				ca = set(coinaddrs)
+				chk = {e.addr:(e.idx,e.label) for e in big if e.addr in ca}
+				assert len(d) == len(chk) == len(small) - len(extra),(len(d),len(chk))
+				assert {k:(v[0].idx,v[1]) for k,v in d.items()} == chk, 'make_reverse_dict mismatch'
+
+			kal,cmplist = make_kal(list(big)),make_kal(small)
+			t = time.time()
+			kal.remove_dup_keys(cmplist)
+			ret.append(('remove_dup_keys',time.time()-t))
+			if check:
+				wifs = {e.sec.wif for e in small}
+				chk = [e.addr for e in big if e.sec.wif not in wifs]
+				assert kal.coinaddrs() == chk, 'remove_dup_keys mismatch'
+				assert kal.entry(small[0].idx) is None
+
+			al,key_list = KeyAddrList(addrlist=coinaddrs),make_kal(big)
+			t = time.time()
+			al.add_wifs(key_list)
+			ret.append(('add_wifs',time.time()-t))
+			if check:
+				missing = al.list_missing('sec')
+				assert sorted(missing) == sorted(e.addr for e in extra),'add_wifs: wrong missing keys'
+				secs = {e.addr:e.sec for e in big}
+				for e in al.data:
+					if e.sec: assert e.sec == secs[e.addr], 'add_wifs mismatch'
+
+			return ret
+
+		saved_opts = (opt.quiet,opt.verbose)
+		opt.quiet,opt.verbose = True,False
+		try:
+			msg_r('Testing AddrList operations...')
+			run(200,2000,check=True)
+			n_small,n_big = ((10000,100000),(1000,10000))[bool(opt.fast)]
+			res = run(n_small,n_big,check=True)
+			msg('OK')
+		finally:
+			opt.quiet,opt.verbose = saved_opts
+
+		vmsg('  {} addresses against {} keys:'.format(n_small,n_big))
+		for desc,t in res:
+			vmsg('    {:20} {:.4f}s'.format(desc+':',t))
+
+		return True
@@ -0,0 +1,220 @@
+#!/usr/bin/env python3
+"""
+test/unit_tests_d/ut_coinselect: automatic input selection unit test and benchmark for the MMGen suite
+"""
+
+import time,random
+from decimal import Decimal
+from itertools import combinations
+from mmgen.common import *
+
+class unit_test(object):
+
+	def run_test(self,name):
+		from mmgen.coinselect import CoinSelector
+
+		rnd = random.Random(1)
+
+		def make_utxos(n):
+			"log-uniform amounts between 1000 and 10^9 satoshis, 2/3 of them segwit"
+			amts = [int(10 ** rnd.uniform(3,9)) for i in range(n)]
+			weights = [rnd.choice((64*4+108,41*4+108,148*4+1)) for i in range(n)]
+			return amts,weights
+
+		def make_cs(amts,weights,target,fee_rate=5):
+			return CoinSelector(amts,weights,target,fee_rate,
+				base_weight = (10 + 2*32) * 4 + 2,
+				chg_weight  = 32 * 4,
+				min_change  = 546,
+				max_fee     = 10**6 )
+
+		def check_result(cs,ret,strategy):
+			sel,changeless = ret
+			assert len(sel) == len(set(sel)), 'duplicate inputs'
+			total = sum(cs.eff[i] for i in sel)
+			if changeless:
+				assert cs.target_nochg <= total <= cs.target_nochg + cs.cost_of_change, (strategy,total)
+			else:
+				assert total >= cs.target_chg, (strategy,total)
+			if strategy == 'consolidate':
+				weight = cs.base_weight + sum(cs.weights[i] for i in sel)
+				assert weight <= cs.max_weight
+				assert cs.max_fee is None or cs.fee(weight) <= cs.max_fee + cs.fee_rate
+
+		def brute_force_bnb(cs):
+			"the smallest excess, and fewest inputs for that excess, of any changeless selection"
+			lo,hi = cs.target_nochg,cs.target_nochg + cs.cost_of_change
+			best = None
+			idxs = [i for i in range(len(cs.eff)) if cs.eff[i] > 0]
+			for k in range(1,len(idxs)+1):
+				for c in combinations(idxs,k):
+					v = sum(cs.eff[i] for i in c)
+					if lo <= v <= hi and (best is None or v - lo < best[0]):
+						best = (v - lo,k)
+			return best
+
+		def check():
+			msg_r('Testing coin selection...')
+			for strategy in CoinSelector.strategies:
+				for i in range(100):
+					amts,weights = make_utxos(rnd.randint(1,40))
+					target = rnd.randint(0,sum(amts))
+					cs = make_cs(amts,weights,target)
+					ret = cs.select(strategy)
+					if ret:
+						check_result(cs,ret,strategy)
+					else:
+						assert sum(v for v in cs.eff if v > 0) < cs.target_chg, 'selection failed'
+
+			# selections exceeding the standard transaction weight fail
+			cs = make_cs([10**6] * 2000,[41*4+108] * 2000,10**6 * 1500)
+			assert cs.select('largest') is None
+
+			# branch-and-bound finds the best changeless selection
+			found = 0
+			for i in range(300):
+				amts,weights = make_utxos(rnd.randint(2,12))
+				sel = rnd.sample(range(len(amts)),rnd.randint(1,len(amts)))
+				cs = make_cs(amts,weights,0)
+				cs.target = sum(cs.eff[i] for i in sel) - cs.target_nochg + rnd.randint(-1000,0)
+				chk = brute_force_bnb(cs)
+				ret = cs.bnb()
+				if chk:
+					found += 1
+					excess = sum(cs.eff[i] for i in ret) - cs.target_nochg
+					assert (excess,len(ret)) == chk, (excess,len(ret),chk)
+				else:
+					assert ret is None
+			assert found > 200, found
+
+			# largest-first uses the fewest inputs possible
+			for i in range(100):
+				amts,weights = make_utxos(100)
+				cs = make_cs(amts,weights,rnd.randint(0,sum(amts)//2))
+				sel,changeless = cs.select('largest')
+				total,n = 0,0
+				for v in reversed(cs.values):
+					if total >= cs.target_chg: break
+					total += v
+					n += 1
+				assert len(sel) == n, (len(sel),n)
+			msg('OK')
+
+		def check_tx():
+			msg_r('Testing automatic input selection in MMGenTX...')
+			from mmgen.tw import TwUnspentOutputs
+			from mmgen.tx import MMGenTX
+			from mmgen.obj import CoinAddr
+
+			class rpch:
+				caps = ('label_api',)
+				def estimatesmartfee(confs): return {'feerate':Decimal('0.0002')}
+				def getnetworkinfo(): return {'relayfee':Decimal('0.00001')}
+
+			def addr(n): return CoinAddr(g.proto.pubhash2addr('{:040x}'.format(n),False))
+			us_rpc = [{ 'txid': '{:064x}'.format(n),
+						'vout': 0,
+						'address': addr(n),
+						'label': 'DEADBEEF:L:{}'.format(n) if n % 5 else 'btc:'+addr(n),
+						'scriptPubKey': '76a914{:040x}88ac'.format(n),
+						'amount': Decimal(n) / 1000,
+						'confirmations': 10 } for n in range(1,201)]
+			g.rpch = rpch
+
+			import io
+			stderr_save,g.stderr = g.stderr,io.StringIO() # capture the transaction messages
+			try:
+				for strategy,send_amt in (('bnb','1.23456'),('largest','7.5'),('consolidate','0.5')):
+					twuo = TwUnspentOutputs.__new__(TwUnspentOutputs)
+					twuo.unspent = twuo.make_table(us_rpc)
+					tx = MMGenTX()
+					tx.twuo = twuo
+					tx.add_output(addr(1000),g.proto.coin_amt(send_amt))
+					tx.add_output(addr(1001),g.proto.coin_amt('0'),is_chg=True)
+					tx.send_amt = tx.sum_outputs()
+					opt.auto_inputs = strategy
+					change_amt = tx.get_inputs_auto()
+					assert tx.sum_inputs() == tx.send_amt + tx.fee + change_amt
+					assert not any(i.mmid is None for i in tx.inputs), 'non-MMGen input selected'
+					fee_rate = tx.fee / tx.estimate_size() / g.proto.coin_amt.min_coin_unit
+					assert 19 < fee_rate < 25, fee_rate # 0.0002 BTC/kB ≈ 19.5 satoshis/byte
+					assert change_amt == 0 or change_amt >= g.proto.coin_amt('0.00000546'), change_amt
+					if strategy == 'consolidate': # limited by the maximum fee
+						assert len(tx.inputs) > 50, len(tx.inputs)
+						assert tx.fee <= g.proto.max_tx_fee
+
+				# with only a change output, a UTXO matching the target without change is not
+				# selected, as the transaction would then have no outputs
+				def send_all_tx(amts):
+					twuo = TwUnspentOutputs.__new__(TwUnspentOutputs)
+					twuo.unspent = twuo.make_table([dict(us_rpc[n],amount=a) for n,a in enumerate(amts)])
+					tx = MMGenTX()
+					tx.twuo = twuo
+					tx.add_output(addr(1001),g.proto.coin_amt('0'),is_chg=True)
+					tx.send_amt = tx.sum_outputs()
+					return tx
+				cs = send_all_tx([Decimal('0.01')]).get_coin_selector()[0]
+				match = Decimal(cs.target_nochg + cs.fee(cs.weights[0])) / 10**8
+				cs = send_all_tx([match,Decimal('0.01')]).get_coin_selector()[0]
+				assert cs.require_change
+				cs.require_change = False
+				assert cs.select('bnb') == ([0],True), cs.select('bnb')
+				for strategy in CoinSelector.strategies:
+					tx = send_all_tx([match,Decimal('0.01')])
+					opt.auto_inputs = strategy
+					change_amt = tx.get_inputs_auto()
+					assert change_amt > 0, (strategy,change_amt)
+					tx.update_change_output(change_amt)
+					assert len(tx.outputs) == 1, strategy
+					assert tx.sum_inputs() == tx.fee + change_amt
+				tx = send_all_tx([match])
+				opt.auto_inputs = 'bnb'
+				try: tx.get_inputs_auto()
+				except SystemExit: pass
+				else: raise AssertionError('changeless selection made with only a change output')
+
+			finally:
+				out,g.stderr = g.stderr.getvalue(),stderr_save
+			assert out.count('Selected ') == 6, out
+			msg('OK')
+
+		def bench():
+			sizes = (10000,100000) if opt.fast else (10000,100000,1000000)
+			res = []
+			for n in sizes:
+				amts,weights = make_utxos(n)
+				for strategy in CoinSelector.strategies:
+					# a target that can be matched exactly, and one requiring many inputs
+					for target in (amts[n//2] + amts[n//3],sum(sorted(amts)[-300:])//2):
+						t = time.time()
+						cs = make_cs(amts,weights,target)
+						t_index = time.time() - t
+						t = time.time()
+						ret = cs.select(strategy)
+						t_sel = time.time() - t
+						check_result(cs,ret,strategy)
+						res.append((n,strategy,target,t_index,t_sel,len(ret[0]),ret[1]))
+			return res
+
+		tx_opts = {'yes':True,'quiet':True,'auto_inputs':None,'tx_fee':None,'tx_confs':3,'tx_fee_adj':1,'vsize_adj':None}
+		saved = (g.rpch,g.chain,{k:getattr(opt,k,None) for k in tx_opts})
+		g.chain = 'mainnet'
+		for k,v in tx_opts.items():
+			setattr(opt,k,v)
+		try:
+			check()
+			check_tx()
+			msg_r('Running coin selection benchmark...')
+			res = bench()
+			msg('OK')
+		finally:
+			g.rpch,g.chain = saved[:2]
+			for k,v in saved[2].items():
+				setattr(opt,k,v)
+
+		vmsg('  {:>7} {:11} {:>16} {:>8} {:>8} {:>7}'.format('UTXOs','strategy','target','index','select','inputs'))
+		for n,strategy,target,t_index,t_sel,n_in,changeless in res:
+			vmsg('  {:>7} {:11} {:>16} {:7.3f}s {:7.3f}s {:>7}{}'.format(
+				n,strategy,target,t_index,t_sel,n_in,('',' (no change)')[changeless]))
+
+		return True
@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+test/unit_tests_d/ut_devwatch: device insertion watcher unit test for the MMGen suite
+"""
+
+import os,time,shutil,threading
+from mmgen.common import *
+
+class unit_test(object):
+
+	def run_test(self,name):
+		from mmgen.devwatch import DeviceWatcher
+
+		# a fake '/dev/disk/by-label', in a tmpfs if available
+		base = os.path.join(('test/trash','/dev/shm')[os.path.isdir('/dev/shm')],'mmgen-ut-devwatch-{}'.format(os.getpid()))
+		label_dir = os.path.join(base,'disk','by-label')
+		file_dir = os.path.join(base,'tx')
+		label = 'MMGEN_TX'
+
+		def after(secs,func):
+			"run 'func' after 'secs' seconds in a thread, returning a list holding its start time"
+			start = []
+			def run():
+				time.sleep(secs)
+				start.append(time.time())
+				func()
+			threading.Thread(target=run).start()
+			return start
+
+		def wait_for(w,want,check=lambda: True,timeout=2):
+			"""
+			wait for the watcher to return 'want' and for 'check' to be true, returning the time.
+			As in mmgen-autosign, the device status is checked after each change
+			"""
+			t_end,seen = time.time() + timeout,False
+			while time.time() < t_end:
+				seen = seen or w.wait(0.5) == want
+				if seen and check():
+					return time.time()
+			raise AssertionError('timeout waiting for {}'.format(want))
+
+		def insert():
+			os.makedirs(label_dir,exist_ok=True)
+			os.symlink('../../sdz1',os.path.join(label_dir,label))
+
+		def remove():
+			os.unlink(os.path.join(label_dir,label))
+
+		def write(fn,tmp=False):
+			path = os.path.join(file_dir,fn)
+			open(path+('','.tmp')[tmp],'w').write('data\n')
+			if tmp: os.replace(path+'.tmp',path)
+
+		def check_inotify():
+			msg_r('Testing inotify device watcher...')
+			os.makedirs(os.path.join(base,'disk'))
+			open(os.path.join(base,'sdz1'),'w').close() # the fake device node
+			w = DeviceWatcher(label_dir,label,file_dir=file_dir,file_ext='.rawtx')
+			if not w.using_inotify:
+				msg('inotify not available, skipping')
+				return []
+			res = []
+			assert not w.present()
+
+			# the label directory doesn't exist until the first labeled device is inserted
+			t = after(0.2,insert)
+			t_found = wait_for(w,(True,False),w.present)
+			res.append(('insertion',t_found - t[0]))
+
+			t = after(0.2,remove)
+			t_found = wait_for(w,(True,False),lambda: not w.present())
+			res.append(('removal',t_found - t[0]))
+
+			# the watched file directory is created later
+			os.mkdir(file_dir)
+			after(0,insert)
+			wait_for(w,(True,False),w.present)
+			t = after(0.2,lambda: write('a.rawtx'))
+			t_found = wait_for(w,(False,True))
+			res.append(('new file',t_found - t[0]))
+
+			# other files, including those written atomically, are ignored
+			after(0.1,lambda: write('a.sigtx',tmp=True))
+			assert w.wait(0.5) == (False,False)
+			after(0.1,lambda: write('b.rawtx',tmp=True))
+			wait_for(w,(False,True))
+
+			assert w.wait(0.1) == (False,False) # timeout
+			w.close()
+			msg('OK')
+			return res
+
+		def check_poll():
+			msg_r('Testing polling device watcher...')
+			shutil.rmtree(base)
+			os.makedirs(base)
+			open(os.path.join(base,'sdz1'),'w').close()
+			w = DeviceWatcher(label_dir,label,poll=True)
+			assert not w.using_inotify
+			t = time.time()
+			assert w.wait(0.2) == (False,False)
+			assert time.time() - t >= 0.2
+			insert()
+			assert w.present()
+			msg('OK')
+
+		try:
+			res = check_inotify()
+			check_poll()
+		finally:
+			shutil.rmtree(base,ignore_errors=True)
+
+		for desc,secs in res:
+			vmsg('  {:10} detected in {:.4f}s'.format(desc+':',secs))
+
+		return True
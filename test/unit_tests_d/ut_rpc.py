@@ -0,0 +1,205 @@
+#!/usr/bin/env python3
+"""
+test/unit_tests_d/ut_rpc: RPC client unit test and benchmark for the MMGen suite
+"""
+
+import json,threading,socket,time
+from http.server import HTTPServer,BaseHTTPRequestHandler
+from socketserver import ThreadingMixIn
+from mmgen.common import *
+
+class StubRPCHandler(BaseHTTPRequestHandler):
+	"""
+	minimal JSON-RPC server: 'echo' returns its params, 'fail' returns an error, 'count' a counter,
+	'sleep' returns its params after sleeping for the number of seconds given by the first one
+	"""
+
+	protocol_version = 'HTTP/1.1'
+
+	def log_message(self,*args): pass
+
+	def setup(self):
+		# headers and body are written separately, so disable Nagle's algorithm
+		self.request.setsockopt(socket.IPPROTO_TCP,socket.TCP_NODELAY,1)
+		BaseHTTPRequestHandler.setup(self)
+		self.server.connections += 1
+
+	def do_POST(self):
+		data = json.loads(self.rfile.read(int(self.headers['Content-Length'])).decode())
+
+		if self.server.stopped: # drop the connection without replying
+			self.close_connection = True
+			return
+
+		def result(req):
+			if req['method'] == 'fail':
+				return {'result':None,'error':{'code':-1,'message':'stub failure'},'id':req['id']}
+			if req['method'] == 'sleep':
+				time.sleep(req['params'][0])
+			ret = self.server.requests if req['method'] == 'count' else req['params']
+			return {'result':ret,'error':None,'id':req['id']}
+
+		self.server.requests += 1
+		ret = [result(r) for r in data] if type(data) == list else result(data)
+		status = 500 if type(data) == dict and ret['error'] else 200
+		body = json.dumps(ret).encode()
+		self.send_response(status)
+		self.send_header('Content-Type','application/json')
+		self.send_header('Content-Length',str(len(body)))
+		self.end_headers()
+		self.wfile.write(body)
+
+		# emulate a daemon dropping kept-alive connections without notice
+		if self.server.close_every and not self.server.requests % self.server.close_every:
+			self.close_connection = True
+
+class StubRPCServer(ThreadingMixIn,HTTPServer):
+	daemon_threads = True
+	request_queue_size = 64 # the default of 5 drops connections when many are opened at once
+
+	def __init__(self,close_every=0):
+		HTTPServer.__init__(self,('127.0.0.1',0),StubRPCHandler)
+		self.close_every = close_every
+		self.stopped = False
+		self.connections = 0
+		self.requests = 0
+		threading.Thread(target=self.serve_forever,daemon=True).start()
+
+	def handle_error(self,request,client_address):
+		if not isinstance(sys.exc_info()[1],ConnectionError): # clients may close connections early
+			HTTPServer.handle_error(self,request,client_address)
+
+	def stop(self):
+		self.stopped = True
+		self.shutdown()
+		self.server_close()
+
+	@property
+	def port(self):
+		return self.server_address[1]
+
+class unit_test(object):
+
+	def run_test(self,name):
+		import time
+		from mmgen.rpc import CoinDaemonRPCConnection,rpc_error,rpc_errmsg
+
+		class StubRPCConnection(CoinDaemonRPCConnection):
+			rpcmethods = ('echo','fail','count','sleep')
+
+		def conn(server,keepalive=True):
+			c = StubRPCConnection('127.0.0.1',server.port,'user','passwd')
+			c.keepalive = keepalive
+			return c
+
+		def basic_ops():
+			msg_r('Testing RPC calls...')
+			s = StubRPCServer()
+			c = conn(s)
+			assert c.echo(1,'a',[2]) == [1,'a',[2]]
+			assert c.echo([[1],[2],[3]],batch=True) == [[1],[2],[3]]
+			assert c.echo(g.proto.coin_amt('1.23')) == [c.json_encoder.ca_type(g.proto.coin_amt('1.23'))]
+			ret = c.fail(on_fail='silent')
+			assert rpc_error(ret), ret
+			assert 'stub failure' in rpc_errmsg(ret), rpc_errmsg(ret)
+			try: c.fail()
+			except RPCFailure: pass
+			else: raise AssertionError('no exception raised')
+			for i in range(10): c.count()
+			assert s.connections == 1, s.connections
+			c.batch_chunk_size,n = 7,s.requests
+			assert c.batch_request('echo',[[i] for i in range(30)]) == [[i] for i in range(30)]
+			assert s.requests - n == 5, s.requests - n
+			assert rpc_error(c.batch_request('fail',[[1]],on_fail='silent'))
+			s.stop()
+			msg('OK')
+
+		def reconnect():
+			msg_r('Testing reconnection after daemon-side close...')
+			s = StubRPCServer(close_every=3)
+			c = conn(s)
+			ret = [c.count() for i in range(10)]
+			assert ret == list(range(1,11)), ret
+			assert s.connections == 4, s.connections
+			s.stop()
+			try: c.count()
+			except RPCFailure: pass
+			else: raise AssertionError('no exception raised after server shutdown')
+			msg('OK')
+
+		def timeout():
+			msg_r('Testing request timeout on a kept-alive connection...')
+			from mmgen.rpc import AsyncRPCConnection
+			s = StubRPCServer()
+			c = conn(s)
+			sf = {'on_fail':'silent','timeout':0.5}
+			# one connection, so the 'sleep' request reuses the one opened by 'echo'
+			ac = AsyncRPCConnection(c,max_concurrency=1)
+			for desc,call,nreqs in (
+					('sync', lambda: c.sleep(1.5,**sf),1),
+					('async',lambda: ac.run([('echo',1),('sleep',1.5,sf)])[1],2) ):
+				c.echo(1) # open the connection to be reused
+				n,t_start = s.requests,time.time()
+				assert rpc_error(call()), desc
+				t = time.time() - t_start
+				# the request was not sent again after the timeout
+				assert s.requests - n == nreqs, (desc,s.requests - n)
+				assert t < 1, (desc,t)
+			s.stop()
+			msg('OK')
+
+		def speed():
+			count = (2000,500)[bool(opt.fast)]
+			msg_r('Testing RPC call speed ({} calls)...'.format(count))
+			res = []
+			for keepalive in (False,True):
+				s = StubRPCServer()
+				c = conn(s,keepalive)
+				t_start = time.time()
+				for i in range(count):
+					c.echo(i)
+				res.append((keepalive,s.connections,count / (time.time() - t_start)))
+				s.stop()
+			msg('OK')
+			for keepalive,conns,cps in res:
+				vmsg('  {:26} {:5} connection{:2} {:8.1f} calls/s'.format(
+					('new connection per call','keep-alive connection')[keepalive]+':',conns,suf(conns),cps))
+
+		def async_ops():
+			msg_r('Testing async RPC calls...')
+			from mmgen.rpc import AsyncRPCConnection
+			s = StubRPCServer(close_every=3)
+			c = conn(s)
+			sf = {'on_fail':'silent'}
+			ret = c.gather([('echo',1,'a'),('echo',[[1],[2]],{'batch':True}),('fail',sf),('echo',2,sf)])
+			assert ret[0] == [1,'a'] and ret[1] == [[1],[2]] and ret[3] == [2], ret
+			assert rpc_error(ret[2]) and 'stub failure' in rpc_errmsg(ret[2]), ret[2]
+			try: c.gather([('echo',1),('fail',)])
+			except RPCFailure: pass
+			else: raise AssertionError('no exception raised')
+
+			ac = AsyncRPCConnection(c,max_concurrency=1) # one connection, dropped every 3 requests
+			ret = ac.run([('count',)] * 10)
+			assert ret == list(range(s.requests-9,s.requests+1)), ret
+			s.stop()
+
+			s = StubRPCServer()
+			c = conn(s)
+			count,delay,limit = 16,0.1,8
+			t_start = time.time()
+			ret = c.gather([('sleep',delay,n) for n in range(count)],max_concurrency=limit)
+			t = time.time() - t_start
+			assert [r[1] for r in ret] == list(range(count)), ret
+			assert s.connections <= limit + 1, s.connections # includes the sync connection
+			assert t < count * delay / 2, t
+			s.stop()
+			msg('OK')
+			vmsg('  {} requests taking {}s each, {} concurrent: {:.3f}s'.format(count,delay,limit,t))
+
+		basic_ops()
+		reconnect()
+		timeout()
+		async_ops()
+		speed()
+
+		return True
@@ -0,0 +1,239 @@
+#!/usr/bin/env python3
+"""
+test/unit_tests_d/ut_signer: native transaction signer unit test for the MMGen suite
+"""
+
+import time,random,struct
+from mmgen.common import *
+
+# BIP143 examples: https://github.com/bitcoin/bips/blob/master/bip-0143.mediawiki
+bip143_vectors = {
+	'p2sh-p2wpkh': {
+		'unsigned': '0100000001db6b1b20aa0fd7b23880be2ecbd4a98130974cf4748fb66092ac4d3ceb1a5477' +
+					'0100000000feffffff02b8b4eb0b000000001976a914a457b684d7f0d539a46a45bbc043f35b' +
+					'59d0d96388ac0008af2f000000001976a914fd270b1ee6abcaea97fea7ad0402e8bd8ad6d77c' +
+					'88ac92040000',
+		'privkey':  'eb696a065ef48a2192da5b28b694f87544b30fae8327c4510137a922f32c6dcf',
+		'pubkey':   '03ad1d8e89212f0b92c74d23bb710c00662ad1470198ac48c43f7d6f93a2a26873',
+		'amt':      1000000000,
+		'sighash':  '64f3b0f4dd2bb3aa1ce8566d220cc74dda9df97d8490cc81d89d735c92e59fb6',
+		'signed':   '01000000000101db6b1b20aa0fd7b23880be2ecbd4a98130974cf4748fb66092ac4d3ceb1a5477' +
+					'010000001716001479091972186c449eb1ded22b78e40d009bdf0089feffffff02b8b4eb0b00' +
+					'0000001976a914a457b684d7f0d539a46a45bbc043f35b59d0d96388ac0008af2f0000000019' +
+					'76a914fd270b1ee6abcaea97fea7ad0402e8bd8ad6d77c88ac02473044022047ac8e878352d3' +
+					'ebbde1c94ce3a10d057c24175747116f8288e5d794d12d482f0220217f36a485cae903c71333' +
+					'1d877c1f64677e3622ad4010726870540656fe9dcb012103ad1d8e89212f0b92c74d23bb710c' +
+					'00662ad1470198ac48c43f7d6f93a2a2687392040000' },
+	'p2wpkh': { # the second input; the first, a P2PK input, is signed with the legacy sighash
+		'unsigned': '0100000002fff7f7881a8099afa6940d42d1e7f6362bec38171ea3edf433541db4e4ad969f' +
+					'0000000000eeffffffef51e1b804cc89d182d279655c3aa89e815b1b309fe287d9b2b55d57b9' +
+					'0ec68a0100000000ffffffff02202cb206000000001976a9148280b37df378db99f66f85c95a' +
+					'783a76ac7a6d5988ac9093510d000000001976a9143bde42dbee7e4dbe6a21b2d50ce2f0167f' +
+					'aa815988ac11000000',
+		'privkey':  '619c335025c7f4012e556c2a58b2506e30b8511b53ade95ea316fd8c3286feb9',
+		'pubkey':   '025476c2e83188368da1ff3e292e7acafcdb3566bb0ad253f62fc70f07aeee6357',
+		'amt':      600000000,
+		'sighash':  'c37af31116d1b27caf68aae9e3ac82f1477929014d5b917657d0eb49478cb670',
+		'sig':      '304402203609e17b84f6a7d30c80bfa610b5b4542f32a8a0d5447a12fb1366d7f01cc44a0220' +
+					'573a954c4518331561406f90300e8f3358f51928d43c212a8caed02de67eebee',
+		'p2pk_pubkey': '03c9f4836b9a4f77fc0d81f7bcb01b7f1b35916864b9476c241ce9fc198bd25432',
+		'p2pk_sig': '30450221008b9d1dc26ba6a9cb62127b02742fa9d754cd3bebf337f7a55d114c8e5cdd30be02' +
+					'2040529b194ba3f9281a99f2b1c0a19c0489bc22ede944ccf4ecbab4cc618ef3ed' },
+}
+
+class unit_test(object):
+
+	def run_test(self,name):
+		import ecdsa
+		from hashlib import sha256
+		from mmgen.protocol import init_coin,hash160
+		from mmgen.signer import TxSigner,sign_txs,ecdsa_sign_many,ecdsa_sign_python,secp256k1_n,dsha256
+		from mmgen.tx import MMGenTX,MMGenTxInput,MMGenTxOutput,DeserializedTX,addr2scriptPubKey
+		from mmgen.addr import KeyGenerator,AddrGenerator,AddrListEntry
+		from mmgen.obj import PrivKey
+
+		rnd = random.Random(1)
+
+		def verify(sig,msghash,pubkey):
+			vk = ecdsa.VerifyingKey.from_string(pubkey,curve=ecdsa.SECP256k1)
+			return vk.verify_digest(sig,msghash,sigdecode=ecdsa.util.sigdecode_der)
+
+		def check_sig_encoding(sig):
+			"DER-encoded, with low R and low S"
+			r,s = ecdsa.util.sigdecode_der(sig,secp256k1_n)
+			assert sig[0] == 0x30 and len(sig) <= 71, sig.hex()
+			assert r >> 255 == 0 and s <= secp256k1_n // 2, sig.hex()
+
+		def bip143():
+			d = bip143_vectors['p2sh-p2wpkh']
+			k,pub = bytes.fromhex(d['privkey']),bytes.fromhex(d['pubkey'])
+			spk = 'a914' + hash160('0014' + hash160(d['pubkey'])) + '87'
+			s = TxSigner(d['unsigned'],[(spk,d['amt'],k,pub)])
+			assert s.get_sighashes()[0][0].hex() == d['sighash']
+			assert sign_txs([s])[0] == d['signed']
+
+			d = bip143_vectors['p2wpkh']
+			k,pub = bytes.fromhex(d['privkey']),bytes.fromhex(d['pubkey'])
+			spk = '0014' + hash160(d['pubkey'])
+			s = TxSigner(d['unsigned'],[(spk,0,k,pub),(spk,d['amt'],k,pub)])
+			h = s.get_sighashes()[1][0]
+			assert h.hex() == d['sighash']
+			assert ecdsa_sign_many([h],[k])[0].hex() == d['sig']
+			assert ecdsa_sign_python(h,k).hex() == d['sig']
+
+			p2pk_script = bytes.fromhex('21' + d['p2pk_pubkey'] + 'ac')
+			h = s.legacy_sighash(0,p2pk_script)
+			assert verify(bytes.fromhex(d['p2pk_sig']),h,bytes.fromhex(d['p2pk_pubkey']))
+
+		# naive signature hashes, computed from a deserialized copy of the signed transaction
+		def naive_sighashes(dt,spks,amts,forkid):
+			ser = lambda *a: b''.join(a)
+			u32 = lambda n: struct.pack('<I',n)
+			vstr = lambda b: bytes([len(b)]) + b
+			outpoint = lambda i: bytes.fromhex(i['txid'])[::-1] + u32(i['vout'])
+			seq = lambda i: bytes.fromhex(i['nSeq'])[::-1]
+			outputs = ser(*[
+				struct.pack('<Q',o['amount'].toSatoshi()) + vstr(bytes.fromhex(o['scriptPubKey']))
+					for o in dt['txouts'] ])
+			ht = 0x41 if forkid else 0x01
+			ret = []
+			for n,(i,spk,amt) in enumerate(zip(dt['txins'],spks,amts)):
+				spk = bytes.fromhex(spk)
+				if len(spk) == 25 and not forkid: # legacy
+					tx = ser(u32(dt['version']),bytes([len(dt['txins'])]),*[
+						outpoint(j) + (vstr(spk) if j is i else b'\x00') + seq(j) for j in dt['txins'] ],
+						bytes([len(dt['txouts'])]),outputs,u32(dt['lock_time']),u32(ht))
+				else:
+					keyhash = spk[3:23] if len(spk) == 25 else bytes.fromhex(hash160(i['witness'][1]))
+					tx = ser(u32(dt['version']),
+						dsha256(ser(*[outpoint(j) for j in dt['txins']])),
+						dsha256(ser(*[seq(j) for j in dt['txins']])),
+						outpoint(i),
+						vstr(b'\x76\xa9\x14' + keyhash + b'\x88\xac'),
+						struct.pack('<Q',amt),
+						seq(i),
+						dsha256(outputs),
+						u32(dt['lock_time']),
+						u32(ht))
+				ret.append(dsha256(tx))
+			return ret
+
+		def make_tx(mmtypes):
+			"an unsigned MMGenTX spending inputs of 'mmtypes', plus the keys for signing it"
+			tx,keys = MMGenTX(),[]
+			for n,t in enumerate(mmtypes,1):
+				sec = PrivKey(bytes(rnd.getrandbits(8) for i in range(32)),compressed=t!='L',pubkey_type='std')
+				pub = KeyGenerator('std').to_pubhex(sec)
+				addr = AddrGenerator({'L':'p2pkh','C':'p2pkh','S':'segwit','B':'bech32'}[t]).to_addr(pub)
+				keys.append(AddrListEntry(addr=addr,sec=sec))
+				tx.inputs.append(MMGenTxInput(
+					txid         = '{:064x}'.format(rnd.getrandbits(256)),
+					vout         = rnd.randint(0,5),
+					amt          = g.proto.coin_amt(rnd.randint(10**5,10**9),from_unit='satoshi'),
+					addr         = addr,
+					mmid         = 'DEADBEEF:{}:{}'.format(t,n),
+					scriptPubKey = addr2scriptPubKey(addr),
+					sequence     = rnd.choice((None,g.max_int-2)) ))
+			for i in range(rnd.randint(1,4)):
+				tx.outputs.append(MMGenTxOutput(
+					addr = keys[0].addr,
+					amt  = g.proto.coin_amt(rnd.randint(10**4,10**5),from_unit='satoshi') ))
+			tx.locktime = rnd.choice((None,600000))
+			# what createrawtransaction returns
+			u32 = lambda n: struct.pack('<I',n)
+			raw = b''.join(
+				[u32(2),bytes([len(tx.inputs)])] +
+				[bytes.fromhex(i.txid)[::-1] + u32(i.vout) + b'\x00' + u32(i.sequence or g.max_int) for i in tx.inputs] +
+				[bytes([len(tx.outputs)])] +
+				[struct.pack('<Q',o.amt.toSatoshi()) + bytes([len(addr2scriptPubKey(o.addr))//2])
+					+ bytes.fromhex(addr2scriptPubKey(o.addr)) for o in tx.outputs] +
+				[u32(tx.locktime or 0)] )
+			tx.hex = raw.hex()
+			tx.txid = make_chksum_6(raw).upper()
+			return tx,keys
+
+		def sign_and_check(mmtypes,forkid=False):
+			tx,keys = make_tx(mmtypes)
+			assert tx.sign('',keys), 'signing failed'
+			assert tx.marked_signed()
+			dt = DeserializedTX(tx.hex)
+			assert dt['txid'] == tx.coin_txid
+			hashes = naive_sighashes(dt,[i.scriptPubKey for i in tx.inputs],
+										[i.amt.toSatoshi() for i in tx.inputs],forkid)
+			for i,h,d in zip(dt['txins'],hashes,tx.inputs):
+				if 'witness' in i:
+					sig,pub = i['witness']
+				else:
+					ss = bytes.fromhex(i['scriptSig'])
+					sig,pub = ss[1:ss[0]+1].hex(),ss[ss[0]+2:].hex()
+				assert sig[-2:] == ('41' if forkid else '01'), sig[-2:]
+				sig = bytes.fromhex(sig[:-2])
+				check_sig_encoding(sig)
+				assert verify(sig,h,bytes.fromhex(pub)), 'signature verification failed'
+			return tx
+
+		def txs():
+			for i in range(6):
+				sign_and_check([rnd.choice('LCSB') for j in range(rnd.randint(1,8))])
+			sign_and_check('LLLL')
+
+			init_coin('bch')
+			for i in range(4):
+				sign_and_check([rnd.choice('LC') for j in range(rnd.randint(1,8))],forkid=True)
+			init_coin('btc')
+
+			# a missing key fails
+			tx,keys = make_tx('CSB')
+			assert not tx.sign('',keys[:2])
+
+			# batch signing of several transactions gives the same result as signing one by one
+			signers,chk = [],[]
+			for i in range(5):
+				tx,keys = make_tx([rnd.choice('LCSB') for j in range(rnd.randint(1,5))])
+				kg = KeyGenerator('std')
+				sks = [k.sec for k in keys]
+				signers.append(TxSigner(tx.hex,[(d.scriptPubKey,d.amt.toSatoshi(),bytes.fromhex(k),
+							bytes.fromhex(kg.to_pubhex(k))) for d,k in zip(tx.inputs,sks)]))
+				chk.append(sign_txs([signers[-1]])[0])
+			assert sign_txs(signers) == chk
+
+		def grind():
+			"signatures with a high R value are regenerated, so all signatures have low R"
+			k = bytes.fromhex('ab'*32)
+			n_high = 0
+			for i in range(40):
+				h = sha256(str(i).encode()).digest()
+				sk = ecdsa.SigningKey.from_string(k,curve=ecdsa.SECP256k1,hashfunc=sha256)
+				r,s = sk.sign_digest_deterministic(h,hashfunc=sha256,sigencode=lambda r,s,o:(r,s))
+				n_high += r >> 255
+				sig = ecdsa_sign_python(h,k)
+				check_sig_encoding(sig)
+				assert verify(sig,h,sk.get_verifying_key().to_string('compressed'))
+			assert n_high > 5, n_high
+
+		def bench():
+			n = (20,200)[not opt.fast]
+			tx,keys = make_tx([rnd.choice('CSB') for j in range(n)])
+			t = time.time()
+			assert tx.sign('',keys)
+			return n,time.time() - t
+
+		saved = (g.chain,g.stderr,getattr(opt,'sign_with_daemon',None))
+		g.chain,opt.sign_with_daemon = 'mainnet',None
+		import io
+		g.stderr = io.StringIO() # capture the signing messages
+		try:
+			bip143()
+			txs()
+			grind()
+			n,t = bench()
+		finally:
+			init_coin('btc')
+			out = g.stderr.getvalue()
+			g.chain,g.stderr,opt.sign_with_daemon = saved
+
+		assert 'No key found for input address' in out, out
+		msg('Testing native transaction signer...OK')
+		vmsg('  Signed {} inputs in {:.3f}s'.format(n,t))
+
+		return True
@@ -8,7 +8,7 @@ from mmgen.common import *
 class unit_test(object):
 
 	def run_test(self,name):
-		from mmgen.seed import Seed
+		from mmgen.seed import Seed,SubSeedIndexCache
 		from mmgen.obj import SubSeedIdxRange
 
 		def basic_ops():
@@ -176,8 +176,55 @@ class unit_test(object):
 			vmsg_r('\n{} collisions, last_sid {}'.format(collisions,last_sid))
 			msg('OK')
 
+		def parallel_and_cache():
+			msg_r('Testing parallel generation and subseed index cache...')
+			from tempfile import TemporaryDirectory
+
+			seed_bin = bytes.fromhex('12abcdef' * 8)
+			ss_count = 3000
+
+			def gen(jobs,cache,sid=None,last_idx=ss_count):
+				opt.jobs,g.subseed_index_cache = jobs,cache
+				seed = Seed(seed_bin)
+				if sid:
+					subseed = seed.subseed_by_seed_id(sid,last_idx=last_idx)
+					return seed.subseeds,subseed
+				seed.subseeds._generate(last_idx)
+				return seed.subseeds
+
+			def data(ss):
+				return [(ss.data[k].keys,list(ss.data[k].values())) for k in ('long','short')]
+
+			saved_opts = (g.data_dir,g.subseed_index_cache,getattr(opt,'jobs',None))
+			with TemporaryDirectory() as tmpdir:
+				g.data_dir = tmpdir
+				try:
+					ref = gen(1,False)
+					assert data(gen(3,False)) == data(ref), 'parallel generation mismatch'
+
+					gen(3,True) # build the cache
+					assert os.listdir(os.path.join(tmpdir,SubSeedIndexCache.subdir))
+					assert data(gen(1,True)) == data(ref), 'cached data mismatch'
+
+					# lookups from cache must stop at the matching index and respect 'last_idx'
+					sid = ref.data['short'].key(1999)
+					ss,subseed = gen(1,True,sid)
+					assert subseed.ss_idx == '2000S' and len(ss) == 2000, (subseed.ss_idx,len(ss))
+					ss,subseed = gen(1,True,sid,last_idx=100)
+					assert subseed == None and len(ss) == 100, len(ss)
+
+					# extend the cached table
+					ss,subseed = gen(1,True,'EEEEEEEE',last_idx=ss_count+100)
+					assert len(ss) == ss_count+100, len(ss)
+					assert data(gen(1,True,last_idx=ss_count+100)) == data(gen(1,False,last_idx=ss_count+100))
+				finally:
+					g.data_dir,g.subseed_index_cache,opt.jobs = saved_opts
+
+			msg('OK')
+
 		basic_ops()
 		defaults_and_limits()
 		collisions()
+		parallel_and_cache()
 
 		return True
@@ -0,0 +1,218 @@
+#!/usr/bin/env python3
+"""
+test/unit_tests_d/ut_tw_snapshot: tracking wallet unspent outputs snapshot unit test for the MMGen suite
+"""
+
+import random
+from decimal import Decimal
+from hashlib import sha256
+from mmgen.common import *
+
+class FakeDaemon(object):
+	"""
+	minimal model of a coin daemon with a watch-only wallet, implementing the RPC calls
+	used by TwUnspentSnapshot.  Transactions are dicts with 'vin' (list of prevouts, or
+	None for coinbase txs) and 'vout' (list of (addr,amt) pairs)
+	"""
+	caps = ('label_api',)
+	host,port = 'fake',0
+	maturity = 100
+
+	def __init__(self):
+		self.n = 0
+		self.txs = {}
+		self.blocks = {}  # all blocks ever mined: hash -> (height,txids)
+		self.chain = []   # hashes of blocks in the active chain
+		self.mempool = []
+		self.wallet = {}  # addr -> label
+
+	def new_hash(self):
+		self.n += 1
+		return sha256(str(self.n).encode()).hexdigest()
+
+	def add_tx(self,vin,vout):
+		txid = self.new_hash()
+		self.txs[txid] = {'vin':vin,'vout':vout}
+		if vin: self.mempool.append(txid)
+		return txid
+
+	def mine(self,coinbase_addr=None):
+		txids = [self.add_tx(None,[(coinbase_addr or 'miner',Decimal('50'))])] + self.mempool
+		h = self.new_hash()
+		self.blocks[h] = (len(self.chain),txids)
+		self.chain.append(h)
+		self.mempool = []
+
+	def drop(self,txids):
+		"remove 'txids' and their descendants from the mempool"
+		txids = set(txids)
+		while True:
+			dep = {t for t in self.mempool if any(v[0] in txids for v in self.txs[t]['vin'])}
+			if dep <= txids: break
+			txids |= dep
+		self.mempool = [t for t in self.mempool if t not in txids]
+
+	def reorg(self,n):
+		"disconnect the last 'n' blocks, dropping their transactions, and mine 'n' empty ones"
+		gone = [t for h in self.chain[-n:] for t in self.blocks[h][1]]
+		del self.chain[-n:]
+		self.drop(gone)
+		for i in range(n): self.mine()
+
+	# helpers
+	def tip(self): return len(self.chain) - 1
+
+	def tx_heights(self):
+		ret = {t:None for t in self.mempool}
+		for height,h in enumerate(self.chain):
+			for t in self.blocks[h][1]: ret[t] = height
+		return ret
+
+	def is_wallet_tx(self,txid):
+		tx = self.txs[txid]
+		return (any(a in self.wallet for a,v in tx['vout'])
+			or any(self.txs[t]['vout'][n][0] in self.wallet for t,n in tx['vin'] or []))
+
+	def unspent(self,minconf=0):
+		heights = self.tx_heights()
+		spent = {prevout for t in heights for prevout in self.txs[t]['vin'] or []}
+		ret = []
+		for txid,height in heights.items():
+			confs = 0 if height == None else self.tip() - height + 1
+			if confs < minconf: continue
+			if self.txs[txid]['vin'] == None and confs <= self.maturity: continue
+			for n,(addr,amt) in enumerate(self.txs[txid]['vout']):
+				if addr in self.wallet and (txid,n) not in spent:
+					ret.append((txid,n,addr,confs,amt))
+		return ret
+
+	def spk(self,addr): return '76a914' + sha256(addr.encode()).hexdigest()[:40] + '88ac'
+
+	# RPC methods
+	def getbestblockhash(self): return self.chain[-1]
+
+	def getblockhash(self,height): return self.chain[height]
+
+	def getblockheader(self,h,on_fail='raise'):
+		if h not in self.blocks:
+			return ('rpcfail',(None,1,'Block not found'))
+		height = self.blocks[h][0]
+		active = height < len(self.chain) and self.chain[height] == h
+		return {'height':height,'confirmations':self.tip()-height+1 if active else -1}
+
+	def listunspent(self,minconf=1):
+		return [{ 'txid': txid, 'vout': n, 'address': addr, 'label': self.wallet[addr], 'amount': amt,
+					'confirmations': confs, 'scriptPubKey': self.spk(addr), 'spendable': False }
+				for txid,n,addr,confs,amt in self.unspent(minconf)]
+
+	def listsinceblock(self,h,target_confs,watchonly):
+		start = self.blocks[h][0] + 1
+		out = []
+		for txid,height in self.tx_heights().items():
+			if height != None and height < start: continue
+			if not self.is_wallet_tx(txid): continue
+			confs = 0 if height == None else self.tip() - height + 1
+			cb = self.txs[txid]['vin'] == None
+			for n,(addr,amt) in enumerate(self.txs[txid]['vout']):
+				cat = (
+					('send','receive')[addr in self.wallet] if not cb else
+					('immature','generate')[confs > self.maturity] if addr in self.wallet else None )
+				if not cat: continue
+				e = { 'txid': txid, 'vout': n, 'address': addr, 'category': cat, 'amount': amt,
+						'confirmations': confs, 'involvesWatchonly': True }
+				if addr in self.wallet: e['label'] = self.wallet[addr]
+				out.append(e)
+		return {'transactions':out,'lastblock':self.chain[-1]}
+
+	def gettransaction(self,txid,watchonly): return {'hex':txid}
+
+	def decoderawtransaction(self,txid):
+		tx = self.txs[txid]
+		return {
+			'vin': [{'txid':t,'vout':n} for t,n in tx['vin']] if tx['vin'] else [{'coinbase':'00'}],
+			'vout': [{'n':n,'value':amt,'scriptPubKey':{'hex':self.spk(addr)}} for n,(addr,amt) in enumerate(tx['vout'])] }
+
+	def batch_request(self,cmd,arg_lists):
+		return [getattr(self,cmd)(*args) for args in arg_lists]
+
+class unit_test(object):
+
+	def run_test(self,name):
+		import tempfile,shutil
+		from mmgen.tw import TwUnspentSnapshot,tw_listunspent
+
+		reloads = []
+		class Snapshot(TwUnspentSnapshot):
+			def reload(self):
+				reloads.append(1)
+				return TwUnspentSnapshot.reload(self)
+
+		rnd = random.Random(1)
+		d = FakeDaemon()
+		addrs = ['addr{}'.format(i) for i in range(20)]
+		for a in addrs:
+			d.wallet[a] = 'DEADBEEF:L:{} label'.format(a[4:])
+
+		def check(expect_reload):
+			n = len(reloads)
+			chk = sorted((txid,vout,addr,d.wallet[addr],amt,confs) for txid,vout,addr,confs,amt in d.unspent(0))
+			ret = sorted((o['txid'],o['vout'],o['address'],o['label'],o['amount'],o['confirmations'])
+							for o in Snapshot().get_unspent())
+			assert ret == chk, 'snapshot mismatch:\n{}\n{}'.format(ret,chk)
+			if not expect_reload:
+				assert len(reloads) == n, 'unexpected reload'
+
+		def pay(n_in,n_out,unconfirmed_ok=True):
+			us = [u for u in d.unspent(0 if unconfirmed_ok else 1)]
+			if len(us) < n_in: return
+			ins = rnd.sample(us,n_in)
+			amt = sum(u[4] for u in ins)
+			outs = [(rnd.choice(addrs+['ext1','ext2']),amt/n_out) for i in range(n_out)]
+			d.add_tx([(u[0],u[1]) for u in ins],outs)
+
+		saved = (g.rpch,g.data_dir,g.tw_utxo_cache,opt.verbose)
+		g.rpch,g.data_dir,opt.verbose = d,tempfile.mkdtemp(),False
+		try:
+			msg_r('Testing tracking wallet unspent outputs snapshot...')
+			for i in range(110):
+				if i % 10 == 0:
+					d.add_tx([('ext',0)],[(rnd.choice(addrs),Decimal('1.5'))]) # funding tx
+				d.mine(rnd.choice(addrs) if i % 7 == 0 else None)
+
+			check(expect_reload=True)
+			assert len(reloads) == 1
+			check(expect_reload=False)
+
+			actions = ('mine','mine_cb','pay','pay','receive','reorg','drop','relabel')
+			for i in range(120 if opt.fast else 400):
+				a = rnd.choice(actions)
+				if a == 'mine':
+					d.mine()
+				elif a == 'mine_cb':
+					d.mine(rnd.choice(addrs))
+				elif a == 'pay':
+					pay(rnd.randint(1,3),rnd.randint(1,3))
+				elif a == 'receive':
+					d.add_tx([('ext',i+1)],[(rnd.choice(addrs),Decimal('0.1'))])
+				elif a == 'reorg':
+					d.reorg(rnd.randint(1,3))
+				elif a == 'drop' and d.mempool:
+					d.drop([rnd.choice(d.mempool)])
+				elif a == 'relabel':
+					d.wallet[rnd.choice(addrs)] = 'DEADBEEF:L:{} new label {}'.format(i,i)
+					Snapshot().invalidate()
+				check(expect_reload=a in ('reorg','drop','relabel'))
+
+			n_reloads = len(reloads)
+			g.tw_utxo_cache = True
+			for minconf in (0,1,6):
+				assert sorted(o['txid']+str(o['vout']) for o in tw_listunspent(minconf)) == \
+					sorted(o['txid']+str(o['vout']) for o in d.listunspent(minconf))
+			msg('OK')
+			opt.verbose = saved[3]
+			vmsg('  {} unspent outputs in wallet, {} full reloads'.format(len(d.unspent()),n_reloads))
+		finally:
+			shutil.rmtree(g.data_dir)
+			g.rpch,g.data_dir,g.tw_utxo_cache,opt.verbose = saved
+
+		return True
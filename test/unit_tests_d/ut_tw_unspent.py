@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+"""
+test/unit_tests_d/ut_tw_unspent: TwUnspentOutputs table unit test and benchmark for the MMGen suite
+"""
+
+import time,random
+from decimal import Decimal
+from hashlib import sha256
+from mmgen.common import *
+
+class unit_test(object):
+
+	def run_test(self,name):
+		import tracemalloc
+		from mmgen.obj import CoinAddr,TwComment
+		from mmgen.tw import TwUnspentOutputs,get_tw_label
+
+		def make_us_rpc(n):
+			"listunspent data for 'n' outputs paying n//5 addresses, one in ten of them non-MMGen"
+			rnd = random.Random(1)
+			addrs = []
+			for i in range(n//5):
+				h = sha256(i.to_bytes(8,'big')).digest()
+				addr = g.proto.pubhash2addr(h[:20].hex(),False)
+				lbl = 'btc:'+addr if i % 10 == 9 else 'DEADBEEF:L:{} comment {}'.format(i+1,i % 7)
+				addrs.append((addr,h[:20].hex(),lbl))
+			out = []
+			for i in range(n):
+				addr,pubhash,lbl = rnd.choice(addrs)
+				out.append({
+					'txid': sha256(i.to_bytes(8,'big')+b'tx').hexdigest(),
+					'vout': rnd.randint(0,3),
+					'address': addr,
+					'label': lbl,
+					'scriptPubKey': '76a914'+pubhash+'88ac',
+					'amount': Decimal(rnd.randint(1,10**8)) / 10**8,
+					'confirmations': rnd.randint(0,100000),
+					'spendable': False })
+			return out
+
+		# the previous implementation: one validated MMGenTwUnspentOutput per output
+		def old_make_list(us_rpc):
+			confs_per_day = 60*60*24 // g.proto.secs_per_block
+			tr_rpc = []
+			for o in us_rpc:
+				o = o.copy()
+				l = get_tw_label(o['label'])
+				if l:
+					o.update({
+						'twmmid': l.mmid,
+						'label':  l.comment,
+						'days':   int(o['confirmations'] // confs_per_day),
+						'amt':    g.proto.coin_amt(o['amount']),
+						'addr':   CoinAddr(o['address']),
+						'confs':  o['confirmations'] })
+					tr_rpc.append(o)
+			ret = TwUnspentOutputs.MMGenTwOutputList(
+				TwUnspentOutputs.MMGenTwUnspentOutput(
+					**{k:v for k,v in o.items() if k in dir(TwUnspentOutputs.MMGenTwUnspentOutput)})
+				for o in tr_rpc)
+			for u in ret:
+				if u.label == None: u.label = ''
+			return ret
+
+		old_sort_funcs = {
+			'addr':   lambda i: i.addr,
+			'age':    lambda i: 0 - i.confs,
+			'amt':    lambda i: i.amt,
+			'txid':   lambda i: '{} {:04}'.format(i.txid,i.vout),
+			'twmmid': lambda i: i.twmmid.sort_key }
+
+		def old_skips(unsp,key):
+			for i in unsp: i.skip = ''
+			for a,b in [(unsp[i],unsp[i+1]) for i in range(len(unsp)-1)]:
+				if getattr(a,key) == getattr(b,key):
+					b.skip = (key,'addr')[key=='twmmid']
+
+		def make_twuo(us_rpc):
+			twuo = TwUnspentOutputs.__new__(TwUnspentOutputs)
+			twuo.reverse,twuo.group,twuo.show_mmid = False,False,True
+			twuo.age_fmt,twuo.sort_key,twuo.page_start = 'days','age',0
+			twuo.disp_prec = twuo.get_display_precision()
+			twuo.unspent = twuo.make_table(us_rpc)
+			return twuo
+
+		attrs = ('txid','vout','amt','label','twmmid','addr','confs','scriptPubKey','days')
+		ops = ('age','amt','txid','reverse','addr','twmmid','reverse','amt','age')
+
+		def check(us_rpc):
+			old,twuo = old_make_list(us_rpc),make_twuo(us_rpc)
+			new = twuo.unspent
+			assert len(old) == len(new), (len(old),len(new))
+			for a,b in zip(old,new):
+				for k in attrs:
+					va,vb = getattr(a,k),getattr(b,k)
+					assert va == vb and type(va) == type(vb), (k,va,vb)
+			assert old[3].__dict__ == new[3].item().__dict__
+			reverse = False
+			for op in ops:
+				if op == 'reverse':
+					old.reverse()
+					new.reverse()
+					reverse = not reverse
+				else:
+					old.sort(key=old_sort_funcs[op],reverse=reverse)
+					twuo.reverse = reverse
+					twuo.do_sort(op)
+				assert [(i.txid,i.vout) for i in old] == [(i.txid,i.vout) for i in new], op
+				if op in ('addr','twmmid'):
+					old_skips(old,op)
+					new.set_skips(op)
+					assert [i.skip for i in old] == [i.skip for i in new], op
+			assert twuo.total == sum(i.amt for i in old)
+			g.terminal_width = 160
+			assert len(twuo.format_for_printing().split('\n')) == len(old) + 6
+
+			# windowed display: rows at display position p are on line p+2
+			for group in (False,True):
+				twuo.group = group
+				full = twuo.format_for_display().split('\n')
+				assert len(full) == len(old) + 3
+				page = twuo.format_for_display(100,20).split('\n')
+				assert page[:2] == full[:2] and page[2:-1] == full[102:122]
+
+			# reassigning a label updates the cached row and column width
+			e,w = new[100],new.width('label')
+			lbl = e.label
+			e.label = TwComment('x'*(w+1))
+			assert new.width('label') == w+1
+			assert 'x'*(w+1) in twuo.format_for_display(100,1).split('\n')[2]
+			e.label = lbl
+			assert new.width('label') == w
+			assert twuo.format_for_display().split('\n') == full
+
+		def bench(us_rpc):
+			res = []
+			t = time.time(); old = old_make_list(us_rpc); t_old = time.time() - t
+			t = time.time(); twuo = make_twuo(us_rpc); t_new = time.time() - t
+			res.append(('build',t_old,t_new))
+			for key in ('age','amt','addr','txid','twmmid'):
+				t = time.time(); old.sort(key=old_sort_funcs[key]); t_old = time.time() - t
+				t = time.time(); twuo.do_sort(key); t_new = time.time() - t
+				res.append(('sort by '+key,t_old,t_new))
+			t = time.time()
+			for key in ('age','amt','addr','txid','twmmid'):
+				twuo.do_sort(key)
+			res.append(('re-sort (all keys)',None,time.time()-t))
+			g.terminal_width = 160
+			t = time.time(); twuo.format_for_display(); t_old = time.time() - t
+			t = time.time(); twuo.format_for_display(5000,50); t_new = time.time() - t
+			res.append(('full/page display',t_old,t_new))
+			twuo.do_sort('amt')
+			t = time.time(); twuo.format_for_display(); t_old = time.time() - t
+			t = time.time(); twuo.format_for_display(5000,50); t_new = time.time() - t
+			res.append(('full/page redisplay',t_old,t_new))
+			del old,twuo
+
+			mem = [] # tracing is slow, so measure a subset
+			for f in (old_make_list,make_twuo):
+				tracemalloc.start()
+				obj = f(us_rpc[:len(us_rpc)//5])
+				mem.append(tracemalloc.get_traced_memory()[0])
+				tracemalloc.stop()
+				del obj
+			return res,mem
+
+		saved = (g.rpch,g.terminal_width,g.chain)
+		class rpch: caps = ('label_api',)
+		g.rpch,g.chain = rpch,'mainnet'
+		try:
+			msg_r('Testing tracking wallet unspent outputs table...')
+			check(make_us_rpc(2000))
+			n = (50000,5000)[bool(opt.fast)]
+			res,mem = bench(make_us_rpc(n))
+			assert mem[1] < mem[0], mem
+			msg('OK')
+		finally:
+			g.rpch,g.terminal_width,g.chain = saved
+
+		vmsg('  {} unspent outputs:              old       new'.format(n))
+		for desc,t_old,t_new in res:
+			vmsg('    {:22} {:>9} {:8.4f}s'.format(desc+':','-' if t_old == None else '{:.4f}s'.format(t_old),t_new))
+		vmsg('    {:22} {:8.0f}B {:8.0f}B'.format('memory per output:',mem[0]/(n//5),mem[1]/(n//5)))
+
+		return True
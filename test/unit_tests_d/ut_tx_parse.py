@@ -0,0 +1,248 @@
+#!/usr/bin/env python3
+"""
+test/unit_tests_d/ut_tx_parse: offline TX deserialization unit test and benchmark for the MMGen suite
+"""
+
+import time,random
+from hashlib import sha256
+from mmgen.common import *
+
+class unit_test(object):
+
+	def run_test(self,name):
+		from mmgen.protocol import init_coin
+		from mmgen.tx import DeserializedTX,MMGenTX,MMGenTxInput,MMGenTxOutput,scriptPubKey2addr,verify_txs
+		from mmgen.obj import CoinAddr
+
+		# the previous implementation
+		def old_deserialize(txhex):
+
+			def bytes2int(bytes_le):
+				if bytes_le[-1] & 0x80: # sign bit is set
+					die(3,"{}: Negative values not permitted in transaction!".format(bytes_le[::-1].hex()))
+				return int(bytes_le[::-1].hex(),16)
+
+			def bytes2coin_amt(bytes_le):
+				return g.proto.coin_amt(bytes2int(bytes_le) * g.proto.coin_amt.min_coin_unit)
+
+			def bshift(n,skip=False,sub_null=False):
+				ret = tx[s.idx:s.idx+n]
+				s.idx += n
+				if sub_null:
+					s.raw_tx += b'\x00'
+				elif not skip:
+					s.raw_tx += ret
+				return ret
+
+			def readVInt(skip=False):
+				v = tx[s.idx]
+				s.idx += 1
+				if not skip: s.raw_tx.append(v)
+				vbytes_len = 1 if v < 0xfd else 2 if v == 0xfd else 4 if v == 0xfe else 8
+				if vbytes_len == 1:
+					return v
+				else:
+					vbytes = tx[s.idx:s.idx+vbytes_len]
+					s.idx += vbytes_len
+					if not skip: s.raw_tx += vbytes
+					return int(vbytes[::-1].hex(),16)
+
+			def make_txid(tx_bytes):
+				return sha256(sha256(tx_bytes).digest()).digest()[::-1].hex()
+
+			class s: pass
+			s.idx = 0
+			s.raw_tx = bytearray()
+
+			tx = bytes.fromhex(txhex)
+			d = { 'version': bytes2int(bshift(4)) }
+
+			has_witness = tx[s.idx] == 0
+			if has_witness:
+				u = bshift(2,skip=True).hex()
+				assert u == '0001'
+
+			d['num_txins'] = readVInt()
+			d['txins'] = [{
+				'txid':      bshift(32)[::-1].hex(),
+				'vout':      bytes2int(bshift(4)),
+				'scriptSig': bshift(readVInt(skip=True),sub_null=True).hex(),
+				'nSeq':      bshift(4)[::-1].hex()
+			} for i in range(d['num_txins'])]
+
+			d['num_txouts'] = readVInt()
+			d['txouts'] = [{
+				'amount':       bytes2coin_amt(bshift(8)),
+				'scriptPubKey': bshift(readVInt()).hex()
+			} for i in range(d['num_txouts'])]
+
+			for o in d['txouts']:
+				o['address'] = scriptPubKey2addr(o['scriptPubKey'])[0]
+
+			if has_witness:
+				d['txid'] = make_txid(tx[:4] + tx[6:s.idx] + tx[-4:])
+				d['witness_size'] = len(tx) - s.idx + 2 - 4
+				for txin in d['txins']:
+					if tx[s.idx] == 0:
+						bshift(1,skip=True)
+						continue
+					txin['witness'] = [
+						bshift(readVInt(skip=True),skip=True).hex() for item in range(readVInt(skip=True)) ]
+			else:
+				d['txid'] = make_txid(tx)
+				d['witness_size'] = 0
+
+			assert len(tx) - s.idx == 4
+			d['lock_time'] = bytes2int(bshift(4))
+			d['unsigned_hex'] = s.raw_tx.hex()
+			return d
+
+		rnd = random.Random(1)
+
+		def vint(n):
+			return (bytes([n]) if n < 0xfd else b'\xfd' + n.to_bytes(2,'little') if n <= 0xffff
+						else b'\xfe' + n.to_bytes(4,'little'))
+
+		def rbytes(n): return bytes(rnd.getrandbits(8) for i in range(n))
+
+		def make_tx(n_in,n_out,segwit,signed=True,ss_len=None):
+			"""
+			a synthetic transaction: signed inputs are P2PKH if non-segwit, P2SH-P2WPKH or P2WPKH
+			otherwise; outputs are a mix of P2PKH, P2SH and P2WPKH
+			"""
+			ins,wit,types = [],[],[]
+			for i in range(n_in):
+				t = rnd.choice(('S','B')) if segwit else 'L'
+				ss = (  b'' if not signed or t == 'B' else
+						bytes.fromhex('16' + g.proto.witness_vernum_hex + '14') + rbytes(20) if t == 'S' else
+						rbytes(ss_len or rnd.randint(106,139)) )
+				ins.append(rbytes(32) + rnd.randint(0,20).to_bytes(4,'little') + vint(len(ss)) + ss
+							+ rnd.choice((b'\xff'*4,b'\xfd' + b'\xff'*3)))
+				wit.append(b'\x02' + vint(72) + rbytes(72) + vint(33) + rbytes(33) if t != 'L' else b'\x00')
+				types.append(t)
+			outs = []
+			for i in range(n_out):
+				h = rbytes(20)
+				spk = rnd.choice((
+					b'\x76\xa9\x14' + h + b'\x88\xac',
+					b'\xa9\x14' + h + b'\x87',
+					bytes.fromhex(g.proto.witness_vernum_hex + '14') + h ))
+				outs.append(rnd.randint(546,10**11).to_bytes(8,'little') + vint(len(spk)) + spk)
+			body = vint(n_in) + b''.join(ins) + vint(n_out) + b''.join(outs)
+			locktime = rnd.choice((0,1320969600)).to_bytes(4,'little')
+			has_wit = segwit and signed
+			return ( b'\x02\x00\x00\x00' + (b'\x00\x01' if has_wit else b'')
+					+ body + (b''.join(wit) if has_wit else b'') + locktime ).hex(),types
+
+		def compare(txhex):
+			a,b = old_deserialize(txhex),DeserializedTX(txhex)
+			assert sorted(a) == sorted(b), (sorted(a),sorted(b))
+			for k in a:
+				if k == 'txouts':
+					for o1,o2 in zip(a[k],b[k]):
+						for k2 in o1:
+							assert o1[k2] == o2[k2] and type(o1[k2]) == type(o2[k2]), (k2,o1[k2],o2[k2])
+				else:
+					assert a[k] == b[k], (k,a[k],b[k])
+			return b
+
+		def ref_txs():
+			fns = ( ('btc',False,'test/ref/0B8D5A[15.31789,14,tl=1320969600].rawtx'),
+					('btc',True,'test/ref/0C7115[15.86255,14,tl=1320969600].testnet.rawtx'),
+					('btc',True,'test/ref/25EFA3[2.34].testnet.rawtx'),
+					('bch',False,'test/ref/460D4D-BCH[10.19764,tl=1320969600].rawtx'),
+					('ltc',False,'test/ref/litecoin/AF3CDF-LTC[620.76194,1453,tl=1320969600].rawtx'),
+					('ltc',True,'test/ref/litecoin/A5A1E0-LTC[1454.64322,1453,tl=1320969600].testnet.rawtx') )
+			for coin,testnet,fn in fns:
+				init_coin(coin,testnet)
+				with open(fn) as f:
+					compare(f.read().splitlines()[2])
+			init_coin('btc',False)
+
+		def synthetic_txs():
+			for i in range(200):
+				segwit,signed = rnd.choice((True,False)),rnd.choice((True,False))
+				compare(make_tx(rnd.randint(1,300),rnd.randint(1,300),segwit,signed)[0])
+
+			# truncated and padded data
+			txhex = make_tx(3,2,True)[0]
+			for bad in (txhex[:-10],txhex[:100],txhex+'00'):
+				try: DeserializedTX(bad)
+				except TxHexParseError: pass
+				else: raise AssertionError('no exception raised')
+
+			# bad witness flag
+			try: DeserializedTX(txhex[:8] + '0002' + txhex[12:])
+			except IllegalWitnessFlagValue: pass
+			else: raise AssertionError('no exception raised')
+
+		def make_mmgen_tx(n_in,segwit):
+			"a signed MMGenTX with data matching its hex, plus the latter with an altered output amount"
+			txhex,types = make_tx(n_in,3,segwit,ss_len=107)
+			dt = old_deserialize(txhex)
+			tx = MMGenTX()
+			tx.hex = txhex
+			tx.locktime = dt['lock_time'] or None
+			tx.txid = make_chksum_6(bytes.fromhex(dt['unsigned_hex'])).upper()
+			tx.coin_txid = dt['txid']
+			for t,i in zip(types,dt['txins']):
+				tx.inputs.append(MMGenTxInput(
+					txid     = i['txid'],
+					vout     = i['vout'],
+					amt      = g.proto.coin_amt('1'),
+					addr     = CoinAddr(g.proto.pubhash2addr('00'*20,False)),
+					mmid     = 'DEADBEEF:{}:1'.format(t) if t != 'L' else None,
+					sequence = int(i['nSeq'],16) if i['nSeq'] != 'ffffffff' else None))
+			for o in dt['txouts']:
+				tx.outputs.append(MMGenTxOutput(addr=CoinAddr(o['address']),amt=o['amount']))
+			amt_hex = dt['txouts'][0]['amount'].to_unit('satoshi').to_bytes(8,'little').hex()
+			n = txhex.rindex(amt_hex)
+			return tx,txhex[:n] + '{:02x}'.format(int(txhex[n:n+2],16) ^ 1) + txhex[n+2:]
+
+		def mmgen_txs():
+			txs = [make_mmgen_tx(rnd.randint(1,30),segwit)[0] for segwit in (True,False) * 5]
+			assert verify_txs(txs) == []
+			dt = txs[0].get_deserialized()
+			assert txs[0].get_deserialized() is dt # cached
+			bad_tx,bad_hex = make_mmgen_tx(5,True)
+			bad_tx.hex = bad_hex
+			import io
+			stderr_save,g.stderr = g.stderr,io.StringIO() # capture the mismatch report
+			ret = verify_txs(txs + [bad_tx])
+			out,g.stderr = g.stderr.getvalue(),stderr_save
+			assert 'Hex outputs' in out, out
+			assert len(ret) == 1 and ret[0][0] is bad_tx and type(ret[0][1]) == TxHexMismatch, ret
+			assert bad_tx.get_deserialized() is not dt
+
+		def bench():
+			res = []
+			n = (1000,5000)[not opt.fast]
+			for segwit in (False,True):
+				txhex = make_tx(n,2,segwit)[0]
+				t = time.time(); old_deserialize(txhex); t_old = time.time() - t
+				t = time.time(); DeserializedTX(txhex); t_new = time.time() - t
+				res.append(('{} inputs, {}'.format(n,('non-segwit','segwit')[segwit]),t_old,t_new))
+			txhex = make_tx(2,n,True)[0]
+			t = time.time(); old_deserialize(txhex); t_old = time.time() - t
+			t = time.time(); DeserializedTX(txhex); t_new = time.time() - t
+			res.append(('{} outputs'.format(n),t_old,t_new))
+			return res
+
+		saved = (g.chain,getattr(opt,'quiet',None))
+		g.chain,opt.quiet = 'mainnet',True
+		try:
+			msg_r('Testing transaction deserialization...')
+			ref_txs()
+			synthetic_txs()
+			mmgen_txs()
+			res = bench()
+			msg('OK')
+		finally:
+			init_coin('btc',False)
+			g.chain,opt.quiet = saved
+
+		vmsg('  {:24} {:>9} {:>9}'.format('','old','new'))
+		for desc,t_old,t_new in res:
+			vmsg('  {:24} {:8.4f}s {:8.4f}s'.format(desc+':',t_old,t_new))
+
+		return True
@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+test/unit_tests_d/ut_txsign: key memoization and parallel signing helpers unit test for the MMGen suite
+"""
+
+import os
+from mmgen.common import *
+
+class unit_test(object):
+
+	def run_test(self,name):
+		from mmgen.protocol import init_coin
+		from mmgen.seed import Seed
+		from mmgen.obj import MMGenID
+		from mmgen import txsign
+		from mmgen.addr import KeyAddrList,AddrIdxList
+
+		class e:
+			def __init__(self,mmid): self.mmid = MMGenID(mmid)
+
+		def check_keys():
+			msg_r('Testing key memoization...')
+			seed = Seed(bytes(range(32)))
+			sid = seed.sid
+			saved_seeds = {sid:seed}
+			txsign.saved_keys.clear()
+
+			need = [e('{}:{}:{}'.format(sid,t,i)) for t,i in (('L',1),('C',3),('L',7),('S',2))]
+			ret = txsign.generate_keys_for_mmgen_addrs(need,[],saved_seeds)
+			assert len(ret) == 4, ret
+			for k in need:
+				f = ret[(k.mmid.al_id,k.mmid.idx)]
+				kal = KeyAddrList(seed=seed,addr_idxs=AddrIdxList(idx_list=[k.mmid.idx]),mmtype=k.mmid.mmtype)
+				assert f.addr == kal.data[0].addr and f.sec.wif == kal.data[0].sec.wif
+
+			# saved keys are reused, and only the missing ones generated
+			saved = txsign.saved_keys[g.proto.__name__]
+			assert len(saved) == 4
+			ret2 = txsign.generate_keys_for_mmgen_addrs(need[:2],[],{}) # no seed needed
+			assert ret2[(need[0].mmid.al_id,1)] is ret[(need[0].mmid.al_id,1)]
+			ret2 = txsign.generate_keys_for_mmgen_addrs(need[:2] + [e('{}:L:9'.format(sid))],[],saved_seeds)
+			assert ret2[(need[0].mmid.al_id,1)] is ret[(need[0].mmid.al_id,1)]
+			assert len(saved) == 5
+
+			# keys are saved per protocol
+			init_coin('ltc',False)
+			ret3 = txsign.generate_keys_for_mmgen_addrs(need[:1],[],saved_seeds)
+			assert list(ret3.values())[0].addr != ret[(need[0].mmid.al_id,1)].addr
+			init_coin('btc',False)
+			assert len(txsign.saved_keys) == 2
+			txsign.saved_keys.clear()
+			msg('OK')
+
+		def check_map():
+			msg_r('Testing parallel transaction mapping...')
+			def func(d): return (d,os.getpid())
+			data = list(range(40))
+			for jobs in (1,4):
+				ret = txsign.map_txs(func,data,jobs)
+				assert [d for d,pid in ret] == data, ret
+				pids = {pid for d,pid in ret}
+				assert (os.getpid() in pids) == (jobs == 1), pids
+			msg('OK')
+
+		def check_atomic_write():
+			msg_r('Testing atomic file write...')
+			fn = os.path.join('test','trash','ut_txsign.txt')
+			try: os.mkdir(os.path.dirname(fn))
+			except: pass
+			for data in ('foo\n','bar\n'):
+				write_data_to_file(fn,data,quiet=True,ignore_opt_outdir=True,atomic=True)
+				assert open(fn).read() == data
+				assert not os.path.exists(fn+'.tmp')
+			os.unlink(fn)
+			msg('OK')
+
+		saved = (g.chain,getattr(opt,'quiet',None),getattr(opt,'jobs',None))
+		g.chain,opt.quiet = 'mainnet',True
+		try:
+			init_coin('btc',False)
+			check_keys()
+			check_map()
+			check_atomic_write()
+		finally:
+			init_coin('btc',False)
+			g.chain,opt.quiet,opt.jobs = saved
+
+		return True